@@ -0,0 +1,185 @@
+"""Admission control and per-identity rate limiting.
+
+Two cheap checks run before every request:
+
+1. A token bucket per identity: the JWT identity when a valid token is
+   present, otherwise the client IP. Over the limit -> 429 + Retry-After.
+2. A global concurrency limit with a bounded wait queue. When all slots are
+   busy a request waits up to ADMISSION_QUEUE_TIMEOUT seconds for one; when
+   the queue itself is full it is rejected at once. Either way -> 503 +
+   Retry-After, so overload sheds a few requests quickly instead of tying up
+   every worker on slow M-Pesa calls or SQLite lock waits.
+
+Bucket state lives in a ``TokenBucketStore``. ``MemoryTokenBucketStore`` is
+per process; a multi-process deployment can plug in a shared implementation
+(e.g. Redis) with ``admission.init_app(app, store=...)``.
+
+Behind a reverse proxy, wrap the app in werkzeug's ProxyFix so
+``request.remote_addr`` is the client and not the proxy.
+"""
+import math
+import threading
+import time
+from array import array
+from typing import Protocol
+
+from flask import g, jsonify, request
+
+
+# =========================================================
+# TOKEN BUCKET STORES
+# =========================================================
+class TokenBucketStore(Protocol):
+    """Token bucket state shared by one or more processes."""
+
+    def consume(self, key, rate, burst, cost=1.0):
+        """Take ``cost`` tokens from ``key``'s bucket, which refills at
+        ``rate`` tokens/second up to ``burst``. Returns 0.0 if allowed,
+        otherwise the number of seconds until enough tokens are available."""
+        ...
+
+
+class MemoryTokenBucketStore:
+    """In-process buckets packed into two float arrays.
+
+    Each key costs one dict entry plus 16 bytes. When ``max_keys`` is hit,
+    buckets that have refilled completely (idle identities) are recycled,
+    falling back to the least recently used ones.
+    """
+
+    def __init__(self, max_keys=100_000):
+        self.max_keys = max_keys
+        self._slots = {}
+        self._tokens = array("d")
+        self._stamps = array("d")
+        self._free = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._slots)
+
+    def consume(self, key, rate, burst, cost=1.0):
+        now = time.monotonic()
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None:
+                slot = self._allocate(key, rate, burst, now)
+                tokens = float(burst)
+            else:
+                elapsed = now - self._stamps[slot]
+                tokens = min(burst, self._tokens[slot] + elapsed * rate)
+            self._stamps[slot] = now
+            if tokens >= cost:
+                self._tokens[slot] = tokens - cost
+                return 0.0
+            self._tokens[slot] = tokens
+            return (cost - tokens) / rate
+
+    def _allocate(self, key, rate, burst, now):
+        if len(self._slots) >= self.max_keys:
+            self._evict(rate, burst, now)
+        if self._free:
+            slot = self._free.pop()
+        else:
+            slot = len(self._tokens)
+            self._tokens.append(0.0)
+            self._stamps.append(0.0)
+        self._slots[key] = slot
+        return slot
+
+    def _evict(self, rate, burst, now):
+        full_after = burst / rate
+        idle = [k for k, s in self._slots.items() if now - self._stamps[s] >= full_after]
+        if not idle:
+            by_age = sorted(self._slots, key=lambda k: self._stamps[self._slots[k]])
+            idle = by_age[: max(1, len(by_age) // 10)]
+        for k in idle:
+            self._free.append(self._slots.pop(k))
+
+
+# =========================================================
+# ADMISSION CONTROLLER
+# =========================================================
+class AdmissionController:
+    def __init__(self, app=None, store=None):
+        self.store = store
+        if app is not None:
+            self.init_app(app, store)
+
+    def init_app(self, app, store=None):
+        if not app.config.get("ADMISSION_ENABLED", True):
+            return
+        self.store = store or self.store or MemoryTokenBucketStore(
+            app.config.get("RATE_LIMIT_MAX_KEYS", 100_000)
+        )
+        self.rate = app.config.get("RATE_LIMIT_PER_SECOND", 10.0)
+        self.burst = app.config.get("RATE_LIMIT_BURST", 40)
+        self.max_queue = app.config.get("ADMISSION_MAX_QUEUE", 64)
+        self.queue_timeout = app.config.get("ADMISSION_QUEUE_TIMEOUT", 2.0)
+        self.retry_after = app.config.get("ADMISSION_RETRY_AFTER", 2)
+        self.exempt = tuple(app.config.get("ADMISSION_EXEMPT_PATHS", ("/health",)))
+
+        self._slots = threading.BoundedSemaphore(app.config.get("ADMISSION_MAX_CONCURRENCY", 16))
+        self._waiting = 0
+        self._lock = threading.Lock()
+
+        app.before_request(self._before_request)
+        app.teardown_request(self._teardown_request)
+        app.extensions["admission"] = self
+
+    # ---- Identity ----
+    @staticmethod
+    def identity():
+        """Rate-limit key: the JWT identity used by require_role, else IP."""
+        from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+
+        try:
+            if verify_jwt_in_request(optional=True):
+                identity = get_jwt_identity()
+                if identity is not None:
+                    return f"u:{identity}"
+        except Exception:
+            pass  # bad/expired token: the route itself will reject it
+        return f"ip:{request.remote_addr}"
+
+    # ---- Hooks ----
+    def _before_request(self):
+        if self._is_exempt(request.path):
+            return None
+
+        wait = self.store.consume(self.identity(), self.rate, self.burst)
+        if wait:
+            return self._reject(429, "Too many requests", wait)
+
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                if self._waiting >= self.max_queue:
+                    return self._reject(503, "Server busy, please retry", self.retry_after)
+                self._waiting += 1
+            try:
+                admitted = self._slots.acquire(timeout=self.queue_timeout)
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+            if not admitted:
+                return self._reject(503, "Server busy, please retry", self.retry_after)
+        g._admission_slot = True
+        return None
+
+    def _is_exempt(self, path):
+        # Whole path segments only: "/health" must not exempt "/healthz-debug"
+        return any(path == p or path.startswith(p.rstrip("/") + "/") for p in self.exempt)
+
+    def _teardown_request(self, exc):
+        if g.pop("_admission_slot", False):
+            self._slots.release()
+
+    @staticmethod
+    def _reject(status, message, retry_after):
+        resp = jsonify({"error": message})
+        resp.status_code = status
+        resp.headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
+        return resp
+
+
+admission = AdmissionController()
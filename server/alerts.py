@@ -0,0 +1,265 @@
+"""Saved-search alerts.
+
+Hunters save predicates such as "Westlands, rent under 40k, furnished".
+New listings are matched against every active saved search through an
+in-memory predicate index rather than a scan of all subscriptions:
+
+* subscriptions are bucketed by (area, anchor keyword), where the anchor
+  is the search's longest keyword ("*" / "" when unset);
+* each bucket keeps a centred interval tree over its rent ranges.
+
+A listing probes at most 2 x (1 + its distinct tokens) buckets and
+stabs each tree in O(log n + hits), so matching cost tracks the number
+of hits, not the number of subscriptions. The remaining keywords of each
+hit are checked with a set lookup.
+
+Matching and notification run on a background thread after the listing
+is committed. All hits of a commit are sent as one send_fcm_batch() call.
+The index is rebuilt from the database once it is older than
+ALERTS_INDEX_MAX_AGE, so searches saved through other processes are
+picked up.
+"""
+import logging
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import select, update
+
+from extensions import db
+from signals import listings_changed
+from textutil import area_key, area_of, tokenize
+
+logger = logging.getLogger("maskani.alerts")
+
+ANY = "*"
+
+
+# =========================================================
+# INTERVAL TREE
+# =========================================================
+class IntervalIndex:
+    """Static centred interval tree: which [lo, hi] intervals contain x?"""
+
+    __slots__ = ("_root", "_unbounded")
+
+    def __init__(self, intervals):
+        intervals = list(intervals)
+        self._unbounded = [v for lo, hi, v in intervals if lo == -math.inf and hi == math.inf]
+        self._root = self._build(intervals)
+
+    @classmethod
+    def _build(cls, items):
+        if not items:
+            return None
+        points = sorted(p for lo, hi, _ in items for p in (lo, hi))
+        centre = points[len(points) // 2]
+        left, right, here = [], [], []
+        for item in items:
+            if item[1] < centre:
+                left.append(item)
+            elif item[0] > centre:
+                right.append(item)
+            else:
+                here.append(item)
+        by_lo = sorted(here, key=lambda i: i[0])
+        by_hi = sorted(here, key=lambda i: -i[1])
+        return (centre, by_lo, by_hi, cls._build(left), cls._build(right))
+
+    def stab(self, x):
+        """Values of all intervals containing ``x``; None matches only
+        intervals unbounded on both sides."""
+        if x is None:
+            return list(self._unbounded)
+        out = []
+        node = self._root
+        while node is not None:
+            centre, by_lo, by_hi, left, right = node
+            if x < centre:
+                for lo, _, v in by_lo:
+                    if lo > x:
+                        break
+                    out.append(v)
+                node = left
+            elif x > centre:
+                for _, hi, v in by_hi:
+                    if hi < x:
+                        break
+                    out.append(v)
+                node = right
+            else:
+                out.extend(v for _, _, v in by_lo)
+                break
+        return out
+
+
+# =========================================================
+# SUBSCRIPTION INDEX
+# =========================================================
+class SubscriptionIndex:
+    def __init__(self, searches=()):
+        self._subs = {}      # id -> (hunter_id, bucket key, lo, hi, extra keywords)
+        self._buckets = {}   # (area, anchor) -> set of ids
+        self._trees = {}     # (area, anchor) -> IntervalIndex, rebuilt lazily
+        for s in searches:
+            self.add(s)
+
+    def __len__(self):
+        return len(self._subs)
+
+    def add(self, search):
+        self.remove(search.id)
+        keywords = search.keywords.split() if search.keywords else []
+        anchor = max(keywords, key=len) if keywords else ""
+        key = (area_key(search.area) if search.area else ANY, anchor)
+        lo = search.min_rent if search.min_rent is not None else -math.inf
+        hi = search.max_rent if search.max_rent is not None else math.inf
+        extra = frozenset(keywords) - {anchor}
+        self._subs[search.id] = (search.hunter_id, key, lo, hi, extra)
+        self._buckets.setdefault(key, set()).add(search.id)
+        self._trees.pop(key, None)
+
+    def remove(self, search_id):
+        entry = self._subs.pop(search_id, None)
+        if entry:
+            key = entry[1]
+            self._buckets[key].discard(search_id)
+            if not self._buckets[key]:
+                del self._buckets[key]
+            self._trees.pop(key, None)
+
+    def _tree(self, key):
+        tree = self._trees.get(key)
+        if tree is None:
+            tree = IntervalIndex(
+                (self._subs[i][2], self._subs[i][3], i) for i in self._buckets[key]
+            )
+            self._trees[key] = tree
+        return tree
+
+    def match(self, area, rent, tokens):
+        """Return {search_id: hunter_id} for searches matching the listing."""
+        areas = (area_key(area), ANY) if area else (ANY,)
+        anchors = [""] + sorted(tokens)
+        hits = {}
+        for a in areas:
+            for anchor in anchors:
+                key = (a, anchor)
+                if key not in self._buckets:
+                    continue
+                for search_id in self._tree(key).stab(rent):
+                    hunter_id, _, _, _, extra = self._subs[search_id]
+                    if extra <= tokens:
+                        hits[search_id] = hunter_id
+        return hits
+
+
+# =========================================================
+# ALERT SERVICE
+# =========================================================
+class AlertMatcher:
+    def __init__(self):
+        self.app = None
+        self._index = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def init_app(self, app):
+        self.app = app
+        self.max_age = app.config.get("ALERTS_INDEX_MAX_AGE", 60)
+        listings_changed.connect(self._on_listings_changed, weak=False)
+
+    # ---- Index maintenance ----
+    def _ensure_index(self):
+        from models import SavedSearch
+
+        if self._index is None or time.monotonic() - self._loaded_at > self.max_age:
+            searches = SavedSearch.query.filter_by(active=True).all()
+            self._index = SubscriptionIndex(searches)
+            self._loaded_at = time.monotonic()
+        return self._index
+
+    def saved(self, search):
+        """Call after committing a new/updated saved search."""
+        with self._lock:
+            if self._index is not None:
+                if search.active:
+                    self._index.add(search)
+                else:
+                    self._index.remove(search.id)
+
+    def deleted(self, search_id):
+        with self._lock:
+            if self._index is not None:
+                self._index.remove(search_id)
+
+    # ---- Matching ----
+    def match_listings(self, listing_ids):
+        """Return {hunter_id: [listing rows]} and the matched search ids."""
+        from models import Listing
+
+        rows = db.session.execute(
+            select(Listing.id, Listing.title, Listing.rent, Listing.short_description)
+            .where(Listing.id.in_(listing_ids), Listing.public.is_(True))
+        ).all()
+        by_hunter = {}
+        matched = set()
+        with self._lock:
+            index = self._ensure_index()
+            for row in rows:
+                tokens = frozenset(tokenize(row.title) + tokenize(row.short_description))
+                hits = index.match(area_of(row.title, row.short_description), row.rent, tokens)
+                matched.update(hits)
+                for hunter_id in set(hits.values()):
+                    by_hunter.setdefault(hunter_id, []).append(row)
+        return by_hunter, matched
+
+    def notify(self, listing_ids):
+        """Match new listings and send every resulting alert as one batch."""
+        from app import send_fcm_batch
+        from models import SavedSearch
+
+        by_hunter, matched = self.match_listings(listing_ids)
+        if not by_hunter:
+            return 0
+
+        messages = []
+        for hunter_id, rows in by_hunter.items():
+            if len(rows) == 1:
+                rent = f" - KES {rows[0].rent:,.0f}" if rows[0].rent else ""
+                body = f"{rows[0].title}{rent}"
+            else:
+                body = f"{len(rows)} new listings match your saved searches."
+            messages.append((hunter_id, "New listing alert", body))
+        sent = send_fcm_batch(messages)
+
+        db.session.execute(
+            update(SavedSearch).where(SavedSearch.id.in_(matched))
+            .values(last_notified_at=datetime.utcnow())
+        )
+        db.session.commit()
+        logger.info("[ALERTS] %d listings matched %d searches; notified %d hunters",
+                    len(listing_ids), len(matched), sent)
+        return sent
+
+    def _on_listings_changed(self, sender, created=(), **extra):
+        if not created:
+            return
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="alerts")
+        self._executor.submit(self._run, list(created))
+
+    def _run(self, listing_ids):
+        with self.app.app_context():
+            try:
+                self.notify(listing_ids)
+            except Exception:
+                logger.exception("[ALERTS] matching failed for listings %s", listing_ids)
+            finally:
+                db.session.remove()
+
+
+alert_matcher = AlertMatcher()
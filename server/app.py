@@ -2,12 +2,25 @@ import os
 import logging
 from datetime import datetime, timedelta
 
+import click
 from flask import Flask, jsonify, redirect, request
+from flask.cli import with_appcontext
 from flask_jwt_extended import create_access_token, get_jwt_identity
 
 from config import Config
-from extensions import db, migrate, jwt, scheduler, init_firebase
+from extensions import db, migrate, jwt, get_firebase
 from models import Role, User, Listing, Booking, Earnings, Payout, FcmToken
+from scheduling import lease_scheduler
+from admission import admission
+from recommender import recommender
+from alerts import alert_matcher
+from autocomplete import autocomplete
+import signals
+import events
+import stats
+import sync
+from archive import archive_cli, run_archive
+from profiler import profiler
 
 logger = logging.getLogger("maskani")
 logging.basicConfig(level=logging.INFO)
@@ -15,35 +28,83 @@ logging.basicConfig(level=logging.INFO)
 # =========================================================
 # APP CREATION
 # =========================================================
-def create_app():
+def create_app(config_object=Config):
+    """Build the app. Cheap enough to call from every CLI command and worker:
+    Firebase, the scheduler and SDK clients are initialised on first use."""
     app = Flask(__name__)
-    app.config.from_object(Config)
+    app.config.from_object(config_object)
 
     # Initialize extensions
     db.init_app(app)
     migrate.init_app(app, db)
     jwt.init_app(app)
-
-    # Firebase init (only when server runs)
-    init_firebase()
+    admission.init_app(app)
+    signals.init_app(app)
+    sync.init_app(app)
+    events.init_app(app)
+    recommender.init_app(app)
+    alert_matcher.init_app(app)
+    stats.init_app(app)
+    autocomplete.init_app(app)
+    profiler.init_app(app)
+
+    app.add_url_rule("/health", view_func=health)
 
     # Register routes (modular routes recommended)
     from routes import init_routes
     init_routes(app)
 
-    return app
+    register_commands(app)
+    lease_scheduler.init_app(app)
 
-app = create_app()
+    return app
 
 # =========================================================
 # UTILITIES
 # =========================================================
 def send_fcm_to_user(user_id, title, body):
     rec = FcmToken.query.filter_by(user_id=user_id).first()
-    if rec:
-        logger.info(f"[FCM] SEND TO {user_id} | {title}: {body}")
-    else:
+    if not rec:
         logger.info(f"[FCM] No FCM token for user {user_id}")
+        return
+    logger.info(f"[FCM] SEND TO {user_id} | {title}: {body}")
+    if get_firebase():
+        from firebase_admin import messaging
+        from firebase_admin.exceptions import FirebaseError
+        try:
+            messaging.send(messaging.Message(
+                token=rec.token,
+                notification=messaging.Notification(title=title, body=body),
+            ))
+        except FirebaseError as e:
+            # A stale token must not abort the caller (e.g. midnight_audit)
+            logger.warning(f"[FCM] Send to user {user_id} failed: {e}")
+
+FCM_BATCH_SIZE = 500  # FCM's per-call limit for send_each
+
+def send_fcm_batch(messages):
+    """Send many (user_id, title, body) notifications at once: one token
+    query and one FCM call per FCM_BATCH_SIZE users. Returns how many users
+    had a token."""
+    latest = {user_id: (title, body) for user_id, title, body in messages}
+    user_ids = list(latest)
+    sent = 0
+    for start in range(0, len(user_ids), FCM_BATCH_SIZE):
+        chunk = user_ids[start:start + FCM_BATCH_SIZE]
+        tokens = db.session.query(FcmToken.user_id, FcmToken.token) \
+            .filter(FcmToken.user_id.in_(chunk)).all()
+        logger.info(f"[FCM] BATCH SEND to {len(tokens)} of {len(chunk)} users")
+        if tokens and get_firebase():
+            from firebase_admin import messaging
+            messaging.send_each([
+                messaging.Message(
+                    token=token,
+                    notification=messaging.Notification(title=latest[uid][0], body=latest[uid][1]),
+                )
+                for uid, token in tokens
+            ])
+        sent += len(tokens)
+    return sent
 
 def require_role(*roles):
     from functools import wraps
@@ -70,21 +131,26 @@ def require_role(*roles):
 # =========================================================
 # HEALTH CHECK
 # =========================================================
-@app.route("/health")
 def health():
     return jsonify({"status": "ok", "time": datetime.utcnow().isoformat()})
 
 # =========================================================
 # CRON JOBS
 # =========================================================
+# Registered with the lease scheduler: every process that starts it carries
+# these jobs, but only the lease holder runs them (see scheduling.py).
+# Jobs return the number of rows they touched for the job_runs history.
 def midnight_audit():
     logger.info("Running midnight audit...")
     tomorrow = (datetime.utcnow() + timedelta(days=1)).date()
     bookings = Booking.query.filter_by(status="confirmed").all()
+    reminded = 0
     for b in bookings:
         if b.scheduled_slot and str(tomorrow) in b.scheduled_slot:
             send_fcm_to_user(b.hunter_id, "Viewing Reminder", "You have a viewing tomorrow.")
             send_fcm_to_user(b.listing.owner_id, "Viewing Reminder", "You have a viewing tomorrow.")
+            reminded += 1
+    return reminded
 
 def weekly_payouts():
     logger.info("Running weekly payouts...")
@@ -94,11 +160,20 @@ def weekly_payouts():
         db.session.add(payout)
         e.balance = 0.0
     db.session.commit()
+    return len(earnings)
+
+lease_scheduler.add_job(midnight_audit, "cron", hour=0, minute=0)
+lease_scheduler.add_job(weekly_payouts, "cron", day_of_week="sun", hour=5)
+lease_scheduler.add_job(recommender.rebuild, "cron", name="rebuild_listing_neighbors", hour=3, minute=30)
+lease_scheduler.add_job(run_archive, "cron", name="archive_cold_rows", day_of_week="sun", hour=4)
+lease_scheduler.add_job(sync.prune_tombstones, "cron", name="prune_sync_tombstones", hour=2, minute=45)
+lease_scheduler.add_job(events.prune_outbox, "cron", name="prune_event_outbox", hour=2, minute=50)
 
 # =========================================================
 # CLI: INIT DB
 # =========================================================
-@app.cli.command("init-db")
+@click.command("init-db")
+@with_appcontext
 def init_db():
     db.create_all()
     for role_name in ("hunter", "leaser", "admin"):
@@ -112,15 +187,41 @@ def init_db():
         db.session.commit()
     print("Database initialized.")
 
+# =========================================================
+# CLI: SEED
+# =========================================================
+@click.command("seed")
+@click.option("--scale", default=1.0, show_default=True,
+              help="Dataset size; each unit is ~1k users and ~5k rows in total.")
+@click.option("--seed", "random_seed", default=42, show_default=True,
+              help="RNG seed; the same scale and seed give the same data.")
+@click.option("--drop/--no-drop", default=True, show_default=True,
+              help="Drop all tables before seeding.")
+@with_appcontext
+def seed_db(scale, random_seed, drop):
+    from seed import run_seed
+    run_seed(scale=scale, seed=random_seed, drop=drop)
+
+def register_commands(app):
+    from startup_profile import startup_profile
+    from media import rethumb
+    from importer import import_listings_command
+
+    app.cli.add_command(init_db)
+    app.cli.add_command(seed_db)
+    app.cli.add_command(startup_profile)
+    app.cli.add_command(rethumb)
+    app.cli.add_command(archive_cli)
+    app.cli.add_command(import_listings_command)
+
 # =========================================================
 # RUN SERVER
 # =========================================================
 if __name__ == "__main__":
-    from apscheduler.triggers.cron import CronTrigger
+    app = create_app()
 
-    # Add cron jobs
-    scheduler.add_job(midnight_audit, CronTrigger(hour=0, minute=0))
-    scheduler.add_job(weekly_payouts, CronTrigger(day_of_week="sun", hour=5))
-    scheduler.start()
+    # Cron jobs; safe alongside other workers thanks to the lease
+    lease_scheduler.start()
+    autocomplete.warm()
 
-    app.run(debug=True)
+    app.run(debug=True, use_reloader=False)
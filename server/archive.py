@@ -0,0 +1,329 @@
+"""Hot/cold archival of payment logs and closed bookings.
+
+Rows older than ARCHIVE_AFTER_DAYS are moved out of the hot tables into
+monthly segment files under ARCHIVE_ROOT:
+
+    <table>/<YYYY-MM>/part-0001.seg.z
+
+A segment is zlib-compressed JSON holding one list per column (values of
+a column compress far better together than row by row), sorted by id.
+``archive_segments`` is the index: id range, created_at range, row count
+and checksum of each file.
+
+Each segment is written to disk first, then its manifest row and the
+delete of the archived rows commit in one transaction. A crash in between
+leaves the rows hot and an orphan file; the next run picks the same
+(table, month, part) name and overwrites it, so runs are resumable and
+never archive a row twice.
+
+Bookings are archived once closed (completed / expired / cancelled) unless
+a payment still references them. The highest id of each table is never
+archived so SQLite cannot hand an archived id out again.
+
+find() and history() read hot rows first and fall back to the segments,
+returning transient model instances, so callers use as_dict() as usual.
+
+Archiving never touches ``listing_stats_daily``: stats.py owns those
+rollups, and ``flask stats backfill`` counts archived bookings through
+archived_columns(), so a rebuild after archival loses no history.
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import zlib
+from bisect import bisect_left
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import Date, DateTime, delete, func, select
+
+from extensions import db
+
+logger = logging.getLogger("maskani.archive")
+
+CLOSED_BOOKING_STATUSES = ("completed", "expired", "cancelled")
+DELETE_CHUNK = 500  # stays under SQLite's bound-parameter limit
+
+
+def _archived_models():
+    from models import Booking, PaymentLog
+
+    return {"payment_logs": PaymentLog, "bookings": Booking}
+
+
+def _eligible(model, cutoff):
+    """WHERE clauses selecting archivable rows of ``model``."""
+    from models import Booking, Payment
+
+    table = model.__table__
+    newest = select(func.max(table.c.id)).scalar_subquery()
+    clauses = [table.c.created_at < cutoff, table.c.id < newest]
+    if model is Booking:
+        clauses += [
+            table.c.status.in_(CLOSED_BOOKING_STATUSES),
+            table.c.id.notin_(select(Payment.booking_id).where(Payment.booking_id.isnot(None))),
+        ]
+    return clauses
+
+
+# =========================================================
+# SEGMENT ENCODING
+# =========================================================
+def _encode(table, rows):
+    columns = {}
+    for col in table.columns:
+        values = [row._mapping[col.name] for row in rows]
+        if isinstance(col.type, (DateTime, Date)):
+            values = [v.isoformat() if v is not None else None for v in values]
+        columns[col.name] = values
+    payload = {"table": table.name, "rows": len(rows), "columns": columns}
+    return zlib.compress(json.dumps(payload, separators=(",", ":")).encode(), 9)
+
+
+def _decode(table, blob):
+    columns = json.loads(zlib.decompress(blob))["columns"]
+    for col in table.columns:
+        if isinstance(col.type, DateTime):
+            columns[col.name] = [datetime.fromisoformat(v) if v else None for v in columns[col.name]]
+        elif isinstance(col.type, Date):
+            columns[col.name] = [date.fromisoformat(v) if v else None for v in columns[col.name]]
+    return columns
+
+
+def _root():
+    return current_app.config["ARCHIVE_ROOT"]
+
+
+def _write_segment(relpath, blob):
+    dest = os.path.join(_root(), relpath)
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(dest))
+    try:
+        with os.fdopen(fd, "wb") as out:
+            out.write(blob)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp_path, dest)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+# =========================================================
+# ARCHIVAL
+# =========================================================
+def _month_bounds(moment):
+    start = datetime(moment.year, moment.month, 1)
+    end = datetime(start.year + start.month // 12, start.month % 12 + 1, 1)
+    return start, end
+
+
+def archive_table(model, cutoff, segment_rows):
+    """Move eligible rows of ``model`` created before ``cutoff`` into
+    segments, one transaction per segment. Returns rows archived."""
+    from models import ArchiveSegment
+
+    table = model.__table__
+    eligible = _eligible(model, cutoff)
+    archived = 0
+    while True:
+        oldest = db.session.execute(select(func.min(table.c.created_at)).where(*eligible)).scalar()
+        if oldest is None:
+            break
+        start, end = _month_bounds(oldest)
+        rows = db.session.execute(
+            select(table).where(*eligible, table.c.created_at >= start, table.c.created_at < end)
+            .order_by(table.c.id).limit(segment_rows)
+        ).all()
+        month = start.strftime("%Y-%m")
+        part = db.session.execute(
+            select(func.coalesce(func.max(ArchiveSegment.part), 0))
+            .where(ArchiveSegment.table_name == table.name, ArchiveSegment.month == month)
+        ).scalar() + 1
+        relpath = f"{table.name}/{month}/part-{part:04d}.seg.z"
+
+        blob = _encode(table, rows)
+        _write_segment(relpath, blob)
+
+        ids = [row.id for row in rows]
+        created = [row.created_at for row in rows]
+        db.session.add(ArchiveSegment(
+            table_name=table.name, month=month, part=part, path=relpath,
+            row_count=len(rows), min_id=ids[0], max_id=ids[-1],
+            min_created_at=min(created), max_created_at=max(created),
+            size_bytes=len(blob), sha256=hashlib.sha256(blob).hexdigest(),
+        ))
+        for i in range(0, len(ids), DELETE_CHUNK):
+            db.session.execute(delete(table).where(table.c.id.in_(ids[i:i + DELETE_CHUNK])))
+        db.session.commit()
+        archived += len(rows)
+        logger.info("[ARCHIVE] %s: %d rows -> %s (%d bytes)", table.name, len(rows), relpath, len(blob))
+    return archived
+
+
+def run_archive(older_than_days=None):
+    """Archive every archived table; scheduled weekly. Returns rows moved."""
+    config = current_app.config
+    days = older_than_days if older_than_days is not None else config["ARCHIVE_AFTER_DAYS"]
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    return sum(
+        archive_table(model, cutoff, config["ARCHIVE_SEGMENT_ROWS"])
+        for model in _archived_models().values()
+    )
+
+
+# =========================================================
+# READS
+# =========================================================
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def load_segment(segment):
+    """Decoded columns of ``segment``, memoised in a small LRU."""
+    with _cache_lock:
+        columns = _cache.get(segment.path)
+        if columns is not None:
+            _cache.move_to_end(segment.path)
+            return columns
+
+    with open(os.path.join(_root(), segment.path), "rb") as f:
+        blob = f.read()
+    if hashlib.sha256(blob).hexdigest() != segment.sha256:
+        raise IOError(f"Archive segment {segment.path} is corrupt (checksum mismatch)")
+    columns = _decode(_archived_models()[segment.table_name].__table__, blob)
+
+    with _cache_lock:
+        _cache[segment.path] = columns
+        while len(_cache) > current_app.config["ARCHIVE_CACHE_SEGMENTS"]:
+            _cache.popitem(last=False)
+    return columns
+
+
+def archived_columns(model):
+    """Yield the decoded columns of every segment of ``model``, oldest
+    first; for full rebuilds such as ``flask stats backfill``."""
+    from models import ArchiveSegment
+
+    segments = ArchiveSegment.query.filter(ArchiveSegment.table_name == model.__tablename__) \
+        .order_by(ArchiveSegment.month, ArchiveSegment.part)
+    for segment in segments:
+        yield load_segment(segment)
+
+
+def _instance(model, columns, i):
+    return model(**{name: values[i] for name, values in columns.items()})
+
+
+def find(model, row_id):
+    """Hot row by id, else the archived copy (transient), else None."""
+    from models import ArchiveSegment
+
+    row = db.session.get(model, row_id)
+    if row is not None:
+        return row
+    # Id ranges of segments can overlap (ids are not strictly in created_at
+    # order), so check every segment whose range covers the id
+    segments = ArchiveSegment.query.filter(
+        ArchiveSegment.table_name == model.__tablename__,
+        ArchiveSegment.min_id <= row_id, ArchiveSegment.max_id >= row_id,
+    ).order_by(ArchiveSegment.min_id)
+    for segment in segments:
+        columns = load_segment(segment)
+        i = bisect_left(columns["id"], row_id)
+        if i < len(columns["id"]) and columns["id"][i] == row_id:
+            return _instance(model, columns, i)
+    return None
+
+
+def history(model, since=None, until=None, limit=100, **filters):
+    """Newest-first rows of ``model`` from the hot table and the archive.
+
+    Filters are column=value (equality) or column=[values] (IN). Returns a
+    list of (instance, archived) pairs."""
+    from models import ArchiveSegment
+
+    table = model.__table__
+    clauses = []
+    for name, value in filters.items():
+        col = table.c[name]
+        clauses.append(col.in_(value) if isinstance(value, (list, set, tuple)) else col == value)
+    if since:
+        clauses.append(table.c.created_at >= since)
+    if until:
+        clauses.append(table.c.created_at < until)
+
+    results = [(row, False) for row in
+               model.query.filter(*clauses).order_by(table.c.created_at.desc()).limit(limit)]
+
+    segments = ArchiveSegment.query.filter(ArchiveSegment.table_name == table.name)
+    if since:
+        segments = segments.filter(ArchiveSegment.max_created_at >= since)
+    if until:
+        segments = segments.filter(ArchiveSegment.min_created_at < until)
+    matchers = {
+        name: (set(value) if isinstance(value, (list, set, tuple)) else {value})
+        for name, value in filters.items()
+    }
+    for segment in segments.order_by(ArchiveSegment.max_created_at.desc()):
+        if len(results) >= limit and segment.max_created_at < results[limit - 1][0].created_at:
+            break  # everything older than the current page
+        columns = load_segment(segment)
+        for i, created in enumerate(columns["created_at"]):
+            if since and created < since or until and created >= until:
+                continue
+            if all(columns[name][i] in wanted for name, wanted in matchers.items()):
+                results.append((_instance(model, columns, i), True))
+        results.sort(key=lambda pair: pair[0].created_at, reverse=True)
+        del results[limit:]
+    return results
+
+
+# =========================================================
+# CLI
+# =========================================================
+@click.group("archive")
+def archive_cli():
+    """Cold-row archival."""
+
+
+@archive_cli.command("run")
+@click.option("--older-than-days", type=int, default=None,
+              help="Override ARCHIVE_AFTER_DAYS.")
+@click.option("--vacuum", is_flag=True, help="VACUUM afterwards to shrink the SQLite file.")
+@with_appcontext
+def archive_run(older_than_days, vacuum):
+    """Move old payment logs and closed bookings into archive segments."""
+    started = time.perf_counter()
+    moved = run_archive(older_than_days)
+    print(f"Archived {moved:,} rows in {time.perf_counter() - started:.1f}s.")
+    if vacuum and moved and db.engine.dialect.name == "sqlite":
+        with db.engine.connect() as conn:
+            conn.exec_driver_sql("VACUUM")
+        print("Vacuumed database.")
+
+
+@archive_cli.command("status")
+@with_appcontext
+def archive_status():
+    """Summarise archive segments per table."""
+    from models import ArchiveSegment
+
+    rows = db.session.execute(
+        select(ArchiveSegment.table_name, func.count(), func.sum(ArchiveSegment.row_count),
+               func.sum(ArchiveSegment.size_bytes), func.min(ArchiveSegment.month),
+               func.max(ArchiveSegment.month))
+        .group_by(ArchiveSegment.table_name).order_by(ArchiveSegment.table_name)
+    ).all()
+    if not rows:
+        print("No archive segments.")
+    for name, segments, count, size, first, last in rows:
+        print(f"{name}: {count:,} rows in {segments} segments ({size / 1024:,.0f} KiB), {first} .. {last}")
@@ -0,0 +1,269 @@
+"""Search-box autocomplete over neighbourhoods and listing titles.
+
+Suggestions come from an in-memory prefix index: a sorted list of
+normalised keys searched with bisect, plus a dict holding each key's display
+text and weight. Key strings are ``"<normalised text>\\0<kind>"``, so an area
+and a title with the same text stay distinct and both sort under the same
+prefix.
+
+Weights are popularity: every public listing adds 1 + AUTOCOMPLETE_VIEW_WEIGHT
+x its views over the last AUTOCOMPLETE_VIEW_DAYS (from listing_stats_daily).
+That weight goes to its normalised title and to the neighbourhood it
+mentions. Every gazetteer neighbourhood also starts with a small base
+weight, so it is suggested even before anyone lists there.
+
+A query bisects the prefix's key range and takes the top k by weight. For
+wide ranges, such as one- or two-letter prefixes, the top
+AUTOCOMPLETE_TOP_K is memoised per prefix. A weight change drops the memo
+entries for the prefixes of the changed key only. So queries cost
+microseconds at any index size.
+
+All writes to the index run on one background worker: the initial build
+(warm(), called once each server process has loaded the app; see
+gunicorn.conf.py), incremental updates from ``listings_changed``, and the
+rebuild queued when the index is older than AUTOCOMPLETE_MAX_AGE, which
+picks up view counts and other processes' writes. A rebuild is assembled
+off to the side and swapped in, so queries keep using the previous index
+meanwhile. Only a query that arrives before the very first build has to
+wait for it.
+"""
+import heapq
+import logging
+import sys
+import threading
+import time
+from bisect import bisect_left, insort
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from sqlalchemy import func, select
+
+from extensions import db
+from signals import listings_changed
+from stats import utc_day
+from textutil import NEIGHBOURHOODS, area_of, area_key, normalise
+
+logger = logging.getLogger("maskani.autocomplete")
+
+AREA = "area"
+TITLE = "title"
+SEP = "\0"
+MEMO_MIN_RANGE = 64  # memoise top-k for prefixes matching more keys than this
+AREA_BASE_WEIGHT = 0.5  # every gazetteer area is suggestible, even with no listings
+
+
+# =========================================================
+# PREFIX INDEX
+# =========================================================
+class PrefixIndex:
+    def __init__(self, entries=None, top_k=10):
+        self._entries = entries or {}          # key -> [display, weight]
+        self._keys = sorted(self._entries)
+        self._memo = {}                        # prefix -> top ``top_k`` results
+        self.top_k = top_k
+
+    def __len__(self):
+        return len(self._keys)
+
+    def bump(self, text, kind, display, delta):
+        """Add ``delta`` to the weight of (text, kind); drop it at zero."""
+        key = f"{text}{SEP}{kind}"
+        entry = self._entries.get(key)
+        if entry is None:
+            if delta <= 0:
+                return
+            self._entries[key] = [display, delta]
+            insort(self._keys, key)
+        else:
+            entry[1] += delta
+            if entry[1] <= 1e-9:
+                del self._entries[key]
+                del self._keys[bisect_left(self._keys, key)]
+        for i in range(1, len(text) + 1):
+            self._memo.pop(text[:i], None)
+
+    def top(self, prefix, k):
+        """[(display, kind, weight)] of the ``k`` heaviest keys under ``prefix``."""
+        memo = self._memo.get(prefix)
+        if memo is not None:
+            return memo[:k]
+        lo = bisect_left(self._keys, prefix)
+        hi = bisect_left(self._keys, prefix + "\uffff", lo)
+        wide = hi - lo > MEMO_MIN_RANGE
+        best = heapq.nlargest(
+            self.top_k if wide else k, self._keys[lo:hi], key=lambda key: self._entries[key][1]
+        )
+        results = [
+            (self._entries[key][0], key.rpartition(SEP)[2], self._entries[key][1]) for key in best
+        ]
+        if wide:
+            self._memo[prefix] = results
+        return results[:k]
+
+    def memory(self):
+        """Approximate bytes held (keys, entries, memo)."""
+        size = sys.getsizeof(self._keys) + sys.getsizeof(self._entries) + sys.getsizeof(self._memo)
+        for key, entry in self._entries.items():
+            size += sys.getsizeof(key) + sys.getsizeof(entry) + sys.getsizeof(entry[0]) + sys.getsizeof(entry[1])
+        for prefix, results in self._memo.items():
+            size += sys.getsizeof(prefix) + sys.getsizeof(results) + sum(map(sys.getsizeof, results))
+        return size
+
+
+# =========================================================
+# SERVICE
+# =========================================================
+class Autocomplete:
+    def __init__(self):
+        self.app = None
+        self._index = None
+        self._contrib = {}  # listing id -> (title key, title, area, weight)
+        self._built_at = 0.0
+        self._build_ms = 0.0
+        self._lock = threading.Lock()
+        # One worker, so builds and updates apply in the order they were queued
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="autocomplete")
+        self._pending_build = None
+
+    def init_app(self, app):
+        self.app = app
+        self.top_k = app.config.get("AUTOCOMPLETE_TOP_K", 10)
+        self.max_age = app.config.get("AUTOCOMPLETE_MAX_AGE", 900)
+        self.view_days = app.config.get("AUTOCOMPLETE_VIEW_DAYS", 30)
+        self.view_weight = app.config.get("AUTOCOMPLETE_VIEW_WEIGHT", 0.1)
+        listings_changed.connect(self._on_listings_changed, weak=False)
+
+    # ---- Building ----
+    def _rows(self, ids=None):
+        from models import Listing
+
+        query = select(Listing.id, Listing.title, Listing.short_description) \
+            .where(Listing.public.is_(True))
+        if ids is not None:
+            query = query.where(Listing.id.in_(ids))
+        return db.session.execute(query).all()
+
+    def _views(self, ids=None):
+        from models import ListingStatsDaily as S
+
+        query = select(S.listing_id, func.sum(S.views)) \
+            .where(S.day >= utc_day() - timedelta(days=self.view_days)).group_by(S.listing_id)
+        if ids is not None:
+            query = query.where(S.listing_id.in_(ids))
+        return dict(db.session.execute(query).all())
+
+    @staticmethod
+    def _apply(bump, contribution, sign):
+        title_key, title, area, weight = contribution
+        if title_key:
+            bump(title_key, TITLE, title, sign * weight)
+        if area:
+            bump(area_key(area), AREA, area, sign * weight)
+
+    def _contribution(self, row, views):
+        return (
+            normalise(row.title), row.title.strip(),
+            area_of(row.title, row.short_description),
+            1.0 + self.view_weight * (views or 0),
+        )
+
+    def build(self):
+        """Rebuild the index from the database and swap it in; returns its
+        size. Runs on the worker (see refresh()); queries keep using the
+        previous index until the swap."""
+        started = time.perf_counter()
+        views = self._views()
+        contrib = {row.id: self._contribution(row, views.get(row.id)) for row in self._rows()}
+        # Accumulate into a dict and sort once; insort per key would be O(n^2)
+        entries = {}
+
+        def add(text, kind, display, weight):
+            entries.setdefault(f"{text}{SEP}{kind}", [display, 0.0])[1] += weight
+
+        for name in NEIGHBOURHOODS:
+            add(area_key(name), AREA, name, AREA_BASE_WEIGHT)
+        for contribution in contrib.values():
+            self._apply(add, contribution, +1)
+        index = PrefixIndex(entries, top_k=self.top_k)
+        with self._lock:
+            self._index, self._contrib = index, contrib
+            self._built_at = time.monotonic()
+            self._build_ms = (time.perf_counter() - started) * 1000
+        logger.info("[AUTOCOMPLETE] indexed %d keys from %d listings in %.0f ms (~%.1f MB)",
+                    len(index), len(contrib), self._build_ms, index.memory() / 1e6)
+        return len(index)
+
+    def refresh(self):
+        """Queue a rebuild unless one is already queued; returns its future."""
+        with self._lock:
+            if self._pending_build is None or self._pending_build.done():
+                self._pending_build = self._executor.submit(self._run, self.build)
+            return self._pending_build
+
+    def warm(self):
+        """Build in the background so the first keystroke doesn't pay for it."""
+        self.refresh()
+
+    # ---- Incremental updates ----
+    def update(self, ids, deleted=()):
+        rows = {row.id: row for row in self._rows(ids)} if ids else {}
+        views = self._views(list(rows)) if rows else {}
+        with self._lock:
+            if self._index is None:
+                return
+            for listing_id in set(ids) | set(deleted):
+                old = self._contrib.pop(listing_id, None)
+                if old is not None:
+                    self._apply(self._index.bump, old, -1)
+                row = rows.get(listing_id)
+                if row is not None and listing_id not in deleted:
+                    new = self._contribution(row, views.get(listing_id))
+                    self._contrib[listing_id] = new
+                    self._apply(self._index.bump, new, +1)
+
+    def _on_listings_changed(self, sender, ids=(), deleted=(), **extra):
+        if self._index is None and self._pending_build is None:
+            return  # built from scratch on first use anyway
+        # Queued behind any pending build, so it applies to the new index
+        self._executor.submit(self._run, self.update, list(ids), list(deleted))
+
+    def _run(self, func, *args):
+        with self.app.app_context():
+            try:
+                return func(*args)
+            except Exception:
+                logger.exception("[AUTOCOMPLETE] %s failed", func.__name__)
+            finally:
+                db.session.remove()
+
+    # ---- Queries ----
+    def suggest(self, text, limit=None):
+        prefix = normalise(text)
+        if not prefix:
+            return []
+        limit = min(limit or self.top_k, self.top_k)
+        if self._index is None:
+            self.refresh().result()  # only until the first build lands
+            if self._index is None:
+                return []  # build failed; logged by _run
+        elif time.monotonic() - self._built_at > self.max_age:
+            self.refresh()  # serve the current index meanwhile
+        with self._lock:
+            return self._index.top(prefix, limit)
+
+    def stats(self):
+        with self._lock:
+            index = self._index
+            return {
+                "built": index is not None,
+                "keys": len(index) if index else 0,
+                "listings": len(self._contrib),
+                "memo_prefixes": len(index._memo) if index else 0,
+                "approx_bytes": index.memory() + sys.getsizeof(self._contrib)
+                + sum(map(sys.getsizeof, self._contrib.values())) if index else 0,
+                "build_ms": round(self._build_ms, 1),
+                "age_seconds": round(time.monotonic() - self._built_at) if index else None,
+            }
+
+
+autocomplete = Autocomplete()
@@ -11,6 +11,87 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL", "sqlite:///maskani.db")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Cold-start budget enforced by `flask startup-profile` (ms)
+    STARTUP_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "1500"))
+
+    # Scheduled jobs: any number of `flask scheduler run` processes may run;
+    # the one holding the DB lease runs the jobs (see scheduling.py)
+    SCHEDULER_LEASE_TTL = int(os.getenv("SCHEDULER_LEASE_TTL", "10"))
+    SCHEDULER_HEARTBEAT = int(os.getenv("SCHEDULER_HEARTBEAT", "3"))
+
+    # Admission control / rate limiting (see admission.py)
+    ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "true").lower() in ("1", "true", "yes")
+    ADMISSION_MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", "16"))
+    ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "64"))
+    ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "2.0"))
+    # Long-lived event streams must not hold admission slots
+    ADMISSION_EXEMPT_PATHS = ("/health", "/api/events")
+    RATE_LIMIT_PER_SECOND = float(os.getenv("RATE_LIMIT_PER_SECOND", "10"))
+    RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", "40"))
+
+    # Photo uploads (see media.py)
+    MEDIA_ROOT = os.getenv("MEDIA_ROOT", os.path.join(os.path.dirname(os.path.abspath(__file__)), "instance", "media"))
+    MEDIA_URL_PREFIX = os.getenv("MEDIA_URL_PREFIX", "/media")
+    MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(15 * 1024 * 1024)))
+    THUMBNAIL_SIZES = (160, 480, 1024)
+    THUMBNAIL_WORKERS = int(os.getenv("THUMBNAIL_WORKERS", "2"))
+
+    # Similar-listing recommendations (see recommender.py)
+    RECOMMENDER_TOP_K = int(os.getenv("RECOMMENDER_TOP_K", "10"))
+    RECOMMENDER_MAX_AGE = int(os.getenv("RECOMMENDER_MAX_AGE", "300"))
+    RECOMMENDER_IDLE_SECONDS = int(os.getenv("RECOMMENDER_IDLE_SECONDS", "600"))
+
+    # Saved-search alerts (see alerts.py)
+    ALERTS_INDEX_MAX_AGE = int(os.getenv("ALERTS_INDEX_MAX_AGE", "60"))
+    MAX_SAVED_SEARCHES = int(os.getenv("MAX_SAVED_SEARCHES", "20"))
+
+    # Leaser dashboard rollups (see stats.py)
+    STATS_VIEW_FLUSH_SECONDS = int(os.getenv("STATS_VIEW_FLUSH_SECONDS", "10"))
+    DASHBOARD_MAX_DAYS = int(os.getenv("DASHBOARD_MAX_DAYS", "365"))
+
+    # Cold-row archival (see archive.py)
+    ARCHIVE_ROOT = os.getenv("ARCHIVE_ROOT", os.path.join(os.path.dirname(os.path.abspath(__file__)), "instance", "archive"))
+    ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "180"))
+    ARCHIVE_SEGMENT_ROWS = int(os.getenv("ARCHIVE_SEGMENT_ROWS", "50000"))
+    ARCHIVE_CACHE_SEGMENTS = int(os.getenv("ARCHIVE_CACHE_SEGMENTS", "8"))
+
+    # Bulk listing import (see importer.py)
+    IMPORT_CHUNK_ROWS = int(os.getenv("IMPORT_CHUNK_ROWS", "500"))
+    IMPORT_MAX_ROWS = int(os.getenv("IMPORT_MAX_ROWS", "20000"))
+    IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "200"))
+
+    # Opt-in sampling profiler (see profiler.py)
+    PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "true").lower() in ("1", "true", "yes")
+    PROFILER_DIR = os.getenv("PROFILER_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "instance", "profiles"))
+    PROFILER_KEEP = int(os.getenv("PROFILER_KEEP", "200"))
+    PROFILER_SAMPLE_RATE = float(os.getenv("PROFILER_SAMPLE_RATE", "0"))
+    PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", "5"))
+    PROFILER_MAX_SECONDS = int(os.getenv("PROFILER_MAX_SECONDS", "120"))
+    PROFILER_MAX_SQL = int(os.getenv("PROFILER_MAX_SQL", "500"))
+    PROFILER_TOKEN_MAX_AGE = int(os.getenv("PROFILER_TOKEN_MAX_AGE", "3600"))
+    PROFILER_JOBS = os.getenv("PROFILER_JOBS", "")  # comma-separated job names
+
+    # Delta sync (see sync.py)
+    SYNC_BATCH_SIZE = int(os.getenv("SYNC_BATCH_SIZE", "200"))
+    SYNC_TOMBSTONE_DAYS = int(os.getenv("SYNC_TOMBSTONE_DAYS", "90"))
+
+    # Server-Sent Events (see events.py). Streams are served by the evented
+    # `flask events serve` process; the WSGI route is a development fallback
+    # that holds a worker thread per stream
+    SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+    SSE_MAX_STREAM_SECONDS = int(os.getenv("SSE_MAX_STREAM_SECONDS", "300"))
+    SSE_RETRY_MS = int(os.getenv("SSE_RETRY_MS", "3000"))
+    SSE_POLL_SECONDS = float(os.getenv("SSE_POLL_SECONDS", "0.5"))
+    SSE_OUTBOX_HOURS = int(os.getenv("SSE_OUTBOX_HOURS", "24"))
+    SSE_MAX_CONNECTIONS = int(os.getenv("SSE_MAX_CONNECTIONS", "10000"))  # per events process
+    SSE_WSGI_MAX_STREAMS = int(os.getenv("SSE_WSGI_MAX_STREAMS", "8"))   # per gunicorn worker
+
+    # Search-box autocomplete (see autocomplete.py)
+    AUTOCOMPLETE_TOP_K = int(os.getenv("AUTOCOMPLETE_TOP_K", "10"))
+    AUTOCOMPLETE_MAX_AGE = int(os.getenv("AUTOCOMPLETE_MAX_AGE", "900"))
+    AUTOCOMPLETE_VIEW_DAYS = int(os.getenv("AUTOCOMPLETE_VIEW_DAYS", "30"))
+    AUTOCOMPLETE_VIEW_WEIGHT = float(os.getenv("AUTOCOMPLETE_VIEW_WEIGHT", "0.1"))
+
     # Timezone / Payment Config
     TIMEZONE = os.getenv("TIMEZONE", "Africa/Nairobi")
     
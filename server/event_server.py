@@ -0,0 +1,255 @@
+"""Evented server for GET /api/events.
+
+Runs next to gunicorn; route /api/events to it at the proxy:
+
+    flask events serve --host 0.0.0.0 --port 8001
+
+Every open stream is a coroutine on one asyncio loop, not a thread, so a
+process holds up to SSE_MAX_CONNECTIONS idle streams (raise the open-files
+limit to match). Events come from ``event_outbox`` (see events.py): one
+poller reads rows past its cursor every SSE_POLL_SECONDS and hands them to
+the queues of connected users, so the database sees one query per interval
+however many clients are connected. Authentication, replay and polling run
+in a small thread pool; nothing else touches the database.
+
+A stream whose client reads too slowly to keep its queue under
+QUEUE_SIZE is closed; the browser reconnects with Last-Event-ID and
+replays from the outbox, so nothing is lost. Any number of these processes
+may run behind the proxy.
+"""
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+from flask_jwt_extended import decode_token
+
+import events
+from extensions import db
+
+logger = logging.getLogger("maskani.events")
+
+PATH = "/api/events"
+ROLES = ("hunter", "leaser", "admin")
+QUEUE_SIZE = 1000
+DB_THREADS = 4
+MAX_HEADER_BYTES = 16 * 1024
+HEADER_TIMEOUT = 10
+
+
+class _Subscriber:
+    __slots__ = ("queue", "overflowed")
+
+    def __init__(self):
+        self.queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.overflowed = False
+
+
+class EventServer:
+    def __init__(self, app):
+        self.app = app
+        config = app.config
+        self.heartbeat = config["SSE_HEARTBEAT_SECONDS"]
+        self.max_seconds = config["SSE_MAX_STREAM_SECONDS"]
+        self.retry_ms = config["SSE_RETRY_MS"]
+        self.poll = config["SSE_POLL_SECONDS"]
+        self.max_connections = config["SSE_MAX_CONNECTIONS"]
+        self.connections = 0
+        self._subscribers = defaultdict(set)  # user id -> {_Subscriber}
+        self._cursor = 0
+        self._server = None
+        self._poller = None
+        self._handlers = set()
+        self._executor = ThreadPoolExecutor(max_workers=DB_THREADS, thread_name_prefix="events-db")
+
+    # ---- Database (thread pool) ----
+    def _in_app(self, func, *args):
+        with self.app.app_context():
+            try:
+                return func(*args)
+            finally:
+                db.session.remove()
+
+    async def _db(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._in_app, func, *args)
+
+    def _authenticate(self, token):
+        """User id for a valid access token whose user may stream, else None."""
+        from models import User
+
+        if not token:
+            return None
+        try:
+            claims = decode_token(token)
+        except Exception:
+            return None
+        if claims.get("type") != "access":
+            return None
+        user = db.session.get(User, claims[self.app.config.get("JWT_IDENTITY_CLAIM", "sub")])
+        if user is None or user.role is None or user.role.name not in ROLES:
+            return None
+        return user.id
+
+    # ---- Fan-out ----
+    async def _poll(self):
+        while True:
+            try:
+                rows = await self._db(events.fetch, self._cursor)
+            except Exception:
+                logger.exception("[EVENTS] outbox poll failed")
+                rows = []
+            for row in rows:
+                self._cursor = row[0]
+                for subscriber in list(self._subscribers.get(row[1], ())):
+                    try:
+                        subscriber.queue.put_nowait(row)
+                    except asyncio.QueueFull:
+                        subscriber.overflowed = True
+                        self._unsubscribe(row[1], subscriber)
+            if len(rows) < events.BATCH:
+                await asyncio.sleep(self.poll)
+
+    def _unsubscribe(self, user_id, subscriber):
+        subscribers = self._subscribers.get(user_id)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._subscribers[user_id]
+
+    # ---- HTTP ----
+    @staticmethod
+    async def _reply(writer, status, message, headers=()):
+        body = json.dumps({"error": message}).encode()
+        head = [f"HTTP/1.1 {status}", "Content-Type: application/json",
+                f"Content-Length: {len(body)}", "Connection: close", *headers]
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + body)
+        await writer.drain()
+
+    async def _handle(self, reader, writer):
+        task = asyncio.current_task()
+        self._handlers.add(task)
+        try:
+            await self._serve(reader, writer)
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError,
+                asyncio.TimeoutError):
+            pass
+        except Exception:
+            logger.exception("[EVENTS] stream failed")
+        finally:
+            self._handlers.discard(task)
+            writer.close()
+
+    async def _serve(self, reader, writer):
+        raw = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), HEADER_TIMEOUT)
+        request_line, *lines = raw.decode("latin-1").split("\r\n")
+        try:
+            method, target, _ = request_line.split(" ", 2)
+        except ValueError:
+            return await self._reply(writer, "400 Bad Request", "Malformed request")
+        headers = {}
+        for line in lines:
+            name, _, value = line.partition(":")
+            if name:
+                headers[name.strip().lower()] = value.strip()
+        url = urlsplit(target)
+        if url.path != PATH:
+            return await self._reply(writer, "404 Not Found", "Not found")
+        if method != "GET":
+            return await self._reply(writer, "405 Method Not Allowed", "Method not allowed",
+                                     ["Allow: GET"])
+        if self.connections >= self.max_connections:
+            return await self._reply(writer, "503 Service Unavailable",
+                                     "Too many open event streams", ["Retry-After: 5"])
+
+        query = parse_qs(url.query)
+        # EventSource cannot set headers, so the token may also come as ?jwt=
+        scheme, _, token = headers.get("authorization", "").partition(" ")
+        if scheme.lower() != "bearer":
+            token = query.get(self.app.config.get("JWT_QUERY_STRING_NAME", "jwt"), [""])[0]
+        user_id = await self._db(self._authenticate, token)
+        if user_id is None:
+            return await self._reply(writer, "401 Unauthorized", "Unauthorized")
+        last_event_id = headers.get("last-event-id") or query.get("lastEventId", [""])[0]
+
+        self.connections += 1
+        subscriber = _Subscriber()
+        # Subscribe before replaying so nothing committed in between is missed
+        self._subscribers[user_id].add(subscriber)
+        try:
+            await self._stream(writer, subscriber, user_id, last_event_id)
+        finally:
+            self._unsubscribe(user_id, subscriber)
+            self.connections -= 1
+
+    async def _stream(self, writer, subscriber, user_id, last_event_id):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_seconds
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+            b"Cache-Control: no-cache\r\nX-Accel-Buffering: no\r\nConnection: close\r\n\r\n"
+            + f"retry: {self.retry_ms}\n\n".encode()
+        )
+        after = await self._db(events.resume_point, last_event_id)
+        if after is None:
+            after = await self._db(events.head)
+            writer.write(events.frame(after, "reset", "{}").encode())
+        while True:
+            rows = await self._db(events.fetch, after, user_id)
+            for seq, _, event_type, data in rows:
+                writer.write(events.frame(seq, event_type, data).encode())
+                after = seq
+            await writer.drain()
+            if len(rows) < events.BATCH:
+                break
+
+        while not subscriber.overflowed:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                seq, _, event_type, data = await asyncio.wait_for(
+                    subscriber.queue.get(), min(self.heartbeat, remaining))
+            except asyncio.TimeoutError:
+                writer.write(b": ping\n\n")
+            else:
+                if seq <= after:
+                    continue  # already replayed
+                writer.write(events.frame(seq, event_type, data).encode())
+                after = seq
+            await writer.drain()
+
+    # ---- Entry points ----
+    async def start(self, host, port):
+        """Listen on ``host:port`` and start the outbox poller."""
+        self._cursor = await self._db(events.head)
+        self._server = await asyncio.start_server(self._handle, host, port, limit=MAX_HEADER_BYTES)
+        self._poller = asyncio.ensure_future(self._poll())
+        return self._server
+
+    async def stop(self):
+        """Stop listening and close every open stream."""
+        self._server.close()
+        tasks = [self._poller, *self._handlers]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self._server.wait_closed()
+
+    async def serve(self, host, port):
+        server = await self.start(host, port)
+        logger.info("[EVENTS] serving %s on %s:%d", PATH, host, port)
+        try:
+            await server.serve_forever()
+        finally:
+            await self.stop()
+
+    def run(self, host, port):
+        try:
+            asyncio.run(self.serve(host, port))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._executor.shutdown(wait=False)
@@ -0,0 +1,216 @@
+"""Per-user Server-Sent Events for booking and payment status.
+
+Status changes to Booking, Payment and PaymentLog are collected by a session
+hook and written to ``event_outbox`` on the flushing connection, in the same
+transaction as the change: an event exists exactly when its change commits,
+whichever process (web worker, ``flask scheduler run``, CLI) made it. Event
+ids come from the ``event_seq`` counter (``sync.allocate``), which is held
+until commit, so ids become visible in increasing order. Streams read:
+
+    id: <seq>
+    event: booking.status
+    data: {"id": 12, "status": "confirmed", ...}
+
+A client that reconnects with ``Last-Event-ID`` gets the rows it missed from
+the outbox. Rows are pruned after SSE_OUTBOX_HOURS; a client behind the
+pruned range (or holding an id this database never issued) gets a ``reset``
+event and should catch up through /api/sync instead.
+
+Streams are served by ``flask events serve`` (event_server.py), an asyncio
+process where each open stream is a coroutine rather than a thread; route
+/api/events to it at the proxy. The WSGI route in routes/events.py reads the
+same outbox but holds a worker thread per stream, so it is capped at
+SSE_WSGI_MAX_STREAMS per worker and meant for development.
+"""
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import delete, event, func, insert, inspect, select
+
+import sync
+from extensions import db
+
+logger = logging.getLogger("maskani.events")
+
+EVENT_SEQ = "event_seq"
+PRUNED_THROUGH = "events_pruned_through"
+BATCH = 500  # outbox rows per read
+
+
+# =========================================================
+# SESSION HOOK (WRITE TO THE OUTBOX)
+# =========================================================
+def _status_changed(session, obj, attr="status"):
+    if obj in session.new:
+        return True
+    return inspect(obj).attrs[attr].history.has_changes()
+
+
+def _collect_events(session, flush_context):
+    from models import Booking, EventOutbox, Listing, Payment, PaymentLog
+
+    pending = []
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Booking):
+            status = _status_changed(session, obj)
+            viewed = obj in session.dirty and _status_changed(session, obj, "viewed")
+            if not (status or viewed):
+                continue
+            with session.no_autoflush:
+                listing = session.get(Listing, obj.listing_id)
+            data = {
+                "id": obj.id, "listing_id": obj.listing_id, "status": obj.status,
+                "scheduled_slot": obj.scheduled_slot, "viewed": obj.viewed,
+            }
+            for user_id in {obj.hunter_id, listing.owner_id if listing else None} - {None}:
+                pending.append((user_id, "booking.status", data))
+        elif isinstance(obj, Payment) and _status_changed(session, obj):
+            pending.append((obj.user_id, "payment.status", {
+                "id": obj.id, "booking_id": obj.booking_id, "amount": obj.amount,
+                "status": obj.status, "receipt": obj.mpesa_receipt_number,
+            }))
+        elif isinstance(obj, PaymentLog) and obj.user_id and _status_changed(session, obj):
+            pending.append((obj.user_id, "stk.status", {
+                "id": obj.id, "checkout_request_id": obj.checkout_request_id,
+                "amount": obj.amount, "status": obj.status, "receipt": obj.receipt_number,
+            }))
+    if not pending:
+        return
+
+    conn = session.connection()
+    first = sync.allocate(conn, len(pending), EVENT_SEQ)
+    now = datetime.utcnow()
+    conn.execute(insert(EventOutbox.__table__), [
+        {
+            "seq": first + n, "user_id": user_id, "event_type": event_type,
+            "data": json.dumps(data, separators=(",", ":"), default=str), "created_at": now,
+        }
+        for n, (user_id, event_type, data) in enumerate(pending)
+    ])
+
+
+# =========================================================
+# READING
+# =========================================================
+def head():
+    """Newest committed event id (0 before the first event)."""
+    return sync.counter(EVENT_SEQ)
+
+
+def resume_point(last_event_id):
+    """Seq to stream after for a client sending ``last_event_id``, or None
+    if it must reset. Other users' events advance seq too, so gaps are
+    normal; only pruned events are lost."""
+    latest = head()
+    if not last_event_id:
+        return latest
+    if not last_event_id.isdigit():
+        return None
+    seq = int(last_event_id)
+    if seq < sync.counter(PRUNED_THROUGH) or seq > latest:
+        return None
+    return seq
+
+
+def fetch(after, user_id=None, limit=BATCH):
+    """Outbox rows after seq ``after`` as ``(seq, user_id, event_type,
+    data)``, oldest first; one user's if ``user_id`` is given."""
+    from models import EventOutbox
+
+    table = EventOutbox.__table__
+    query = select(table.c.seq, table.c.user_id, table.c.event_type, table.c.data) \
+        .where(table.c.seq > after)
+    if user_id is not None:
+        query = query.where(table.c.user_id == user_id)
+    return db.session.execute(query.order_by(table.c.seq).limit(limit)).all()
+
+
+def frame(seq, event_type, data):
+    return f"id: {seq}\nevent: {event_type}\ndata: {data}\n\n"
+
+
+def stream(app, user_id, last_event_id, heartbeat, max_seconds, retry_ms, poll):
+    """Generator of SSE frames for ``user_id`` that polls the outbox every
+    ``poll`` seconds; for the WSGI route. Holds no database connection
+    between polls."""
+
+    def query(func, *args):
+        with app.app_context():
+            try:
+                return func(*args)
+            finally:
+                db.session.remove()
+
+    deadline = time.monotonic() + max_seconds
+    yield f"retry: {retry_ms}\n\n"
+    after = query(resume_point, last_event_id)
+    if after is None:
+        after = query(head)
+        yield frame(after, "reset", "{}")
+    quiet_since = time.monotonic()
+    while time.monotonic() < deadline:
+        rows = query(fetch, after, user_id)
+        for seq, _, event_type, data in rows:
+            yield frame(seq, event_type, data)
+            after = seq
+        if rows:
+            quiet_since = time.monotonic()
+            continue
+        if time.monotonic() - quiet_since >= heartbeat:
+            yield ": ping\n\n"
+            quiet_since = time.monotonic()
+        time.sleep(min(poll, max(0.0, deadline - time.monotonic())))
+
+
+# =========================================================
+# RETENTION
+# =========================================================
+def prune_outbox():
+    """Drop events older than SSE_OUTBOX_HOURS; scheduled daily."""
+    from models import EventOutbox, SyncCounter
+
+    cutoff = datetime.utcnow() - timedelta(hours=current_app.config["SSE_OUTBOX_HOURS"])
+    through = db.session.execute(
+        select(func.max(EventOutbox.seq)).where(EventOutbox.created_at < cutoff)
+    ).scalar()
+    if through is None:
+        return 0
+    pruned = db.session.execute(delete(EventOutbox).where(EventOutbox.seq <= through)).rowcount
+    marker = db.session.get(SyncCounter, PRUNED_THROUGH)
+    if marker is None:
+        db.session.add(SyncCounter(name=PRUNED_THROUGH, value=through))
+    else:
+        marker.value = max(marker.value, through)
+    db.session.commit()
+    logger.info("[EVENTS] pruned %d outbox rows through seq %d", pruned, through)
+    return pruned
+
+
+# =========================================================
+# CLI
+# =========================================================
+@click.group("events")
+def events_cli():
+    """Server-Sent Events."""
+
+
+@events_cli.command("serve")
+@click.option("--host", default="127.0.0.1", show_default=True)
+@click.option("--port", default=8001, show_default=True)
+@with_appcontext
+def serve_command(host, port):
+    """Serve /api/events from an asyncio loop (blocks until interrupted)."""
+    from event_server import EventServer
+
+    EventServer(current_app._get_current_object()).run(host, port)
+
+
+def init_app(app):
+    app.cli.add_command(events_cli)
+    if not event.contains(db.session, "after_flush", _collect_events):
+        event.listen(db.session, "after_flush", _collect_events)
@@ -1,18 +1,32 @@
 import os
+import threading
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
-from flask_bcrypt import Bcrypt
 from flask_jwt_extended import JWTManager
-from apscheduler.schedulers.background import BackgroundScheduler
 
 db = SQLAlchemy()
 migrate = Migrate()
-bcrypt = Bcrypt()
 jwt = JWTManager()
-scheduler = BackgroundScheduler()
+
+# Heavier optional services (APScheduler, Firebase) are created on
+# first use via the get_* helpers below, so CLI commands and freshly spawned
+# workers don't import or configure anything they never touch.
+_lazy_lock = threading.Lock()
+
+_scheduler = None
+def get_scheduler():
+    """Return the process-wide BackgroundScheduler, creating it on first use."""
+    global _scheduler
+    if _scheduler is None:
+        with _lazy_lock:
+            if _scheduler is None:
+                from apscheduler.schedulers.background import BackgroundScheduler
+                _scheduler = BackgroundScheduler()
+    return _scheduler
 
 # Firebase optional init
 firebase = None
+_firebase_checked = False
 def init_firebase(cred_path=None):
     """Initialize Firebase only once."""
     global firebase
@@ -34,3 +48,13 @@ def init_firebase(cred_path=None):
         print("firebase_admin not installed. Skipping Firebase init ⚠️")
     except Exception as e:
         print(f"Firebase init failed: {e}")
+
+def get_firebase():
+    """Return the Firebase app (or None), initialising it on first call only."""
+    global _firebase_checked
+    if not _firebase_checked:
+        with _lazy_lock:
+            if not _firebase_checked:
+                init_firebase()
+                _firebase_checked = True
+    return firebase
@@ -0,0 +1,21 @@
+"""Gunicorn settings, read automatically when started from this directory:
+
+    gunicorn "app:create_app()"
+
+Route /api/events to ``flask events serve`` at the proxy (see
+event_server.py); a stream that does reach these workers holds one of their
+threads, so SSE_WSGI_MAX_STREAMS stays well below ``threads``.
+"""
+import os
+
+worker_class = "gthread"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+threads = int(os.getenv("GUNICORN_THREADS", "64"))
+
+
+def post_worker_init(worker):
+    # Build in-memory indexes once the worker has loaded the app, instead
+    # of on its first user request
+    from autocomplete import autocomplete
+
+    autocomplete.warm()
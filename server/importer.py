@@ -0,0 +1,263 @@
+"""Bulk listing import from CSV or NDJSON.
+
+The body is parsed as a stream and validated row by row; valid rows are
+collected into chunks of IMPORT_CHUNK_ROWS and inserted with one Core
+``executemany`` per chunk, each chunk in its own short transaction, so a
+large import never holds the write lock for long and memory stays flat.
+
+Invalid rows are reported by line number and skipped. If the database
+rejects a chunk, its rows are retried one by one so only the offending rows
+are lost. After each chunk commits, ``listings_changed`` is sent once with
+the chunk's ids, so recommendations and alerts are updated per chunk
+rather than per row.
+
+Columns: title (required), rent, short_description, public.
+"""
+import codecs
+import csv
+import json
+import logging
+import time
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import insert
+from sqlalchemy.exc import DBAPIError
+
+import sync
+from extensions import db
+from signals import listings_changed
+
+logger = logging.getLogger("maskani.importer")
+
+FORMATS = ("csv", "ndjson")
+CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "application/json-lines": "ndjson",
+}
+TRUE = {"1", "true", "yes", "y", "t"}
+FALSE = {"0", "false", "no", "n", "f"}
+
+
+class RowError(ValueError):
+    pass
+
+
+# =========================================================
+# PARSING / VALIDATION
+# =========================================================
+def _text_lines(stream):
+    """Decode a binary stream line by line (BOM tolerant)."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    while True:
+        chunk = stream.read(64 * 1024)
+        if not chunk:
+            break
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+def parse(stream, fmt):
+    """Yield (line number, raw dict) pairs; malformed lines yield a
+    RowError instead of a dict."""
+    lines = _text_lines(stream)
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        for raw in reader:
+            if None in raw:
+                yield reader.line_num, RowError("More values than header columns")
+            else:
+                yield reader.line_num, raw
+        return
+    for line_no, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            raw = json.loads(line)
+        except ValueError as e:
+            yield line_no, RowError(f"Invalid JSON: {e}")
+            continue
+        if not isinstance(raw, dict):
+            yield line_no, RowError("Each line must be a JSON object")
+        else:
+            yield line_no, raw
+
+
+def validate(raw, owner_id):
+    """Return a listings row for ``raw`` or raise RowError."""
+    title = str(raw.get("title") or "").strip()
+    if not title:
+        raise RowError("title is required")
+    if len(title) > 255:
+        raise RowError("title is longer than 255 characters")
+
+    rent = raw.get("rent")
+    if rent in (None, ""):
+        rent = None
+    else:
+        try:
+            rent = float(rent)
+        except (TypeError, ValueError):
+            raise RowError(f"rent {rent!r} is not a number")
+        if rent < 0:
+            raise RowError("rent must not be negative")
+
+    public = raw.get("public")
+    if public in (None, ""):
+        public = True
+    elif not isinstance(public, bool):
+        value = str(public).strip().lower()
+        if value not in TRUE | FALSE:
+            raise RowError(f"public {public!r} is not a boolean")
+        public = value in TRUE
+
+    description = raw.get("short_description")
+    return {
+        "owner_id": owner_id,
+        "title": title,
+        "rent": rent,
+        "short_description": str(description).strip() if description not in (None, "") else None,
+        "public": public,
+    }
+
+
+# =========================================================
+# IMPORT
+# =========================================================
+class ImportReport:
+    def __init__(self, max_errors):
+        self.rows = 0
+        self.inserted = 0
+        self.failed = 0
+        self.chunks = 0
+        self.errors = []
+        self.max_errors = max_errors
+
+    def error(self, line, message):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"line": line, "error": message})
+
+    def as_dict(self):
+        return {
+            "rows": self.rows,
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "chunks": self.chunks,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+
+def _insert(rows):
+    """executemany ``rows`` in one transaction and return their new ids."""
+    from models import Listing
+
+    table = Listing.__table__
+    stmt = insert(table).returning(table.c.id, sort_by_parameter_order=True)
+    with db.engine.begin() as conn:
+        # Core bypasses the session hooks, so stamp delta-sync seqs here
+        first = sync.allocate(conn, len(rows))
+        rows = [dict(row, change_seq=first + i) for i, row in enumerate(rows)]
+        return list(conn.execute(stmt, rows).scalars())
+
+
+def _flush(chunk, report):
+    app = current_app._get_current_object()
+    rows = [row for _, row in chunk]
+    try:
+        ids = _insert(rows)
+    except DBAPIError:
+        # Isolate the rows the database rejects; keep the rest
+        ids = []
+        for line, row in chunk:
+            try:
+                ids += _insert([row])
+            except DBAPIError as e:
+                report.error(line, f"Database rejected row: {e.orig}")
+    report.chunks += 1
+    report.inserted += len(ids)
+    if ids:
+        listings_changed.send(app, ids=ids, created=ids, deleted=[])
+
+
+def import_listings(stream, fmt, owner_id):
+    """Stream-import listings owned by ``owner_id``; returns an ImportReport."""
+    config = current_app.config
+    chunk_rows = config["IMPORT_CHUNK_ROWS"]
+    max_rows = config["IMPORT_MAX_ROWS"]
+    report = ImportReport(config["IMPORT_MAX_ERRORS"])
+    chunk = []
+    for line, raw in parse(stream, fmt):
+        report.rows += 1
+        if report.rows > max_rows:
+            report.rows -= 1
+            report.error(line, f"Import stopped: more than {max_rows} rows")
+            break
+        try:
+            if isinstance(raw, RowError):
+                raise raw
+            chunk.append((line, validate(raw, owner_id)))
+        except RowError as e:
+            report.error(line, str(e))
+            continue
+        if len(chunk) >= chunk_rows:
+            _flush(chunk, report)
+            chunk = []
+    if chunk:
+        _flush(chunk, report)
+    logger.info("[IMPORT] owner %s: %d rows, %d inserted, %d failed in %d chunks",
+                owner_id, report.rows, report.inserted, report.failed, report.chunks)
+    return report
+
+
+def detect_format(filename=None, content_type=None):
+    if content_type:
+        fmt = CONTENT_TYPES.get(content_type.split(";")[0].strip().lower())
+        if fmt:
+            return fmt
+    if filename:
+        ext = filename.rsplit(".", 1)[-1].lower()
+        if ext in ("ndjson", "jsonl"):
+            return "ndjson"
+        if ext == "csv":
+            return "csv"
+    return None
+
+
+# =========================================================
+# CLI
+# =========================================================
+@click.command("import-listings")
+@click.argument("source", type=click.File("rb"))
+@click.option("--owner-id", type=int, required=True, help="Leaser who will own the listings.")
+@click.option("--format", "fmt", type=click.Choice(FORMATS), default=None,
+              help="Defaults to the file extension.")
+@with_appcontext
+def import_listings_command(source, owner_id, fmt):
+    """Bulk-import listings from a CSV or NDJSON file ('-' for stdin)."""
+    from models import User
+
+    fmt = fmt or detect_format(filename=source.name)
+    if fmt is None:
+        raise click.ClickException("Cannot tell the format from the file name; pass --format")
+    if db.session.get(User, owner_id) is None:
+        raise click.ClickException(f"No user with id {owner_id}")
+
+    started = time.perf_counter()
+    report = import_listings(source, fmt, owner_id)
+    for err in report.errors:
+        print(f"  line {err['line']}: {err['error']}")
+    if report.failed > len(report.errors):
+        print(f"  ... and {report.failed - len(report.errors)} more errors")
+    print(f"Imported {report.inserted:,} of {report.rows:,} rows "
+          f"({report.failed:,} failed) in {time.perf_counter() - started:.1f}s.")
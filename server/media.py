@@ -0,0 +1,271 @@
+"""Photo ingestion: content-addressed storage plus off-request thumbnailing.
+
+Uploads are streamed to a temp file in MEDIA_ROOT while being hashed, then
+moved to ``originals/<sha[:2]>/<sha>.<ext>``; uploading the same bytes twice
+stores them once. Thumbnails for every THUMBNAIL_SIZES entry are rendered
+by a process pool (see thumbnails.py) and written next to the original under
+``thumbs/``. Every file is addressed by content, so it is served with an
+immutable, year-long Cache-Control.
+
+Listings carry a denormalised ``photos_json`` that is rewritten whenever one
+of their photos finishes processing, so listing reads never query photos.
+"""
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+from thumbnails import render_thumbnails, thumbnail_name
+
+logger = logging.getLogger("maskani.media")
+
+CHUNK_SIZE = 64 * 1024
+
+# Sniffed from the first bytes; the client's Content-Type is not trusted
+SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+)
+EXTENSIONS = {"image/jpeg": "jpg", "image/png": "png", "image/webp": "webp"}
+
+
+class UploadError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+# =========================================================
+# PATHS / URLS
+# =========================================================
+def _root():
+    return current_app.config["MEDIA_ROOT"]
+
+
+def original_path(sha, content_type):
+    return os.path.join(_root(), "originals", sha[:2], f"{sha}.{EXTENSIONS[content_type]}")
+
+
+def thumbs_dir(sha):
+    return os.path.join(_root(), "thumbs", sha[:2])
+
+
+def photo_urls(sha, content_type="image/jpeg"):
+    prefix = current_app.config["MEDIA_URL_PREFIX"]
+    urls = {str(size): f"{prefix}/{sha}/{size}.jpg" for size in current_app.config["THUMBNAIL_SIZES"]}
+    urls["original"] = f"{prefix}/{sha}/original.{EXTENSIONS[content_type]}"
+    return urls
+
+
+def _sniff(head):
+    for magic, content_type in SIGNATURES:
+        if head.startswith(magic):
+            return content_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+# =========================================================
+# STORAGE
+# =========================================================
+def store_upload(stream, max_bytes):
+    """Stream ``stream`` to content-addressed storage.
+
+    Returns (sha256, content_type, size). Raises UploadError for empty,
+    oversized or non-image bodies."""
+    tmp_dir = os.path.join(_root(), "tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+    hasher = hashlib.sha256()
+    size = 0
+    content_type = None
+
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                if content_type is None:
+                    content_type = _sniff(chunk)
+                    if content_type is None:
+                        raise UploadError("Unsupported image type; use JPEG, PNG or WebP", 415)
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadError(f"Image larger than {max_bytes // (1024 * 1024)} MB", 413)
+                hasher.update(chunk)
+                out.write(chunk)
+        if size == 0:
+            raise UploadError("Empty upload")
+
+        sha = hasher.hexdigest()
+        dest = original_path(sha, content_type)
+        if os.path.exists(dest):
+            os.remove(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            os.replace(tmp_path, dest)
+        return sha, content_type, size
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def ingest_upload(req, user):
+    """Store the raw request body as a Photo, deduplicating by content hash,
+    and queue thumbnailing for new (or previously failed) photos."""
+    from models import Photo
+
+    max_bytes = current_app.config["MAX_UPLOAD_BYTES"]
+    if req.content_length and req.content_length > max_bytes:
+        raise UploadError(f"Image larger than {max_bytes // (1024 * 1024)} MB", 413)
+
+    sha, content_type, size = store_upload(req.stream, max_bytes)
+
+    photo = Photo.query.filter_by(sha256=sha).first()
+    if photo is None:
+        photo = Photo(sha256=sha, uploader_id=user.id, content_type=content_type,
+                      size_bytes=size, status="processing")
+        db.session.add(photo)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Same bytes uploaded concurrently; use the other request's row
+            db.session.rollback()
+            return Photo.query.filter_by(sha256=sha).one()
+        schedule_thumbnails(photo)
+    elif photo.status == "failed":
+        photo.status = "processing"
+        db.session.commit()
+        schedule_thumbnails(photo)
+    return photo
+
+
+# =========================================================
+# THUMBNAILING
+# =========================================================
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool(replace_broken=False):
+    global _pool
+    if replace_broken:
+        with _pool_lock:
+            _pool = None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn: forking a threaded web worker is unsafe
+                _pool = ProcessPoolExecutor(
+                    max_workers=current_app.config["THUMBNAIL_WORKERS"],
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _pool
+
+
+def schedule_thumbnails(photo):
+    app = current_app._get_current_object()
+    args = (
+        original_path(photo.sha256, photo.content_type),
+        thumbs_dir(photo.sha256),
+        photo.sha256,
+        tuple(app.config["THUMBNAIL_SIZES"]),
+    )
+    try:
+        future = _get_pool().submit(render_thumbnails, *args)
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM on a huge image); start a fresh pool
+        future = _get_pool(replace_broken=True).submit(render_thumbnails, *args)
+    photo_id = photo.id
+    future.add_done_callback(lambda f: _thumbnails_done(app, photo_id, f))
+
+
+def _thumbnails_done(app, photo_id, future):
+    from models import Photo, ListingPhoto
+
+    with app.app_context():
+        try:
+            photo = db.session.get(Photo, photo_id)
+            if photo is None:
+                logger.info("[MEDIA] photo %s was deleted while processing", photo_id)
+                return
+            try:
+                photo.width, photo.height = future.result()
+                photo.status = "ready"
+            except Exception:
+                logger.exception("[MEDIA] thumbnailing failed for %s", photo.sha256)
+                photo.status = "failed"
+            db.session.commit()
+
+            if photo.status == "ready":
+                links = ListingPhoto.query.filter_by(photo_id=photo_id).all()
+                for link in links:
+                    refresh_listing_photos(link.listing_id)
+                db.session.commit()
+        finally:
+            db.session.remove()
+
+
+def refresh_listing_photos(listing_id):
+    """Rewrite ``Listing.photos_json`` from its ready photos (caller commits)."""
+    from models import Listing, ListingPhoto, Photo
+
+    rows = (
+        db.session.query(Photo)
+        .join(ListingPhoto, ListingPhoto.photo_id == Photo.id)
+        .filter(ListingPhoto.listing_id == listing_id, Photo.status == "ready")
+        .order_by(ListingPhoto.position, Photo.id)
+        .all()
+    )
+    photos = [{"id": p.sha256, "urls": photo_urls(p.sha256, p.content_type)} for p in rows]
+    listing = db.session.get(Listing, listing_id)
+    listing.photos_json = json.dumps(photos) if photos else None
+
+
+def thumbnail_path(sha, size):
+    return os.path.join(thumbs_dir(sha), thumbnail_name(sha, size))
+
+
+# =========================================================
+# CLI
+# =========================================================
+@click.command("rethumb")
+@click.option("--all", "everything", is_flag=True, help="Re-render ready photos too.")
+@with_appcontext
+def rethumb(everything):
+    """Render thumbnails synchronously for stuck or failed photos."""
+    from models import Photo, ListingPhoto
+
+    query = Photo.query if everything else Photo.query.filter(Photo.status != "ready")
+    sizes = tuple(current_app.config["THUMBNAIL_SIZES"])
+    done = 0
+    for photo in query.all():
+        try:
+            photo.width, photo.height = render_thumbnails(
+                original_path(photo.sha256, photo.content_type),
+                thumbs_dir(photo.sha256), photo.sha256, sizes,
+            )
+            photo.status = "ready"
+            done += 1
+        except Exception as e:
+            photo.status = "failed"
+            print(f"{photo.sha256}: {e}")
+        db.session.flush()
+        for link in ListingPhoto.query.filter_by(photo_id=photo.id):
+            refresh_listing_photos(link.listing_id)
+        db.session.commit()
+    print(f"Rendered thumbnails for {done} photos.")
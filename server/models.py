@@ -1,8 +1,7 @@
-from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 import json
 
-db = SQLAlchemy()
+from extensions import db
 
 # ============================================================
 # ROLE
@@ -36,6 +35,7 @@ class User(db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False)
     _password_hash = db.Column(db.String(255), nullable=False)
     role_id = db.Column(db.Integer, db.ForeignKey("roles.id"), nullable=False)
+    profile_pic = db.Column(db.String(512), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     role = db.relationship("Role", backref=db.backref("users", lazy=True))
@@ -55,6 +55,7 @@ class User(db.Model):
             "username": self.username,
             "email": self.email,
             "role": self.role.name,
+            "profile_pic": self.profile_pic,
             "created_at": self.created_at.isoformat(),
         }
 
@@ -64,6 +65,9 @@ class User(db.Model):
 # ============================================================
 class Listing(db.Model):
     __tablename__ = "listings"
+    __table_args__ = (
+        db.Index("ix_listings_owner_id_change_seq", "owner_id", "change_seq"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     owner_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
@@ -72,6 +76,11 @@ class Listing(db.Model):
     short_description = db.Column(db.Text)
     public = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Denormalised [{"id": sha256, "urls": {...}}] of ready photos, kept in
+    # sync by media.py so listing reads need no photo queries
+    photos_json = db.Column(db.Text, nullable=True)
+    # Delta-sync sequence, stamped on every insert/update (see sync.py)
+    change_seq = db.Column(db.BigInteger, nullable=False, default=1)
 
     owner = db.relationship("User", backref=db.backref("listings", lazy=True))
 
@@ -83,15 +92,100 @@ class Listing(db.Model):
             "rent": self.rent,
             "short_description": self.short_description,
             "public": self.public,
+            "photos": json.loads(self.photos_json) if self.photos_json else [],
             "created_at": self.created_at.isoformat(),
         }
 
 
+# ============================================================
+# PHOTO (CONTENT-ADDRESSED UPLOAD)
+# ============================================================
+class Photo(db.Model):
+    __tablename__ = "photos"
+
+    id = db.Column(db.Integer, primary_key=True)
+    sha256 = db.Column(db.String(64), unique=True, nullable=False)
+    uploader_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    content_type = db.Column(db.String(50), nullable=False)
+    size_bytes = db.Column(db.Integer, nullable=False)
+    width = db.Column(db.Integer, nullable=True)
+    height = db.Column(db.Integer, nullable=True)
+    status = db.Column(db.String(20), default="processing")  # processing / ready / failed
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def as_dict(self):
+        from media import photo_urls
+        return {
+            "id": self.sha256,
+            "status": self.status,
+            "width": self.width,
+            "height": self.height,
+            "size_bytes": self.size_bytes,
+            "urls": photo_urls(self.sha256, self.content_type),
+        }
+
+
+class ListingPhoto(db.Model):
+    __tablename__ = "listing_photos"
+
+    listing_id = db.Column(db.Integer, db.ForeignKey("listings.id"), primary_key=True)
+    photo_id = db.Column(db.Integer, db.ForeignKey("photos.id"), primary_key=True)
+    position = db.Column(db.Integer, default=0)
+
+    photo = db.relationship("Photo")
+
+
+# ============================================================
+# LISTING NEIGHBOURS (PRECOMPUTED "SIMILAR LISTINGS")
+# ============================================================
+class ListingNeighbor(db.Model):
+    __tablename__ = "listing_neighbors"
+
+    listing_id = db.Column(db.Integer, db.ForeignKey("listings.id"), primary_key=True)
+    rank = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    neighbor_id = db.Column(db.Integer, db.ForeignKey("listings.id"), nullable=False, index=True)
+    score = db.Column(db.Float, nullable=False)
+
+
+# ============================================================
+# SAVED SEARCH (HUNTER ALERTS)
+# ============================================================
+class SavedSearch(db.Model):
+    __tablename__ = "saved_searches"
+
+    id = db.Column(db.Integer, primary_key=True)
+    hunter_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, index=True)
+    area = db.Column(db.String(80), nullable=True)        # canonical neighbourhood name
+    min_rent = db.Column(db.Float, nullable=True)
+    max_rent = db.Column(db.Float, nullable=True)
+    keywords = db.Column(db.String(255), nullable=True)   # normalised, space separated
+    active = db.Column(db.Boolean, default=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_notified_at = db.Column(db.DateTime, nullable=True)
+
+    def as_dict(self):
+        return {
+            "id": self.id,
+            "hunter_id": self.hunter_id,
+            "area": self.area,
+            "min_rent": self.min_rent,
+            "max_rent": self.max_rent,
+            "keywords": self.keywords.split() if self.keywords else [],
+            "active": self.active,
+            "created_at": self.created_at.isoformat(),
+            "last_notified_at": self.last_notified_at.isoformat() if self.last_notified_at else None,
+        }
+
+
 # ============================================================
 # BOOKING
 # ============================================================
 class Booking(db.Model):
     __tablename__ = "bookings"
+    __table_args__ = (
+        db.Index("ix_bookings_hunter_id_change_seq", "hunter_id", "change_seq"),
+        db.Index("ix_bookings_listing_id_change_seq", "listing_id", "change_seq"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     hunter_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
@@ -99,16 +193,19 @@ class Booking(db.Model):
     leaser_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True)
 
     preferred_slots = db.Column(db.Text)  # store JSON list
-    status = db.Column(db.String(50), default="pending")  
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # active_history: stats.py needs the previous value even when the row
+    # was expired or loaded after a commit
+    status = db.column_property(db.Column(db.String(50), default="pending"), active_history=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     expires_at = db.Column(db.DateTime)
     scheduled_slot = db.Column(db.String(255), nullable=True)
 
     one_time_code = db.Column(db.String(16), nullable=True)
     code_generated_at = db.Column(db.DateTime, nullable=True)
 
-    viewed = db.Column(db.Boolean, default=False)
-    viewed_at = db.Column(db.DateTime, nullable=True)
+    viewed = db.column_property(db.Column(db.Boolean, default=False), active_history=True)
+    viewed_at = db.column_property(db.Column(db.DateTime, nullable=True), active_history=True)
+    change_seq = db.Column(db.BigInteger, nullable=False, default=1)
 
     hunter = db.relationship("User", foreign_keys=[hunter_id])
     leaser = db.relationship("User", foreign_keys=[leaser_id])
@@ -148,12 +245,16 @@ class Earnings(db.Model):
 # ============================================================
 class Payout(db.Model):
     __tablename__ = "payouts"
+    __table_args__ = (
+        db.Index("ix_payouts_leaser_id_change_seq", "leaser_id", "change_seq"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     leaser_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
     amount = db.Column(db.Float, nullable=False)
     status = db.Column(db.String(50), default="pending")
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    change_seq = db.Column(db.BigInteger, nullable=False, default=1)
 
 
 # ============================================================
@@ -161,14 +262,18 @@ class Payout(db.Model):
 # ============================================================
 class Payment(db.Model):
     __tablename__ = "payments"
+    __table_args__ = (
+        db.Index("ix_payments_user_id_change_seq", "user_id", "change_seq"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
-    booking_id = db.Column(db.Integer, db.ForeignKey("bookings.id"), nullable=True)
+    booking_id = db.Column(db.Integer, db.ForeignKey("bookings.id"), nullable=True, index=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
-    amount = db.Column(db.Float, nullable=False)
-    status = db.Column(db.String(50), default="PENDING")
+    amount = db.column_property(db.Column(db.Float, nullable=False), active_history=True)
+    status = db.column_property(db.Column(db.String(50), default="PENDING"), active_history=True)
     mpesa_receipt_number = db.Column(db.String(255), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    change_seq = db.Column(db.BigInteger, nullable=False, default=1)
 
 
 # ============================================================
@@ -178,6 +283,8 @@ class PaymentLog(db.Model):
     __tablename__ = "payment_logs"
 
     id = db.Column(db.Integer, primary_key=True)
+    # Who started the STK push, when known; status events go to this user
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True, index=True)
     phone = db.Column(db.String(20), nullable=False)
     amount = db.Column(db.Float, nullable=False)
     status = db.Column(db.String(50), default="initiated")
@@ -185,7 +292,37 @@ class PaymentLog(db.Model):
     merchant_request_id = db.Column(db.String(100))
     checkout_request_id = db.Column(db.String(100))
     description = db.Column(db.String(255))
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def as_dict(self):
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "phone": self.phone,
+            "amount": self.amount,
+            "status": self.status,
+            "receipt_number": self.receipt_number,
+            "merchant_request_id": self.merchant_request_id,
+            "checkout_request_id": self.checkout_request_id,
+            "description": self.description,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
+
+
+# ============================================================
+# LISTING STATS (DAILY ROLLUP FOR THE LEASER DASHBOARD)
+# ============================================================
+class ListingStatsDaily(db.Model):
+    """Maintained incrementally by stats.py; never recomputed on read."""
+    __tablename__ = "listing_stats_daily"
+
+    listing_id = db.Column(db.Integer, db.ForeignKey("listings.id"), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    views = db.Column(db.Integer, nullable=False, default=0)
+    booking_requests = db.Column(db.Integer, nullable=False, default=0)
+    confirmations = db.Column(db.Integer, nullable=False, default=0)
+    viewings = db.Column(db.Integer, nullable=False, default=0)
+    earnings = db.Column(db.Float, nullable=False, default=0.0)
 
 
 # ============================================================
@@ -198,3 +335,132 @@ class FcmToken(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), unique=True, nullable=False)
     token = db.Column(db.String(512), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+# ============================================================
+# SCHEDULER LEASE (ONE JOB-RUNNING PROCESS AT A TIME)
+# ============================================================
+class SchedulerLease(db.Model):
+    __tablename__ = "scheduler_leases"
+
+    name = db.Column(db.String(80), primary_key=True)
+    holder = db.Column(db.String(255), nullable=False)
+    acquired_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    def as_dict(self):
+        return {
+            "name": self.name,
+            "holder": self.holder,
+            "acquired_at": self.acquired_at.isoformat() if self.acquired_at else None,
+            "expires_at": self.expires_at.isoformat(),
+        }
+
+
+# ============================================================
+# JOB RUN HISTORY
+# ============================================================
+class JobRun(db.Model):
+    __tablename__ = "job_runs"
+
+    id = db.Column(db.Integer, primary_key=True)
+    job_name = db.Column(db.String(120), nullable=False, index=True)
+    holder = db.Column(db.String(255), nullable=False)
+    started_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    duration_ms = db.Column(db.Float, nullable=True)
+    rows_affected = db.Column(db.Integer, nullable=True)
+    outcome = db.Column(db.String(20), default="running")  # running / success / error / skipped
+    error = db.Column(db.Text, nullable=True)
+
+    def as_dict(self):
+        return {
+            "id": self.id,
+            "job_name": self.job_name,
+            "holder": self.holder,
+            "started_at": self.started_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "duration_ms": self.duration_ms,
+            "rows_affected": self.rows_affected,
+            "outcome": self.outcome,
+            "error": self.error,
+        }
+
+
+# ============================================================
+# ARCHIVE SEGMENTS (COLD BOOKINGS / PAYMENT LOGS)
+# ============================================================
+class ArchiveSegment(db.Model):
+    """Manifest of archived rows; see archive.py."""
+    __tablename__ = "archive_segments"
+    __table_args__ = (
+        db.UniqueConstraint("table_name", "month", "part"),
+        db.Index("ix_archive_segments_ids", "table_name", "min_id", "max_id"),
+        db.Index("ix_archive_segments_created", "table_name", "max_created_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    table_name = db.Column(db.String(64), nullable=False)
+    month = db.Column(db.String(7), nullable=False)          # YYYY-MM of created_at
+    part = db.Column(db.Integer, nullable=False)
+    path = db.Column(db.String(255), unique=True, nullable=False)  # relative to ARCHIVE_ROOT
+    row_count = db.Column(db.Integer, nullable=False)
+    min_id = db.Column(db.Integer, nullable=False)
+    max_id = db.Column(db.Integer, nullable=False)
+    min_created_at = db.Column(db.DateTime, nullable=False)
+    max_created_at = db.Column(db.DateTime, nullable=False)
+    size_bytes = db.Column(db.Integer, nullable=False)
+    sha256 = db.Column(db.String(64), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def as_dict(self):
+        return {
+            "table": self.table_name,
+            "month": self.month,
+            "part": self.part,
+            "path": self.path,
+            "rows": self.row_count,
+            "ids": [self.min_id, self.max_id],
+            "created": [self.min_created_at.isoformat(), self.max_created_at.isoformat()],
+            "size_bytes": self.size_bytes,
+            "archived_at": self.created_at.isoformat() if self.created_at else None,
+        }
+
+
+# ============================================================
+# DELTA SYNC (COUNTERS / TOMBSTONES)
+# ============================================================
+class SyncCounter(db.Model):
+    __tablename__ = "sync_counters"
+
+    name = db.Column(db.String(64), primary_key=True)
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+class EventOutbox(db.Model):
+    """A Server-Sent Event for one user, written with the change it reports."""
+    __tablename__ = "event_outbox"
+    __table_args__ = (
+        db.Index("ix_event_outbox_user_seq", "user_id", "seq"),
+    )
+
+    seq = db.Column(db.BigInteger, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, nullable=False)
+    event_type = db.Column(db.String(40), nullable=False)
+    data = db.Column(db.Text, nullable=False)  # JSON
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+
+class SyncTombstone(db.Model):
+    """A deleted synced row, one per user who could see it."""
+    __tablename__ = "sync_tombstones"
+    __table_args__ = (
+        db.Index("ix_sync_tombstones_user_seq", "user_id", "change_seq"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    change_seq = db.Column(db.BigInteger, nullable=False)
+    table_name = db.Column(db.String(64), nullable=False)
+    row_id = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
@@ -0,0 +1,281 @@
+"""Opt-in sampling profiler for requests and scheduled jobs.
+
+A profile is taken when:
+
+* a request carries ``X-Profile: <token>``, where the token comes from
+  POST /api/admin/profiles/token (signed with SECRET_KEY, expires after
+  PROFILER_TOKEN_MAX_AGE);
+* a request is picked at random, with probability PROFILER_SAMPLE_RATE;
+* a scheduler job named in PROFILER_JOBS runs (see scheduling.run_job).
+
+While profiling, a sampler thread reads the profiled thread's stack from
+sys._current_frames() every PROFILER_INTERVAL_MS and counts collapsed
+stacks ("root;...;leaf"). This is the input format of flamegraph.pl and
+speedscope. SQL statements run on that thread are timed through engine
+events. Each profile is written as one JSON file to PROFILER_DIR. The
+directory is a ring buffer of the newest PROFILER_KEEP profiles.
+
+Cost when not profiling: one header lookup per request (plus a random()
+call if PROFILER_SAMPLE_RATE > 0). The SQL listeners are attached the
+first time a profile starts and then return after a single dict lookup.
+"""
+import json
+import logging
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+from flask import current_app, g, request
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("maskani.profiler")
+
+HEADER = "X-Profile"
+PROFILE_ID_RE = re.compile(r"^\d{20}-[A-Za-z0-9-]*$")
+MAX_SQL_TEXT = 500
+
+
+def _frame_label(code):
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f"{module}:{code.co_name}"
+
+
+class Profile:
+    """One sampling session of a single thread."""
+
+    def __init__(self, label, thread_id, interval, max_seconds, max_sql):
+        self.label = label
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.max_sql = max_sql
+        self.stacks = Counter()
+        self.samples = 0
+        self.sql = []
+        self.sql_count = 0
+        self.sql_ms = 0.0
+        self.started_at = datetime.utcnow()
+        self._t0 = time.perf_counter()
+        self.duration_ms = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name="profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self.duration_ms = (time.perf_counter() - self._t0) * 1000
+        self._stop.set()
+        self._thread.join()
+
+    def _sample(self):
+        deadline = time.monotonic() + self.max_seconds
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None or time.monotonic() > deadline:
+                break
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def record_sql(self, statement, ms, rows):
+        self.sql_count += 1
+        self.sql_ms += ms
+        if len(self.sql) < self.max_sql:
+            self.sql.append({"ms": round(ms, 3), "rows": rows, "sql": statement[:MAX_SQL_TEXT]})
+
+    def collapsed(self):
+        return "".join(f"{stack} {n}\n" for stack, n in self.stacks.most_common())
+
+    def as_dict(self):
+        return {
+            "label": self.label,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round(self.duration_ms or 0.0, 3),
+            "interval_ms": self.interval * 1000,
+            "samples": self.samples,
+            "sql": {"count": self.sql_count, "total_ms": round(self.sql_ms, 3), "statements": self.sql},
+            "collapsed": self.collapsed(),
+        }
+
+
+class Profiler:
+    def __init__(self):
+        self.app = None
+        self.enabled = False
+        self.jobs = set()
+        self._active = {}  # thread id -> Profile
+        self._listening = False
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get("PROFILER_ENABLED", True)
+        self.directory = app.config["PROFILER_DIR"]
+        self.keep = app.config["PROFILER_KEEP"]
+        self.sample_rate = app.config["PROFILER_SAMPLE_RATE"]
+        self.interval = app.config["PROFILER_INTERVAL_MS"] / 1000.0
+        self.max_seconds = app.config["PROFILER_MAX_SECONDS"]
+        self.max_sql = app.config["PROFILER_MAX_SQL"]
+        self.token_max_age = app.config["PROFILER_TOKEN_MAX_AGE"]
+        self.jobs = {j.strip() for j in app.config["PROFILER_JOBS"].split(",") if j.strip()}
+        if not self.enabled:
+            return
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        app.extensions["profiler"] = self
+
+    # ---- Tokens ----
+    def _serializer(self):
+        return URLSafeTimedSerializer(current_app.config["SECRET_KEY"], salt="profiler")
+
+    def make_token(self, user_id):
+        return self._serializer().dumps({"by": user_id})
+
+    def _token_ok(self, token):
+        try:
+            self._serializer().loads(token, max_age=self.token_max_age)
+            return True
+        except BadSignature:
+            return False
+
+    # ---- Sessions ----
+    def _attach_sql_listeners(self):
+        with self._lock:
+            if not self._listening:
+                event.listen(Engine, "before_cursor_execute", self._before_cursor_execute)
+                event.listen(Engine, "after_cursor_execute", self._after_cursor_execute)
+                self._listening = True
+
+    def begin(self, label):
+        self._attach_sql_listeners()
+        profile = Profile(label, threading.get_ident(), self.interval, self.max_seconds, self.max_sql)
+        self._active[profile.thread_id] = profile
+        profile.start()
+        return profile
+
+    def end(self, profile, **meta):
+        """Stop ``profile`` and write it to the ring buffer; returns its id."""
+        profile.stop()
+        self._active.pop(profile.thread_id, None)
+        data = profile.as_dict()
+        data.update(meta)
+        try:
+            return self._write(data)
+        except OSError:
+            logger.exception("[PROFILER] could not write profile %s", profile.label)
+            return None
+
+    @contextmanager
+    def profile(self, label, **meta):
+        """Profile the enclosed block on the current thread."""
+        profile = self.begin(label)
+        try:
+            yield profile
+        finally:
+            self.end(profile, **meta)
+
+    def wants_job(self, name):
+        return self.enabled and name in self.jobs
+
+    # ---- SQL timings ----
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if not self._active:
+            return
+        if threading.get_ident() in self._active:
+            conn.info.setdefault("_profiler_t0", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if not self._active:
+            return
+        profile = self._active.get(threading.get_ident())
+        starts = conn.info.get("_profiler_t0")
+        if profile is not None and starts:
+            profile.record_sql(statement, (time.perf_counter() - starts.pop()) * 1000, cursor.rowcount)
+
+    # ---- Request hooks ----
+    def _before_request(self):
+        token = request.headers.get(HEADER)
+        if token is None and not (self.sample_rate and random.random() < self.sample_rate):
+            return
+        if token is not None and not self._token_ok(token):
+            return
+        g._profile = self.begin(f"{request.method} {request.path}")
+
+    def _after_request(self, response):
+        profile = g.get("_profile")
+        if profile is not None:
+            g._profile_status = response.status_code
+        return response
+
+    def _teardown_request(self, exc):
+        profile = g.pop("_profile", None)
+        if profile is not None:
+            self.end(profile, kind="request", status=g.pop("_profile_status", 500),
+                     error=repr(exc) if exc else None)
+
+    # ---- Ring buffer ----
+    def _write(self, data):
+        os.makedirs(self.directory, exist_ok=True)
+        slug = "".join(ch if ch.isalnum() else "-" for ch in data["label"]).strip("-")[:60]
+        profile_id = f"{time.time_ns():020d}-{slug}"
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as out:
+            json.dump(dict(data, id=profile_id), out)
+        os.replace(tmp_path, os.path.join(self.directory, f"{profile_id}.json"))
+
+        names = self.list_ids()
+        for old in names[:-self.keep] if len(names) > self.keep else ():
+            try:
+                os.remove(os.path.join(self.directory, f"{old}.json"))
+            except FileNotFoundError:
+                pass
+        logger.info("[PROFILER] %s: %d samples, %d SQL -> %s",
+                    data["label"], data["samples"], data["sql"]["count"], profile_id)
+        return profile_id
+
+    def list_ids(self):
+        """Stored profile ids, oldest first."""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(n[:-5] for n in names if n.endswith(".json"))
+
+    def entries(self, limit=None):
+        """(id, size in bytes, mtime) of stored profiles, newest first.
+
+        Only the directory is read, never the profiles themselves; ids sort
+        by write time and carry the label slug."""
+        try:
+            with os.scandir(self.directory) as it:
+                files = [(e.name[:-5], e.stat()) for e in it if e.name.endswith(".json")]
+        except FileNotFoundError:
+            return []
+        files.sort(reverse=True)
+        return [(profile_id, st.st_size, st.st_mtime) for profile_id, st in files[:limit]]
+
+    def load(self, profile_id):
+        if not PROFILE_ID_RE.match(profile_id):
+            return None
+        try:
+            with open(os.path.join(self.directory, f"{profile_id}.json")) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None  # never written, or rotated out
+
+
+profiler = Profiler()
@@ -0,0 +1,366 @@
+"""Similar-listings recommendations.
+
+Each public listing is encoded as one row of a float32 feature matrix made
+of three L2-normalised blocks:
+
+* rent: log-rent spread over RENT_BINS bins with a Gaussian kernel, so
+  nearby rents overlap smoothly;
+* area: one-hot neighbourhood inferred from the title/description;
+* text: hashed bag of title (double weight) and description terms, IDF
+  weighted.
+
+Blocks are scaled by sqrt(weight), so the dot product of two rows is the
+weighted sum of the per-block cosine similarities. Top-k neighbours come
+from batched ``X[batch] @ X.T`` products and live in ``listing_neighbors``;
+reads are a single primary-key range scan.
+
+Listing writes (the ``listings_changed`` signal) are queued to a background
+thread. It re-encodes the changed rows, recomputes their neighbours, and
+recomputes any other listing whose k-th best score the change now beats.
+Those k-th scores are read back from ``listing_neighbors`` whenever the
+matrix is (re)loaded, so the first update after a reload stays incremental.
+The matrix is released after RECOMMENDER_IDLE_SECONDS without updates.
+It is reloaded from the database when older than RECOMMENDER_MAX_AGE, which
+picks up listings written by other processes. A nightly rebuild through the
+lease scheduler recomputes everything.
+"""
+import logging
+import math
+import queue
+import threading
+import time
+import zlib
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import delete, insert, select
+
+from extensions import db
+from signals import listings_changed
+from textutil import NEIGHBOURHOODS, area_of, tokenize
+
+logger = logging.getLogger("maskani.recommender")
+
+TEXT_DIMS = 256
+RENT_BINS = 16
+RENT_RANGE = (math.log(3_000), math.log(500_000))
+WEIGHTS = {"rent": 0.35, "area": 0.35, "text": 0.30}
+FEATURE_DIMS = RENT_BINS + len(NEIGHBOURHOODS) + TEXT_DIMS
+
+_AREA_INDEX = {name: i for i, name in enumerate(NEIGHBOURHOODS)}
+
+
+def _bucket(token):
+    # crc32 rather than hash(): stable across processes and restarts
+    return zlib.crc32(token.encode()) % TEXT_DIMS
+
+
+# =========================================================
+# FEATURES
+# =========================================================
+class FeatureEncoder:
+    """Turns (title, rent, description) rows into the feature matrix."""
+
+    def __init__(self, idf):
+        self.idf = idf
+
+    @classmethod
+    def fit(cls, rows):
+        import numpy as np
+
+        df = np.zeros(TEXT_DIMS, dtype=np.float32)
+        for _, title, _, description in rows:
+            for b in {_bucket(t) for t in tokenize(title) + tokenize(description)}:
+                df[b] += 1
+        idf = np.log((1 + len(rows)) / (1 + df)) + 1.0
+        return cls(idf.astype(np.float32))
+
+    def encode(self, rows):
+        import numpy as np
+
+        n = len(rows)
+        rent = np.zeros((n, RENT_BINS), dtype=np.float32)
+        area = np.zeros((n, len(NEIGHBOURHOODS)), dtype=np.float32)
+        text = np.zeros((n, TEXT_DIMS), dtype=np.float32)
+
+        lo, hi = RENT_RANGE
+        centres = np.arange(RENT_BINS, dtype=np.float32)
+        for i, (_, title, price, description) in enumerate(rows):
+            if price and price > 0:
+                pos = (min(max(math.log(price), lo), hi) - lo) / (hi - lo) * (RENT_BINS - 1)
+                rent[i] = np.exp(-0.5 * (centres - pos) ** 2)
+            name = area_of(title, description)
+            if name:
+                area[i, _AREA_INDEX[name]] = 1.0
+            for t in tokenize(title):
+                text[i, _bucket(t)] += 2.0
+            for t in tokenize(description):
+                text[i, _bucket(t)] += 1.0
+        text *= self.idf
+
+        blocks = []
+        for key, block in (("rent", rent), ("area", area), ("text", text)):
+            norms = np.linalg.norm(block, axis=1, keepdims=True)
+            np.divide(block, norms, out=block, where=norms > 0)
+            blocks.append(block * math.sqrt(WEIGHTS[key]))
+        return np.hstack(blocks).astype(np.float32)
+
+
+# =========================================================
+# RECOMMENDER
+# =========================================================
+class Recommender:
+    def __init__(self):
+        self.app = None
+        self.k = 10
+        self._lock = threading.RLock()
+        self._queue = queue.Queue()
+        self._worker = None
+        self._reset()
+
+    def _reset(self):
+        self._ids = None       # np.int64 listing ids, one per matrix row
+        self._row = {}         # listing id -> row
+        self._X = None
+        self._kth = None       # k-th best neighbour score per row (-inf if < k)
+        self._encoder = None
+        self._loaded_at = 0.0
+        self._used_at = 0.0
+
+    def init_app(self, app):
+        self.app = app
+        self.k = app.config.get("RECOMMENDER_TOP_K", self.k)
+        self.max_age = app.config.get("RECOMMENDER_MAX_AGE", 300)
+        self.idle_seconds = app.config.get("RECOMMENDER_IDLE_SECONDS", 600)
+        listings_changed.connect(self._on_listings_changed, weak=False)
+        app.cli.add_command(recommender_cli)
+
+    # ---- Loading ----
+    def _fetch(self, ids=None):
+        from models import Listing
+
+        query = select(Listing.id, Listing.title, Listing.rent, Listing.short_description) \
+            .where(Listing.public.is_(True))
+        if ids is not None:
+            query = query.where(Listing.id.in_(ids))
+        return db.session.execute(query.order_by(Listing.id)).all()
+
+    def _load(self):
+        import numpy as np
+
+        rows = self._fetch()
+        self._encoder = FeatureEncoder.fit(rows)
+        self._ids = np.array([r[0] for r in rows], dtype=np.int64)
+        self._row = {int(i): n for n, i in enumerate(self._ids)}
+        self._X = self._encoder.encode(rows) if rows else np.zeros((0, FEATURE_DIMS), dtype=np.float32)
+        self._kth = self._stored_kth()
+        self._loaded_at = time.monotonic()
+        logger.info("[RECOMMENDER] loaded %d listings (%.1f MB)", len(rows), self._X.nbytes / 1e6)
+
+    def _stored_kth(self):
+        """k-th best score per row from ``listing_neighbors``, so the first
+        update after a reload only touches rows whose top-k actually changes.
+        Rows without a stored k-th neighbour get -inf and are recomputed."""
+        import numpy as np
+        from models import ListingNeighbor
+
+        kth = np.full(len(self._ids), -np.inf, dtype=np.float32)
+        stored = db.session.execute(
+            select(ListingNeighbor.listing_id, ListingNeighbor.score)
+            .where(ListingNeighbor.rank == self.k - 1)
+        ).all()
+        for listing_id, score in stored:
+            row = self._row.get(listing_id)
+            if row is not None:
+                kth[row] = score
+        return kth
+
+    # ---- Scoring ----
+    def _batch_size(self):
+        # Keep each (batch x n) similarity block around 64 MB
+        return max(1, min(2048, (64 << 20) // (4 * max(1, len(self._ids)))))
+
+    def _topk(self, rows):
+        """Neighbour rows/scores (best first) for matrix rows ``rows``."""
+        import numpy as np
+
+        n = len(self._ids)
+        k = min(self.k, n - 1)
+        if k <= 0:
+            return np.zeros((len(rows), 0), dtype=np.int64), np.zeros((len(rows), 0), dtype=np.float32)
+        sims = self._X[rows] @ self._X.T
+        sims[np.arange(len(rows)), rows] = -np.inf
+        part = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        scores = np.take_along_axis(sims, part, axis=1)
+        order = np.argsort(-scores, axis=1)
+        return np.take_along_axis(part, order, axis=1), np.take_along_axis(scores, order, axis=1)
+
+    def _recompute(self, rows):
+        """Recompute and store neighbours for matrix ``rows``; returns row count written."""
+        from models import ListingNeighbor
+
+        table = ListingNeighbor.__table__
+        written = 0
+        batch = self._batch_size()
+        for start in range(0, len(rows), batch):
+            chunk = rows[start:start + batch]
+            nbrs, scores = self._topk(chunk)
+            listing_ids = [int(self._ids[r]) for r in chunk]
+            payload = []
+            for i, r in enumerate(chunk):
+                self._kth[r] = scores[i, -1] if scores.shape[1] == self.k else -math.inf
+                for rank in range(nbrs.shape[1]):
+                    payload.append({
+                        "listing_id": listing_ids[i],
+                        "rank": rank,
+                        "neighbor_id": int(self._ids[nbrs[i, rank]]),
+                        "score": float(scores[i, rank]),
+                    })
+            # One short transaction per batch: readers never see a listing
+            # without neighbours, and the write lock is never held for long
+            with db.engine.begin() as conn:
+                conn.execute(delete(table).where(table.c.listing_id.in_(listing_ids)))
+                if payload:
+                    conn.execute(insert(table), payload)
+            written += len(payload)
+        return written
+
+    # ---- Public API ----
+    def rebuild(self):
+        """Recompute every listing's neighbours. Returns rows written."""
+        import numpy as np
+        from models import ListingNeighbor
+
+        with self._lock:
+            started = time.perf_counter()
+            self._load()
+            written = self._recompute(np.arange(len(self._ids)))
+            table = ListingNeighbor.__table__
+            with db.engine.begin() as conn:
+                conn.execute(delete(table).where(table.c.listing_id.notin_(self._ids.tolist())))
+            self._used_at = time.monotonic()
+            logger.info("[RECOMMENDER] rebuilt %d neighbour rows in %.1fs",
+                        written, time.perf_counter() - started)
+            return written
+
+    def update(self, ids, deleted=()):
+        """Incrementally refresh neighbours after listings changed."""
+        import numpy as np
+        from models import ListingNeighbor
+
+        with self._lock:
+            now = time.monotonic()
+            if self._X is None or now - self._loaded_at > self.max_age:
+                self._load()
+            self._used_at = now
+
+            fresh = {r[0]: r for r in self._fetch(ids)} if ids else {}
+            removed = set(deleted) | {i for i in ids if i not in fresh}
+
+            # Drop removed/unpublished rows from the matrix
+            gone = [self._row[i] for i in removed if i in self._row]
+            if gone:
+                keep = np.ones(len(self._ids), dtype=bool)
+                keep[gone] = False
+                self._ids, self._X, self._kth = self._ids[keep], self._X[keep], self._kth[keep]
+                self._row = {int(i): n for n, i in enumerate(self._ids)}
+
+            # Re-encode changed rows in place, append new ones
+            if fresh:
+                rows = list(fresh.values())
+                vectors = self._encoder.encode(rows)
+                new = [n for n, r in enumerate(rows) if r[0] not in self._row]
+                for n, r in enumerate(rows):
+                    if r[0] in self._row:
+                        self._X[self._row[r[0]]] = vectors[n]
+                if new:
+                    self._X = np.vstack([self._X, vectors[new]])
+                    self._ids = np.concatenate([self._ids, [rows[n][0] for n in new]])
+                    self._kth = np.concatenate([self._kth, np.full(len(new), -np.inf, dtype=np.float32)])
+                    self._row = {int(i): n for n, i in enumerate(self._ids)}
+
+            changed_rows = [self._row[i] for i in fresh]
+            affected = set(changed_rows)
+            if changed_rows:
+                # Other listings whose k-th best score a changed listing now beats
+                best = (self._X[changed_rows] @ self._X.T).max(axis=0)
+                affected.update(np.nonzero(best > self._kth)[0].tolist())
+
+            table = ListingNeighbor.__table__
+            if removed or fresh:
+                # Listings that pointed at a removed or changed listing hold a
+                # stale entry (and the score above may no longer beat their k-th)
+                referrers = db.session.execute(
+                    select(table.c.listing_id)
+                    .where(table.c.neighbor_id.in_(removed | set(fresh))).distinct()
+                ).scalars().all()
+                affected.update(self._row[i] for i in referrers if i in self._row)
+            if removed:
+                with db.engine.begin() as conn:
+                    conn.execute(delete(table).where(table.c.listing_id.in_(removed)))
+
+            return self._recompute(np.array(sorted(affected), dtype=np.int64))
+
+    def similar(self, listing_id, limit=None):
+        """Neighbouring listings for ``listing_id``, best first."""
+        from models import Listing, ListingNeighbor
+
+        return (
+            db.session.query(Listing, ListingNeighbor.score)
+            .join(ListingNeighbor, ListingNeighbor.neighbor_id == Listing.id)
+            .filter(ListingNeighbor.listing_id == listing_id)
+            .order_by(ListingNeighbor.rank)
+            .limit(limit or self.k)
+            .all()
+        )
+
+    # ---- Background updates ----
+    def _on_listings_changed(self, sender, ids=(), deleted=(), **extra):
+        self._queue.put((list(ids), list(deleted)))
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run_worker, name="recommender", daemon=True)
+            self._worker.start()
+
+    def _run_worker(self):
+        while True:
+            try:
+                ids, deleted = self._queue.get(timeout=self.idle_seconds)
+            except queue.Empty:
+                with self._lock:
+                    if time.monotonic() - self._used_at >= self.idle_seconds:
+                        self._reset()
+                continue
+            time.sleep(1.0)  # let a burst of commits coalesce into one update
+            ids, deleted = set(ids), set(deleted)
+            while not self._queue.empty():
+                more_ids, more_deleted = self._queue.get_nowait()
+                ids.update(more_ids)
+                deleted.update(more_deleted)
+            ids -= deleted
+            with self.app.app_context():
+                try:
+                    self.update(sorted(ids), sorted(deleted))
+                except Exception:
+                    logger.exception("[RECOMMENDER] incremental update failed")
+                finally:
+                    db.session.remove()
+
+
+recommender = Recommender()
+
+
+# =========================================================
+# CLI
+# =========================================================
+@click.group("recommender")
+def recommender_cli():
+    """Similar-listing recommendations."""
+
+
+@recommender_cli.command("rebuild")
+@with_appcontext
+def rebuild_command():
+    """Recompute neighbours for every listing."""
+    started = time.perf_counter()
+    written = recommender.rebuild()
+    print(f"Wrote {written:,} neighbour rows in {time.perf_counter() - started:.1f}s.")
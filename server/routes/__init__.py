@@ -1,6 +1,26 @@
 def init_routes(app):
     from .auth import auth_bp
+    from .autocomplete import autocomplete_bp
     from .bookings import bookings_bp
+    from .dashboard import dashboard_bp
+    from .events import events_bp
+    from .history import history_bp
+    from .imports import imports_bp
+    from .media import media_bp
+    from .profiles import profiles_bp
+    from .recommendations import recommendations_bp
+    from .saved_searches import saved_searches_bp
+    from .sync import sync_bp
 
     app.register_blueprint(auth_bp)
+    app.register_blueprint(autocomplete_bp)
     app.register_blueprint(bookings_bp)
+    app.register_blueprint(dashboard_bp)
+    app.register_blueprint(events_bp)
+    app.register_blueprint(history_bp)
+    app.register_blueprint(imports_bp)
+    app.register_blueprint(media_bp)
+    app.register_blueprint(profiles_bp)
+    app.register_blueprint(recommendations_bp)
+    app.register_blueprint(saved_searches_bp)
+    app.register_blueprint(sync_bp)
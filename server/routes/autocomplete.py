@@ -0,0 +1,37 @@
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import jwt_required
+
+from app import require_role
+from autocomplete import autocomplete
+
+autocomplete_bp = Blueprint("autocomplete", __name__)
+
+MAX_QUERY_LENGTH = 100
+
+
+@autocomplete_bp.route("/api/autocomplete", methods=["GET"])
+def suggest():
+    """Neighbourhood and title suggestions for the search box, heaviest
+    first. Public and cacheable: the same prefix gives the same answer."""
+    q = request.args.get("q", "")[:MAX_QUERY_LENGTH]
+    limit = request.args.get("limit", type=int)
+    if limit is not None and limit < 1:
+        return jsonify({"error": "limit must be a positive integer"}), 400
+
+    response = jsonify({
+        "q": q,
+        "suggestions": [
+            {"text": text, "kind": kind, "weight": round(weight, 2)}
+            for text, kind, weight in autocomplete.suggest(q, limit)
+        ],
+    })
+    response.headers["Cache-Control"] = "public, max-age=60"
+    return response
+
+
+@autocomplete_bp.route("/api/autocomplete/stats", methods=["GET"])
+@jwt_required(optional=True)
+@require_role("admin")
+def autocomplete_stats():
+    """Index size, approximate memory and build time."""
+    return jsonify(autocomplete.stats())
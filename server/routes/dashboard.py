@@ -0,0 +1,58 @@
+from datetime import timedelta
+
+from flask import Blueprint, current_app, jsonify, request
+from flask_jwt_extended import jwt_required
+
+from app import require_role
+from extensions import db
+from models import Listing
+from stats import COUNTERS, dashboard, utc_day, view_buffer
+
+dashboard_bp = Blueprint("dashboard", __name__)
+
+
+def _counts(row):
+    return {c: (round(row[c], 2) if c == "earnings" else int(row[c])) for c in COUNTERS}
+
+
+@dashboard_bp.route("/api/leaser/dashboard", methods=["GET"])
+@jwt_required(optional=True)
+@require_role("leaser", "admin")
+def leaser_dashboard():
+    """Per-day and per-listing counters for the caller's listings, read
+    from listing_stats_daily only."""
+    days = request.args.get("days", 30, type=int)
+    if days is None or days < 1:
+        return jsonify({"error": "days must be a positive integer"}), 400
+    days = min(days, current_app.config["DASHBOARD_MAX_DAYS"])
+    since = utc_day() - timedelta(days=days - 1)
+
+    daily, per_listing = dashboard(request.current_user.id, since)
+    by_day = {row.day: row._mapping for row in daily}
+    series = []
+    for offset in range(days):
+        day = since + timedelta(days=offset)
+        row = by_day.get(day)
+        counts = _counts(row) if row is not None else dict.fromkeys(COUNTERS, 0)
+        series.append(dict(counts, day=day.isoformat()))
+
+    totals = {c: sum(point[c] for point in series) for c in COUNTERS}
+    totals["earnings"] = round(totals["earnings"], 2)
+    return jsonify({
+        "since": since.isoformat(),
+        "days": series,
+        "listings": [
+            dict(_counts(row._mapping), listing_id=row.listing_id, title=row.title)
+            for row in per_listing
+        ],
+        "totals": totals,
+    })
+
+
+@dashboard_bp.route("/api/listings/<int:listing_id>/views", methods=["POST"])
+def record_listing_view(listing_id):
+    """View beacon sent by the listing page; buffered, not written per hit."""
+    if db.session.get(Listing, listing_id) is None:
+        return jsonify({"error": "Listing not found"}), 404
+    view_buffer.record(listing_id)
+    return "", 204
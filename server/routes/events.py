@@ -0,0 +1,56 @@
+import threading
+
+from flask import Blueprint, Response, current_app, jsonify, request
+from flask_jwt_extended import jwt_required
+
+import events
+from app import require_role
+from extensions import db
+
+events_bp = Blueprint("events", __name__)
+
+# Streams open in this worker; each holds a thread (see events.py)
+_open = 0
+_open_lock = threading.Lock()
+
+
+def _release():
+    global _open
+    with _open_lock:
+        _open -= 1
+
+
+@events_bp.route("/api/events", methods=["GET"])
+# EventSource cannot set headers, so the token may also come as ?jwt=
+@jwt_required(optional=True, locations=["headers", "query_string"])
+@require_role("hunter", "leaser", "admin")
+def event_stream():
+    """Server-Sent Events: booking.status, payment.status and stk.status for
+    the caller. Reconnects resume from Last-Event-ID. Production routes this
+    path to `flask events serve`; this thread-per-stream version is capped
+    at SSE_WSGI_MAX_STREAMS."""
+    global _open
+    config = current_app.config
+    with _open_lock:
+        if _open >= config["SSE_WSGI_MAX_STREAMS"]:
+            return jsonify({"error": "Too many open event streams"}), 503, {"Retry-After": "5"}
+        _open += 1
+
+    user_id = request.current_user.id
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get("lastEventId")
+    # The stream opens its own short sessions; don't hold a connection while idle
+    db.session.remove()
+
+    stream = events.stream(
+        current_app._get_current_object(), user_id, last_event_id,
+        heartbeat=config["SSE_HEARTBEAT_SECONDS"],
+        max_seconds=config["SSE_MAX_STREAM_SECONDS"],
+        retry_ms=config["SSE_RETRY_MS"],
+        poll=config["SSE_POLL_SECONDS"],
+    )
+    response = Response(stream, mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",  # nginx: flush each event
+    })
+    response.call_on_close(_release)
+    return response
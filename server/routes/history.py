@@ -0,0 +1,84 @@
+from datetime import datetime
+
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import jwt_required
+
+import archive
+from app import require_role
+from models import Booking, Listing, PaymentLog
+
+history_bp = Blueprint("history", __name__)
+
+MAX_LIMIT = 500
+
+
+def _window():
+    """(since, until, limit) from the query string; raises ValueError."""
+    since = request.args.get("since")
+    until = request.args.get("until")
+    limit = request.args.get("limit", 100, type=int)
+    if limit is None or limit < 1:
+        raise ValueError("limit must be a positive integer")
+    return (
+        datetime.fromisoformat(since) if since else None,
+        datetime.fromisoformat(until) if until else None,
+        min(limit, MAX_LIMIT),
+    )
+
+
+def _rows(pairs):
+    return [dict(row.as_dict(), archived=archived) for row, archived in pairs]
+
+
+def _booking_scope(user):
+    """Column filters limiting bookings to those visible to ``user``."""
+    if user.role.name == "hunter":
+        return {"hunter_id": user.id}
+    if user.role.name == "leaser":
+        ids = [i for (i,) in Listing.query.with_entities(Listing.id).filter_by(owner_id=user.id)]
+        return {"listing_id": ids}
+    return {}
+
+
+@history_bp.route("/api/history/bookings", methods=["GET"])
+@jwt_required(optional=True)
+@require_role("hunter", "leaser", "admin")
+def booking_history():
+    """The caller's bookings, newest first, including archived ones."""
+    try:
+        since, until, limit = _window()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    pairs = archive.history(Booking, since, until, limit, **_booking_scope(request.current_user))
+    return jsonify(_rows(pairs))
+
+
+@history_bp.route("/api/history/bookings/<int:booking_id>", methods=["GET"])
+@jwt_required(optional=True)
+@require_role("hunter", "leaser", "admin")
+def booking_detail(booking_id):
+    booking = archive.find(Booking, booking_id)
+    scope = _booking_scope(request.current_user)
+    if booking is None or not all(
+        getattr(booking, name) in (value if isinstance(value, list) else [value])
+        for name, value in scope.items()
+    ):
+        return jsonify({"error": "Booking not found"}), 404
+    return jsonify(booking.as_dict())
+
+
+@history_bp.route("/api/history/payment-logs", methods=["GET"])
+@jwt_required(optional=True)
+@require_role("admin")
+def payment_log_history():
+    """STK attempts, optionally by phone or checkout request id."""
+    try:
+        since, until, limit = _window()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    filters = {
+        name: request.args[name]
+        for name in ("phone", "checkout_request_id", "receipt_number")
+        if request.args.get(name)
+    }
+    return jsonify(_rows(archive.history(PaymentLog, since, until, limit, **filters)))
@@ -0,0 +1,42 @@
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import jwt_required
+
+from app import require_role
+from extensions import db
+from importer import FORMATS, detect_format, import_listings
+from models import User
+
+imports_bp = Blueprint("imports", __name__)
+
+
+@imports_bp.route("/api/listings/import", methods=["POST"])
+@jwt_required(optional=True)
+@require_role("leaser", "admin")
+def import_listings_endpoint():
+    """Bulk-create listings from a CSV or NDJSON body.
+
+    Send the file as the raw body (Content-Type: text/csv or
+    application/x-ndjson) or as a multipart ``file`` field; ?format=
+    overrides detection. Admins may import for another leaser with
+    ?owner_id=. Responds 200 with per-row errors even if some rows fail.
+    """
+    user = request.current_user
+    owner_id = user.id
+    if user.role.name == "admin" and request.args.get("owner_id"):
+        owner_id = request.args.get("owner_id", type=int)
+        if owner_id is None or db.session.get(User, owner_id) is None:
+            return jsonify({"error": "Unknown owner_id"}), 400
+
+    upload = request.files.get("file") if request.mimetype == "multipart/form-data" else None
+    if upload is not None:
+        stream = upload.stream
+        fmt = detect_format(filename=upload.filename, content_type=upload.mimetype)
+    else:
+        stream = request.stream
+        fmt = detect_format(content_type=request.mimetype)
+    fmt = request.args.get("format") or fmt
+    if fmt not in FORMATS:
+        return jsonify({"error": "Send CSV or NDJSON (or pass ?format=csv|ndjson)"}), 415
+
+    report = import_listings(stream, fmt, owner_id)
+    return jsonify(report.as_dict())
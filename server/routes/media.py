@@ -0,0 +1,110 @@
+import os
+import re
+
+from flask import Blueprint, abort, current_app, jsonify, request, send_file
+from flask_jwt_extended import jwt_required
+
+from app import require_role
+from extensions import db
+from media import (
+    EXTENSIONS, UploadError, ingest_upload, original_path, photo_urls,
+    refresh_listing_photos, thumbnail_path,
+)
+from models import Listing, ListingPhoto
+
+media_bp = Blueprint("media", __name__)
+
+SHA_RE = re.compile(r"^[0-9a-f]{64}$")
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+# =========================================================
+# UPLOADS (raw image body, e.g. Content-Type: image/jpeg)
+# =========================================================
+@media_bp.route("/api/listings/<int:listing_id>/photos", methods=["POST"])
+@jwt_required(optional=True)
+@require_role("leaser", "admin")
+def upload_listing_photo(listing_id):
+    listing = db.session.get(Listing, listing_id)
+    if not listing:
+        return jsonify({"error": "Listing not found"}), 404
+    user = request.current_user
+    if listing.owner_id != user.id and user.role.name != "admin":
+        return jsonify({"error": "Forbidden"}), 403
+
+    try:
+        photo = ingest_upload(request, user)
+    except UploadError as e:
+        return jsonify({"error": str(e)}), e.status
+
+    if not db.session.get(ListingPhoto, (listing.id, photo.id)):
+        position = ListingPhoto.query.filter_by(listing_id=listing.id).count()
+        db.session.add(ListingPhoto(listing_id=listing.id, photo_id=photo.id, position=position))
+        db.session.commit()
+
+    # Thumbnailing may have finished before the link above was committed, in
+    # which case its callback found no listing to refresh: re-read the status
+    db.session.refresh(photo)
+    if photo.status == "ready":
+        refresh_listing_photos(listing.id)
+        db.session.commit()
+
+    return jsonify(photo.as_dict()), 201 if photo.status == "ready" else 202
+
+
+@media_bp.route("/api/users/me/avatar", methods=["POST"])
+@jwt_required(optional=True)
+@require_role("hunter", "leaser", "admin")
+def upload_avatar():
+    user = request.current_user
+    try:
+        photo = ingest_upload(request, user)
+    except UploadError as e:
+        return jsonify({"error": str(e)}), e.status
+
+    # Until thumbnails exist the media route falls back to the original
+    sizes = current_app.config["THUMBNAIL_SIZES"]
+    user.profile_pic = photo_urls(photo.sha256, photo.content_type)[str(sizes[len(sizes) // 2])]
+    db.session.commit()
+
+    return jsonify(photo.as_dict()), 201 if photo.status == "ready" else 202
+
+
+# =========================================================
+# SERVING
+# =========================================================
+@media_bp.route("/media/<sha>/<name>")
+def serve_media(sha, name):
+    if not SHA_RE.match(sha):
+        abort(404)
+    variant, _, ext = name.partition(".")
+
+    if variant == "original":
+        content_type = next((t for t, e in EXTENSIONS.items() if e == ext), None)
+        if content_type is None:
+            abort(404)
+        path = original_path(sha, content_type)
+    elif variant.isdigit() and int(variant) in current_app.config["THUMBNAIL_SIZES"] and ext == "jpg":
+        path = thumbnail_path(sha, int(variant))
+        if not os.path.exists(path):
+            return _serve_pending_thumbnail(sha)
+    else:
+        abort(404)
+
+    if not os.path.exists(path):
+        abort(404)
+    # conditional=True gives us ETag/If-None-Match and Range (206) support
+    resp = send_file(path, conditional=True, etag=f"{sha}-{name}")
+    resp.headers["Cache-Control"] = IMMUTABLE
+    return resp
+
+
+def _serve_pending_thumbnail(sha):
+    """Thumbnail not rendered yet: serve the original without long caching."""
+    for content_type in EXTENSIONS:
+        path = original_path(sha, content_type)
+        if os.path.exists(path):
+            resp = send_file(path, conditional=True)
+            resp.headers["Cache-Control"] = "no-cache"
+            return resp
+    abort(404)
@@ -0,0 +1,62 @@
+from datetime import datetime
+
+from flask import Blueprint, Response, jsonify, request
+from flask_jwt_extended import jwt_required
+
+from app import require_role
+from profiler import HEADER, profiler
+
+profiles_bp = Blueprint("profiles", __name__)
+
+
+@profiles_bp.before_request
+def _require_enabled():
+    if not profiler.enabled:
+        return jsonify({"error": "Profiler is disabled"}), 404
+
+
+@profiles_bp.route("/api/admin/profiles/token", methods=["POST"])
+@jwt_required(optional=True)
+@require_role("admin")
+def profile_token():
+    """Signed value for the X-Profile header; any request carrying it is profiled."""
+    return jsonify({
+        "header": HEADER,
+        "token": profiler.make_token(request.current_user.id),
+        "expires_in": profiler.token_max_age,
+    })
+
+
+@profiles_bp.route("/api/admin/profiles", methods=["GET"])
+@jwt_required(optional=True)
+@require_role("admin")
+def list_profiles():
+    """Stored profiles, newest first. Built from the directory listing
+    alone; fetch /api/admin/profiles/<id> for timings and stacks."""
+    limit = request.args.get("limit", 50, type=int)
+    if limit is None or limit < 1:
+        return jsonify({"error": "limit must be a positive integer"}), 400
+    return jsonify([
+        {
+            "id": profile_id,
+            "label": profile_id.partition("-")[2],
+            "written_at": datetime.utcfromtimestamp(mtime).isoformat(),
+            "size_bytes": size,
+        }
+        for profile_id, size, mtime in profiler.entries(limit)
+    ])
+
+
+@profiles_bp.route("/api/admin/profiles/<profile_id>", methods=["GET"])
+@jwt_required(optional=True)
+@require_role("admin")
+def get_profile(profile_id):
+    """Full profile as JSON, or ?format=collapsed for flamegraph.pl / speedscope."""
+    data = profiler.load(profile_id)
+    if data is None:
+        return jsonify({"error": "Profile not found"}), 404
+    if request.args.get("format") == "collapsed":
+        return Response(data["collapsed"], mimetype="text/plain", headers={
+            "Content-Disposition": f'attachment; filename="{profile_id}.folded"',
+        })
+    return jsonify(data)
@@ -0,0 +1,16 @@
+from flask import Blueprint, jsonify, request
+
+from recommender import recommender
+
+recommendations_bp = Blueprint("recommendations", __name__)
+
+
+@recommendations_bp.route("/api/listings/<int:listing_id>/similar")
+def similar_listings(listing_id):
+    limit = max(1, min(request.args.get("limit", recommender.k, type=int), recommender.k))
+    results = [
+        dict(listing.as_dict(), similarity=round(score, 4))
+        for listing, score in recommender.similar(listing_id, limit)
+        if listing.public
+    ]
+    return jsonify({"listing_id": listing_id, "results": results})
@@ -0,0 +1,77 @@
+from flask import Blueprint, current_app, jsonify, request
+from flask_jwt_extended import jwt_required
+
+from alerts import alert_matcher
+from app import require_role
+from extensions import db
+from models import SavedSearch
+from textutil import area_of, tokenize
+
+saved_searches_bp = Blueprint("saved_searches", __name__)
+
+
+def _rent(data, field):
+    value = data.get(field)
+    if value in (None, ""):
+        return None
+    value = float(value)
+    if value < 0:
+        raise ValueError(f"{field} must not be negative")
+    return value
+
+
+@saved_searches_bp.route("/api/saved-searches", methods=["GET"])
+@jwt_required(optional=True)
+@require_role("hunter")
+def list_saved_searches():
+    searches = SavedSearch.query.filter_by(hunter_id=request.current_user.id) \
+        .order_by(SavedSearch.id).all()
+    return jsonify([s.as_dict() for s in searches])
+
+
+@saved_searches_bp.route("/api/saved-searches", methods=["POST"])
+@jwt_required(optional=True)
+@require_role("hunter")
+def create_saved_search():
+    data = request.get_json() or {}
+    user = request.current_user
+
+    area = None
+    if data.get("area"):
+        area = area_of(data["area"])
+        if not area:
+            return jsonify({"error": f"Unknown area {data['area']!r}"}), 400
+    try:
+        min_rent, max_rent = _rent(data, "min_rent"), _rent(data, "max_rent")
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    if min_rent is not None and max_rent is not None and min_rent > max_rent:
+        return jsonify({"error": "min_rent is greater than max_rent"}), 400
+    keywords = " ".join(sorted(set(tokenize(data.get("keywords") or ""))))
+    if len(keywords) > SavedSearch.keywords.type.length:
+        return jsonify({"error": "Too many keywords"}), 400
+    if not (area or min_rent is not None or max_rent is not None or keywords):
+        return jsonify({"error": "A saved search needs an area, rent range or keywords"}), 400
+
+    if SavedSearch.query.filter_by(hunter_id=user.id).count() >= current_app.config["MAX_SAVED_SEARCHES"]:
+        return jsonify({"error": "Saved search limit reached"}), 400
+
+    search = SavedSearch(hunter_id=user.id, area=area, min_rent=min_rent,
+                         max_rent=max_rent, keywords=keywords or None)
+    db.session.add(search)
+    db.session.commit()
+    alert_matcher.saved(search)
+    return jsonify(search.as_dict()), 201
+
+
+@saved_searches_bp.route("/api/saved-searches/<int:search_id>", methods=["DELETE"])
+@jwt_required(optional=True)
+@require_role("hunter")
+def delete_saved_search(search_id):
+    search = SavedSearch.query.filter_by(id=search_id, hunter_id=request.current_user.id).first()
+    if not search:
+        return jsonify({"error": "Saved search not found"}), 404
+    db.session.delete(search)
+    db.session.commit()
+    alert_matcher.deleted(search_id)
+    return jsonify({"deleted": search_id})
@@ -0,0 +1,94 @@
+import gzip
+import json
+
+from flask import Blueprint, Response, current_app, jsonify, request
+from flask_jwt_extended import jwt_required
+
+from app import require_role
+from sync import PRUNED_THROUGH, changes_since, counter
+
+sync_bp = Blueprint("sync", __name__)
+
+GZIP_MIN_BYTES = 1024
+
+
+def _iso(value):
+    return value.isoformat() if value is not None else None
+
+
+def _json(value):
+    return json.loads(value) if value else []
+
+
+# Fields sent per table, as (name, source column, encoder). One-time viewing
+# codes and other internal columns are never synced.
+FIELDS = {
+    "listings": (
+        ("id", "id", None), ("title", "title", None), ("rent", "rent", None),
+        ("short_description", "short_description", None), ("public", "public", None),
+        ("photos", "photos_json", _json), ("created_at", "created_at", _iso),
+    ),
+    "bookings": (
+        ("id", "id", None), ("hunter_id", "hunter_id", None), ("listing_id", "listing_id", None),
+        ("status", "status", None), ("preferred_slots", "preferred_slots", _json),
+        ("scheduled_slot", "scheduled_slot", None), ("viewed", "viewed", None),
+        ("viewed_at", "viewed_at", _iso), ("created_at", "created_at", _iso),
+        ("expires_at", "expires_at", _iso),
+    ),
+    "payouts": (
+        ("id", "id", None), ("amount", "amount", None), ("status", "status", None),
+        ("created_at", "created_at", _iso),
+    ),
+    "payments": (
+        ("id", "id", None), ("booking_id", "booking_id", None), ("amount", "amount", None),
+        ("status", "status", None), ("mpesa_receipt_number", "mpesa_receipt_number", None),
+        ("created_at", "created_at", _iso),
+    ),
+}
+
+
+def _table(name, rows):
+    """Column-oriented encoding: field names once, then one array per row."""
+    fields = FIELDS[name]
+    return {
+        "fields": [field for field, _, _ in fields],
+        "rows": [
+            [enc(row._mapping[col]) if enc else row._mapping[col] for _, col, enc in fields]
+            for row in rows
+        ],
+    }
+
+
+@sync_bp.route("/api/sync", methods=["GET"])
+@jwt_required(optional=True)
+@require_role("hunter", "leaser", "admin")
+def delta_sync():
+    """Changes to the caller's listings, bookings, payouts and payments.
+
+    Start with since=0 and repeat with the returned cursor while ``more`` is
+    true. ``deleted`` lists ids removed since the cursor. A 410 means the
+    cursor predates retained tombstones: drop local data and sync from 0.
+    """
+    since = request.args.get("since", 0, type=int)
+    if since is None or since < 0:
+        return jsonify({"error": "since must be a cursor returned by this endpoint"}), 400
+    batch = current_app.config["SYNC_BATCH_SIZE"]
+    limit = max(1, min(request.args.get("limit", batch, type=int) or batch, batch))
+    if 0 < since < counter(PRUNED_THROUGH):
+        return jsonify({"error": "Cursor expired; resync from since=0", "reset": True}), 410
+
+    rows, deleted, cursor, more = changes_since(request.current_user, since, limit)
+    body = json.dumps({
+        "cursor": cursor,
+        "more": more,
+        "changes": {name: _table(name, table_rows) for name, table_rows in rows.items()},
+        "deleted": deleted,
+    }, separators=(",", ":")).encode()
+
+    response = Response(body, mimetype="application/json")
+    response.headers["Cache-Control"] = "private, no-store"
+    if len(body) >= GZIP_MIN_BYTES and "gzip" in request.headers.get("Accept-Encoding", ""):
+        response.set_data(gzip.compress(body, 6))
+        response.headers["Content-Encoding"] = "gzip"
+        response.headers["Vary"] = "Accept-Encoding"
+    return response
@@ -0,0 +1,289 @@
+"""Multi-process-safe job scheduling.
+
+Every process that calls ``lease_scheduler.start()`` (``flask scheduler
+run``, or ``python app.py`` in development) runs an APScheduler instance
+with the same jobs, but only the holder of the ``scheduler_leases`` row
+actually executes them. The holder renews the lease every
+``SCHEDULER_HEARTBEAT`` seconds; if it dies, the lease lapses after
+``SCHEDULER_LEASE_TTL`` seconds and the next process to heartbeat takes over.
+The lease is also re-checked immediately before each run, so a process that
+lost it (e.g. after a long GC pause) cannot fire a job another process owns.
+
+A process that fires a job without the lease doesn't just drop it: it waits
+for the holder's ``job_runs`` row and, if none appears before the lease could
+have lapsed (a leader that died just before the cron time), takes the lease
+over and runs the job itself. A run nobody could pick up within the misfire
+grace time is recorded with outcome ``skipped``.
+
+Each execution is recorded in ``job_runs``. Jobs may return an int, which is
+stored as ``rows_affected``.
+
+Lease times come from each host's clock, so hosts must be NTP-synced to well
+within the TTL.
+"""
+import atexit
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import exists, insert, select, update, or_
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db, get_scheduler
+from profiler import profiler
+
+logger = logging.getLogger("maskani.scheduler")
+
+LEASE_NAME = "maskani-jobs"
+MISFIRE_GRACE = 300  # seconds a fired job may wait for the lease
+
+
+class LeaseScheduler:
+    def __init__(self, lease_name=LEASE_NAME):
+        self.lease_name = lease_name
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.ttl = 10
+        self.heartbeat = 3
+        self.app = None
+        self._jobs = []
+        self._started = False
+        self._is_leader = False
+
+    def init_app(self, app):
+        self.app = app
+        self.ttl = app.config.get("SCHEDULER_LEASE_TTL", self.ttl)
+        self.heartbeat = app.config.get("SCHEDULER_HEARTBEAT", self.heartbeat)
+        # Only register here: create_app() also runs for migrations, seeding
+        # and every web worker, none of which should compete for the lease.
+        # Jobs start from 'flask scheduler run' or the dev server entry point.
+        app.cli.add_command(scheduler_cli)
+
+    def add_job(self, func, trigger, name=None, **trigger_args):
+        """Register ``func`` to run on ``trigger`` (an APScheduler trigger or
+        alias such as "cron") in whichever process holds the lease."""
+        name = name or func.__name__
+        self._jobs = [job for job in self._jobs if job[0] != name]
+        self._jobs.append((name, func, trigger, trigger_args))
+
+    # ---- Lease ----
+    def try_acquire(self):
+        """Take or renew the lease. Returns True if this process holds it."""
+        from models import SchedulerLease
+
+        now = datetime.utcnow()
+        expires = now + timedelta(seconds=self.ttl)
+        table = SchedulerLease.__table__
+        with db.engine.begin() as conn:
+            result = conn.execute(
+                update(table)
+                .where(table.c.name == self.lease_name)
+                .where(or_(table.c.holder == self.holder, table.c.expires_at < now))
+                .values(holder=self.holder, expires_at=expires)
+            )
+            held = result.rowcount == 1
+        if not held:
+            try:
+                with db.engine.begin() as conn:
+                    conn.execute(insert(table).values(
+                        name=self.lease_name, holder=self.holder,
+                        acquired_at=now, expires_at=expires,
+                    ))
+                held = True
+            except IntegrityError:
+                held = False
+
+        if held != self._is_leader:
+            logger.info("[SCHEDULER] %s %s lease %s", self.holder,
+                        "acquired" if held else "lost", self.lease_name)
+            if held:
+                with db.engine.begin() as conn:
+                    conn.execute(update(table).where(table.c.name == self.lease_name)
+                                 .values(acquired_at=now))
+        self._is_leader = held
+        return held
+
+    def release(self):
+        """Give the lease up immediately so another process can take over."""
+        from models import SchedulerLease
+
+        table = SchedulerLease.__table__
+        with db.engine.begin() as conn:
+            conn.execute(
+                update(table)
+                .where(table.c.name == self.lease_name, table.c.holder == self.holder)
+                .values(expires_at=datetime.utcnow())
+            )
+        self._is_leader = False
+
+    @property
+    def is_leader(self):
+        return self._is_leader
+
+    # ---- Execution ----
+    def _heartbeat(self):
+        with self.app.app_context():
+            try:
+                self.try_acquire()
+            except Exception:
+                logger.exception("[SCHEDULER] heartbeat failed")
+                self._is_leader = False
+
+    def _ran_since(self, name, since):
+        from models import JobRun
+
+        table = JobRun.__table__
+        with db.engine.connect() as conn:
+            return conn.execute(select(exists().where(
+                table.c.job_name == name, table.c.started_at >= since,
+                table.c.outcome != "skipped",
+            ))).scalar()
+
+    def _await_handover(self, name, since):
+        """Called when ``name`` fired here without the lease. Returns True once
+        this process holds the lease and nobody has run the job since
+        ``since``; False if the holder ran it or the grace time ran out."""
+        deadline = time.monotonic() + min(self.ttl + 2 * self.heartbeat, MISFIRE_GRACE)
+        while time.monotonic() < deadline:
+            time.sleep(self.heartbeat)
+            if self._ran_since(name, since):
+                return False
+            if self.try_acquire():
+                return not self._ran_since(name, since)
+        return False
+
+    def run_job(self, name, func, handover=True):
+        """Run ``func`` if we hold the lease, recording it in ``job_runs``.
+
+        With ``handover`` (scheduled runs), a process without the lease waits
+        to see the job run elsewhere and takes over if it doesn't."""
+        from models import JobRun
+
+        with self.app.app_context():
+            fired_at = datetime.utcnow()
+            if not self.try_acquire():
+                # Every process fires the same cron; allow for clock skew
+                since = fired_at - timedelta(seconds=self.ttl)
+                if not handover:
+                    return None
+                if not self._await_handover(name, since):
+                    if self._ran_since(name, since):
+                        logger.debug("[SCHEDULER] skip %s: ran on the lease holder", name)
+                    else:
+                        logger.warning("[SCHEDULER] %s not run: lease held elsewhere", name)
+                        now = datetime.utcnow()
+                        db.session.add(JobRun(
+                            job_name=name, holder=self.holder, started_at=now,
+                            finished_at=now, outcome="skipped",
+                            error="lease held by another process; no run recorded",
+                        ))
+                        db.session.commit()
+                    return None
+
+            run = JobRun(job_name=name, holder=self.holder, started_at=datetime.utcnow())
+            db.session.add(run)
+            db.session.commit()
+
+            started = time.perf_counter()
+            try:
+                if profiler.wants_job(name):
+                    with profiler.profile(f"job {name}", kind="job"):
+                        result = func()
+                else:
+                    result = func()
+                run.outcome = "success"
+                run.rows_affected = result if isinstance(result, int) else None
+            except Exception as e:
+                db.session.rollback()
+                logger.exception("[SCHEDULER] job %s failed", name)
+                run.outcome = "error"
+                run.error = f"{type(e).__name__}: {e}"
+            run.finished_at = datetime.utcnow()
+            run.duration_ms = (time.perf_counter() - started) * 1000
+            db.session.add(run)
+            db.session.commit()
+            return run.id
+
+    def start(self):
+        if self._started:
+            return
+        scheduler = get_scheduler()
+        scheduler.add_job(self._heartbeat, "interval", seconds=self.heartbeat,
+                          id="lease-heartbeat", next_run_time=datetime.now())
+        for name, func, trigger, trigger_args in self._jobs:
+            scheduler.add_job(
+                self.run_job, trigger, args=(name, func), id=name, name=name,
+                max_instances=1, coalesce=True, misfire_grace_time=MISFIRE_GRACE, **trigger_args,
+            )
+        scheduler.start()
+        atexit.register(self.shutdown)
+        self._started = True
+        logger.info("[SCHEDULER] started as %s with %d jobs", self.holder, len(self._jobs))
+
+    def shutdown(self):
+        if not self._started:
+            return
+        get_scheduler().shutdown(wait=True)
+        with self.app.app_context():
+            self.release()
+        self._started = False
+
+
+lease_scheduler = LeaseScheduler()
+
+
+# =========================================================
+# CLI
+# =========================================================
+@click.group("scheduler")
+def scheduler_cli():
+    """Run and inspect scheduled jobs."""
+
+
+@scheduler_cli.command("run")
+def run_scheduler():
+    """Run a dedicated scheduler process (blocks until interrupted)."""
+    lease_scheduler.start()
+    try:
+        while True:
+            time.sleep(1)
+    except (KeyboardInterrupt, SystemExit):
+        lease_scheduler.shutdown()
+
+
+@scheduler_cli.command("run-job")
+@click.argument("name")
+@with_appcontext
+def run_job_now(name):
+    """Run one registered job now (still subject to the lease)."""
+    jobs = {job[0]: job[1] for job in lease_scheduler._jobs}
+    if name not in jobs:
+        raise click.ClickException(f"Unknown job {name!r}; known: {', '.join(sorted(jobs))}")
+    run_id = lease_scheduler.run_job(name, jobs[name], handover=False)
+    if not lease_scheduler._started:
+        lease_scheduler.release()
+    if run_id is None:
+        raise click.ClickException("Lease is held by another process; not running.")
+    print(f"Recorded job run #{run_id}.")
+
+
+@scheduler_cli.command("status")
+@click.option("--limit", default=20, show_default=True)
+@with_appcontext
+def scheduler_status(limit):
+    """Show the current lease holder and recent job runs."""
+    from models import SchedulerLease, JobRun
+
+    lease = db.session.get(SchedulerLease, lease_scheduler.lease_name)
+    if lease and lease.expires_at > datetime.utcnow():
+        print(f"Leader: {lease.holder} (since {lease.acquired_at}, expires {lease.expires_at})")
+    else:
+        print("Leader: none")
+    for run in JobRun.query.order_by(JobRun.id.desc()).limit(limit):
+        print(f"  #{run.id:<6} {run.job_name:<20} {run.outcome:<8} "
+              f"{run.started_at:%Y-%m-%d %H:%M:%S}  {run.duration_ms or 0:8.1f} ms  "
+              f"rows={run.rows_affected}")
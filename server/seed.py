@@ -1,148 +1,330 @@
-from app import app, db
+"""Synthetic data generator.
+
+Builds a referentially consistent dataset of any size for local development
+and capacity testing:
+
+    flask seed                 # ~5k rows
+    flask seed --scale 500     # ~2.7M rows
+
+Rows are generated with explicit primary keys from a seeded RNG, so the same
+``--scale``/``--seed`` pair always produces the same database. Everything is
+written through Core ``executemany`` in one transaction per table; the ORM is
+never involved and the (deliberately slow) password hash is computed once.
+The derived tables the ORM hooks would maintain (listing stats, similar-listing
+neighbours) are rebuilt at the end.
+"""
+import json
+import random
+import time
+from array import array
+from datetime import datetime, timedelta
+from itertools import islice
+
+from werkzeug.security import generate_password_hash
+
+import stats
+import sync
+from extensions import db
 from models import (
-    User, Role, Listing, Booking, Earnings, Payout, FcmToken
+    Role, User, Listing, Booking, Earnings, Payout, Payment, PaymentLog, FcmToken
 )
-from datetime import datetime, timedelta
+from recommender import recommender
+
+# Rows generated per unit of --scale
+USERS_PER_SCALE = 1000
+LEASER_SHARE = 0.2          # the rest are hunters
+MAX_LISTINGS_PER_LEASER = 5
+BOOKINGS_PER_HUNTER = 2
+PAYOUTS_PER_LEASER = 2
+FCM_SHARE = 0.6
+
+CHUNK_SIZE = 10_000
+DEFAULT_PASSWORD = "password123"
+
+NEIGHBOURHOODS = {
+    # name: rent multiplier
+    "Kilimani": 1.3, "Westlands": 1.5, "Kileleshwa": 1.4, "Lavington": 1.6,
+    "Karen": 1.8, "Runda": 2.0, "Parklands": 1.2, "South B": 0.9,
+    "South C": 1.0, "Langata": 1.1, "Rongai": 0.6, "Kitengela": 0.6,
+    "Ruaka": 0.8, "Kasarani": 0.7, "Roysambu": 0.7, "Embakasi": 0.7,
+    "Donholm": 0.7, "Umoja": 0.6, "Githurai": 0.5, "Ngong": 0.7,
+    "Syokimau": 0.8, "Madaraka": 0.9, "Upper Hill": 1.5, "Kahawa West": 0.6,
+}
+
+UNIT_TYPES = {
+    # name: base monthly rent (KES)
+    "Bedsitter": 10000, "Studio": 16000, "1 Bedroom": 25000,
+    "2 Bedroom Apartment": 40000, "3 Bedroom Apartment": 60000,
+    "3 Bedroom Maisonette": 85000, "4 Bedroom Townhouse": 120000,
+}
+
+AMENITIES = [
+    "balcony", "parking", "borehole water", "backup generator", "lift",
+    "gym", "swimming pool", "CCTV", "24hr security", "fibre internet",
+    "servant quarter", "garden", "open-plan kitchen", "en-suite master",
+    "close to matatu stage", "near shopping mall", "prepaid tokens",
+]
+
+FIRST_NAMES = [
+    "Jane", "Mike", "Anna", "Mark", "Wanjiru", "Otieno", "Achieng", "Kamau",
+    "Njeri", "Kiprono", "Mwangi", "Akinyi", "Wafula", "Chebet", "Mutua",
+    "Nafula", "Omondi", "Wambui", "Kibet", "Atieno", "Muthoni", "Barasa",
+]
+LAST_NAMES = [
+    "Mwangi", "Otieno", "Kariuki", "Ochieng", "Njoroge", "Kiptoo", "Wanjala",
+    "Mutiso", "Odhiambo", "Kamau", "Cheruiyot", "Maina", "Onyango", "Ruto",
+    "Kimani", "Nyambura", "Owino", "Kilonzo", "Macharia", "Were",
+]
+
+BOOKING_STATUSES = ["pending", "confirmed", "completed", "expired", "cancelled"]
+BOOKING_WEIGHTS = [30, 25, 25, 12, 8]
+
+
+# =========================================================
+# HELPERS
+# =========================================================
+def _chunked(rows, size=CHUNK_SIZE):
+    it = iter(rows)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _bulk_insert(conn, model, rows):
+    """executemany ``rows`` into ``model``'s table inside one transaction."""
+    table = model.__table__
+    started = time.perf_counter()
+    total = 0
+    with conn.begin():
+        for chunk in _chunked(rows):
+            conn.execute(table.insert(), chunk)
+            total += len(chunk)
+    elapsed = time.perf_counter() - started
+    rate = total / elapsed if elapsed else total
+    print(f"  {table.name:<14} {total:>10,} rows  {elapsed:6.1f}s  ({rate:,.0f} rows/s)")
+    return total
+
+
+def _phone(rng):
+    return f"2547{rng.randint(0, 99_999_999):08d}"
+
+
+def _receipt(rng):
+    alphabet = "ABCDEFGHJKLMNPQRSTUVWXYZ0123456789"
+    return "".join(rng.choice(alphabet) for _ in range(10))
+
+
+# =========================================================
+# GENERATORS
+# =========================================================
+def _users(rng, n_users, n_leasers, role_ids, password_hash, now):
+    for uid in range(1, n_users + 1):
+        first = rng.choice(FIRST_NAMES)
+        last = rng.choice(LAST_NAMES)
+        role = "leaser" if uid <= n_leasers else "hunter"
+        username = f"{first.lower()}.{last.lower()}{uid}"
+        yield {
+            "id": uid,
+            "username": username,
+            "email": f"{username}@maskani.test",
+            "_password_hash": password_hash,
+            "role_id": role_ids[role],
+            "created_at": now - timedelta(days=rng.uniform(30, 730)),
+        }
 
-with app.app_context():
-    print("Dropping all tables...")
-    db.drop_all()
 
+def _listings(rng, n_leasers, owners, now):
+    """Yield listing rows, appending each listing's owner id to ``owners``."""
+    areas = list(NEIGHBOURHOODS)
+    units = list(UNIT_TYPES)
+    lid = 0
+    for owner_id in range(1, n_leasers + 1):
+        for _ in range(rng.randint(1, MAX_LISTINGS_PER_LEASER)):
+            lid += 1
+            area = rng.choice(areas)
+            unit = rng.choice(units)
+            rent = UNIT_TYPES[unit] * NEIGHBOURHOODS[area] * rng.uniform(0.85, 1.2)
+            amenities = rng.sample(AMENITIES, rng.randint(2, 4))
+            owners.append(owner_id)
+            yield {
+                "id": lid,
+                "owner_id": owner_id,
+                "title": f"{unit} in {area}",
+                "rent": round(rent / 500) * 500,
+                "short_description": f"{unit} in {area} with {', '.join(amenities)}.",
+                "public": rng.random() < 0.9,
+                "created_at": now - timedelta(days=rng.uniform(1, 365)),
+            }
+
+
+def _bookings(rng, first_hunter, n_users, owners, completed, now):
+    """Yield booking rows, collecting (id, hunter, listing) of completed ones."""
+    n_listings = len(owners)
+    bid = 0
+    for hunter_id in range(first_hunter, n_users + 1):
+        for _ in range(rng.randint(0, 2 * BOOKINGS_PER_HUNTER)):
+            bid += 1
+            listing_id = rng.randint(1, n_listings)
+            status = rng.choices(BOOKING_STATUSES, BOOKING_WEIGHTS)[0]
+            created = now - timedelta(days=rng.uniform(0, 180))
+            slots = [
+                (created + timedelta(days=rng.randint(1, 7), hours=rng.choice((9, 11, 14, 16))))
+                .strftime("%Y-%m-%d %H:00")
+                for _ in range(rng.randint(1, 3))
+            ]
+            scheduled = slots[0] if status in ("confirmed", "completed") else None
+            viewed = status == "completed"
+            if viewed:
+                completed.append((bid, hunter_id, listing_id))
+            yield {
+                "id": bid,
+                "hunter_id": hunter_id,
+                "listing_id": listing_id,
+                "leaser_id": owners[listing_id - 1] if scheduled else None,
+                "preferred_slots": json.dumps(slots),
+                "status": status,
+                "created_at": created,
+                "expires_at": created + timedelta(hours=72),
+                "scheduled_slot": scheduled,
+                "one_time_code": None,
+                "code_generated_at": None,
+                "viewed": viewed,
+                "viewed_at": created + timedelta(days=rng.randint(1, 7)) if viewed else None,
+            }
+
+
+def _payments(rng, completed, now):
+    for pid, (booking_id, hunter_id, _) in enumerate(completed, start=1):
+        yield {
+            "id": pid,
+            "booking_id": booking_id,
+            "user_id": hunter_id,
+            "amount": 500.0,
+            "status": "COMPLETED",
+            "mpesa_receipt_number": _receipt(rng),
+            "created_at": now - timedelta(days=rng.uniform(0, 180)),
+        }
+
+
+def _payment_logs(rng, n_logs, now):
+    for log_id in range(1, n_logs + 1):
+        status = rng.choices(("completed", "failed", "initiated"), (70, 20, 10))[0]
+        yield {
+            "id": log_id,
+            "phone": _phone(rng),
+            "amount": 500.0,
+            "status": status,
+            "receipt_number": _receipt(rng) if status == "completed" else None,
+            "merchant_request_id": f"{rng.randint(10000, 99999)}-{log_id}-1",
+            "checkout_request_id": f"ws_CO_{rng.getrandbits(48):012x}",
+            "description": "Viewing booking fee",
+            "created_at": now - timedelta(days=rng.uniform(0, 365)),
+        }
+
+
+def _earnings(rng, n_leasers):
+    for leaser_id in range(1, n_leasers + 1):
+        yield {
+            "id": leaser_id,
+            "leaser_id": leaser_id,
+            "balance": float(rng.randint(0, 40) * 50),
+        }
+
+
+def _payouts(rng, n_leasers, now):
+    pid = 0
+    for leaser_id in range(1, n_leasers + 1):
+        for _ in range(rng.randint(0, 2 * PAYOUTS_PER_LEASER)):
+            pid += 1
+            created = now - timedelta(weeks=rng.randint(0, 26))
+            yield {
+                "id": pid,
+                "leaser_id": leaser_id,
+                "amount": float(rng.randint(1, 40) * 50),
+                "status": "paid" if created < now - timedelta(days=7) else "pending",
+                "created_at": created,
+            }
+
+
+def _fcm_tokens(rng, n_users, now):
+    tid = 0
+    for user_id in range(1, n_users + 1):
+        if rng.random() < FCM_SHARE:
+            tid += 1
+            yield {
+                "id": tid,
+                "user_id": user_id,
+                "token": f"fcm_{rng.getrandbits(128):032x}",
+                "created_at": now - timedelta(days=rng.uniform(0, 90)),
+            }
+
+
+# =========================================================
+# ENTRY POINT
+# =========================================================
+def run_seed(scale=1, seed=42, drop=True):
+    """Generate ``scale`` units of synthetic data (see module docstring)."""
+    rng = random.Random(seed)
+    now = datetime(2025, 6, 1)  # fixed so reruns are byte-identical
+
+    n_users = max(2, int(scale * USERS_PER_SCALE))
+    n_leasers = max(1, int(n_users * LEASER_SHARE))
+
+    if drop:
+        print("Dropping all tables...")
+        db.drop_all()
     print("Creating all tables...")
     db.create_all()
 
-    # ---------------------------------------------------
-    # SEED ROLES
-    # ---------------------------------------------------
-    print("Seeding roles...")
-
-    hunter_role = Role.create("hunter")
-    leaser_role = Role.create("leaser")
-    admin_role = Role.create("admin")  # Role exists but no user uses it yet
-
-    db.session.commit()
-    print("Roles seeded.")
-
-    # ---------------------------------------------------
-    # SEED USERS (NO ADMIN CREATED)
-    # ---------------------------------------------------
-    print("Seeding users...")
-
-    # Hunters
-    hunter1 = User(username="hunter_jane", email="jane@maskani.com", role_id=hunter_role.id)
-    hunter1.set_password("password123")
-
-    hunter2 = User(username="hunter_mike", email="mike@maskani.com", role_id=hunter_role.id)
-    hunter2.set_password("password123")
-
-    # Leasers
-    leaser1 = User(username="leaser_anna", email="anna@maskani.com", role_id=leaser_role.id)
-    leaser1.set_password("leaserpass")
-
-    leaser2 = User(username="leaser_mark", email="mark@maskani.com", role_id=leaser_role.id)
-    leaser2.set_password("leaserpass")
-
-    db.session.add_all([hunter1, hunter2, leaser1, leaser2])
-    db.session.commit()
-    print("Users seeded.")
-
-    # ---------------------------------------------------
-    # SEED LISTINGS
-    # ---------------------------------------------------
-    print("Seeding listings...")
-
-    listing1 = Listing(
-        owner_id=leaser1.id,
-        title="2 Bedroom Apartment in Kilimani",
-        rent=45000,
-        short_description="Modern 2 bedroom apartment with balcony and parking.",
-        public=True
-    )
-
-    listing2 = Listing(
-        owner_id=leaser2.id,
-        title="Bedsitter in Rongai",
-        rent=12000,
-        short_description="Affordable single room with running water.",
-        public=True
-    )
-
-    listing3 = Listing(
-        owner_id=leaser2.id,
-        title="1 Bedroom in Westlands",
-        rent=35000,
-        short_description="Cozy 1 bedroom close to malls and restaurants.",
-        public=True
-    )
-
-    db.session.add_all([listing1, listing2, listing3])
-    db.session.commit()
-    print("Listings seeded.")
-
-    # ---------------------------------------------------
-    # SEED BOOKINGS
-    # ---------------------------------------------------
-    print("Seeding bookings...")
-
-    booking1 = Booking(
-        hunter_id=hunter1.id,
-        listing_id=listing1.id,
-        preferred_slots='["2025-03-02 10:00", "2025-03-02 15:00"]',
-        status="confirmed",
-        scheduled_slot="2025-03-02 10:00",
-        expires_at=datetime.utcnow() + timedelta(hours=72),
-        leaser_id=leaser1.id
-    )
-
-    booking2 = Booking(
-        hunter_id=hunter2.id,
-        listing_id=listing2.id,
-        preferred_slots='["2025-03-05 12:00"]',
-        status="pending",
-        expires_at=datetime.utcnow() + timedelta(hours=72)
-    )
-
-    db.session.add_all([booking1, booking2])
-    db.session.commit()
-    print("Bookings seeded.")
-
-    # ---------------------------------------------------
-    # SEED EARNINGS
-    # ---------------------------------------------------
-    print("Seeding earnings...")
-
-    earnings1 = Earnings(leaser_id=leaser1.id, balance=200.0)
-    earnings2 = Earnings(leaser_id=leaser2.id, balance=100.0)
-
-    db.session.add_all([earnings1, earnings2])
-    db.session.commit()
-    print("Earnings seeded.")
-
-    # ---------------------------------------------------
-    # SEED PAYOUTS
-    # ---------------------------------------------------
-    print("Seeding payout queue...")
-
-    payout1 = Payout(
-        leaser_id=leaser1.id,
-        amount=200.0,
-        status="pending"
-    )
-
-    db.session.add(payout1)
-    db.session.commit()
-    print("Payout seeded.")
-
-    # ---------------------------------------------------
-    # SEED FCM TOKENS
-    # ---------------------------------------------------
-    print("Seeding FCM tokens...")
-
-    token1 = FcmToken(user_id=leaser1.id, token="fcm_token_anna")
-    token2 = FcmToken(user_id=hunter1.id, token="fcm_token_jane")
-
-    db.session.add_all([token1, token2])
-    db.session.commit()
-    print("FCM tokens seeded.")
-
-    print("Database seeding complete!")
+    print("Hashing shared password...")
+    password_hash = generate_password_hash(DEFAULT_PASSWORD)
+
+    print(f"Seeding scale={scale} seed={seed}...")
+    started = time.perf_counter()
+    owners = array("I")
+    completed = []
+    total = 0
+
+    with db.engine.connect() as conn:
+        sqlite = conn.dialect.name == "sqlite"
+        if sqlite:
+            # Bulk load: skip fsync per transaction; restored below
+            conn.exec_driver_sql("PRAGMA synchronous=OFF")
+            conn.commit()
+        try:
+            role_ids = {"hunter": 1, "leaser": 2, "admin": 3}
+            total += _bulk_insert(conn, Role, ({"id": i, "name": n} for n, i in role_ids.items()))
+            total += _bulk_insert(conn, User, _users(rng, n_users, n_leasers, role_ids, password_hash, now))
+            total += _bulk_insert(conn, Listing, _listings(rng, n_leasers, owners, now))
+            total += _bulk_insert(conn, Booking, _bookings(rng, n_leasers + 1, n_users, owners, completed, now))
+            total += _bulk_insert(conn, Payment, _payments(rng, completed, now))
+            total += _bulk_insert(conn, PaymentLog, _payment_logs(rng, int(len(completed) * 1.5), now))
+            total += _bulk_insert(conn, Earnings, _earnings(rng, n_leasers))
+            total += _bulk_insert(conn, Payout, _payouts(rng, n_leasers, now))
+            total += _bulk_insert(conn, FcmToken, _fcm_tokens(rng, n_users, now))
+            with conn.begin():
+                sync.renumber(conn)
+        finally:
+            if sqlite:
+                conn.exec_driver_sql("PRAGMA synchronous=FULL")
+                conn.commit()
+
+    # The bulk load bypasses the ORM hooks that maintain these tables
+    print("Backfilling listing stats...")
+    stats.backfill()
+    print("Rebuilding similar-listing neighbours...")
+    recommender.rebuild()
+
+    elapsed = time.perf_counter() - started
+    print(f"Database seeding complete! {total:,} rows in {elapsed:.1f}s")
+    print(f"All users share the password '{DEFAULT_PASSWORD}'.")
+    return total
+
+
+if __name__ == "__main__":
+    from app import create_app
+
+    with create_app().app_context():
+        run_seed()
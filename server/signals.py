@@ -0,0 +1,71 @@
+"""Application signals.
+
+``listings_changed`` fires after a commit that inserted, updated or deleted
+listings, once per commit with all affected ids:
+
+    listings_changed.send(app, ids=[...], created=[...], deleted=[...])
+
+``ids`` covers inserted and updated listings; ``created`` is the inserted
+subset.
+
+ORM writes are picked up automatically by the session hooks below; code
+that writes listings through Core (bulk imports) must send it itself.
+Receivers run in the committing thread, so anything slow should be handed
+off to a background worker.
+"""
+from blinker import Namespace
+from sqlalchemy import event
+
+from extensions import db
+
+_signals = Namespace()
+
+listings_changed = _signals.signal("listings-changed")
+
+
+def _collect_listing_changes(session, flush_context):
+    from models import Listing
+
+    changed = session.info.setdefault("changed_listing_ids", set())
+    created = session.info.setdefault("created_listing_ids", set())
+    deleted = session.info.setdefault("deleted_listing_ids", set())
+    for obj in session.new:
+        if isinstance(obj, Listing):
+            changed.add(obj.id)
+            created.add(obj.id)
+    for obj in session.dirty:
+        if isinstance(obj, Listing) and session.is_modified(obj, include_collections=False):
+            changed.add(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, Listing):
+            deleted.add(obj.id)
+
+
+def _send_listing_changes(session):
+    from flask import current_app
+
+    changed = session.info.pop("changed_listing_ids", None)
+    created = session.info.pop("created_listing_ids", None) or set()
+    deleted = session.info.pop("deleted_listing_ids", None)
+    if not changed and not deleted:
+        return
+    deleted = deleted or set()
+    listings_changed.send(
+        current_app._get_current_object(),
+        ids=sorted((changed or set()) - deleted),
+        created=sorted(created - deleted),
+        deleted=sorted(deleted),
+    )
+
+
+def _discard_listing_changes(session):
+    session.info.pop("changed_listing_ids", None)
+    session.info.pop("created_listing_ids", None)
+    session.info.pop("deleted_listing_ids", None)
+
+
+def init_app(app):
+    if not event.contains(db.session, "after_flush", _collect_listing_changes):
+        event.listen(db.session, "after_flush", _collect_listing_changes)
+        event.listen(db.session, "after_commit", _send_listing_changes)
+        event.listen(db.session, "after_rollback", _discard_listing_changes)
@@ -0,0 +1,86 @@
+"""Cold-start profiling.
+
+``flask startup-profile`` imports the app in a fresh interpreter under
+``python -X importtime``, builds it with ``create_app()`` and reports where
+the time went. With ``--budget-ms`` (or ``STARTUP_BUDGET_MS``) it exits
+non-zero when the cold start is over budget, so CI can guard against a new
+eager import creeping back in. tests/test_startup_profile.py enforces the
+same budget under pytest.
+"""
+import os
+import subprocess
+import sys
+from collections import namedtuple
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+SERVER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+ImportTiming = namedtuple("ImportTiming", "module self_us cumulative_us")
+
+# Runs in the child interpreter; prints create_app() wall time on stdout
+_PROBE = (
+    "import time; t = time.perf_counter(); "
+    "import app; app.create_app(); "
+    "print(int((time.perf_counter() - t) * 1e6))"
+)
+
+
+def parse_importtime(stderr):
+    """Parse ``-X importtime`` output into a list of ImportTiming."""
+    timings = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        parts = line.split(":", 1)[1].split("|")
+        if len(parts) != 3:
+            continue
+        self_us, cumulative_us, name = parts
+        timings.append(ImportTiming(name.strip(), int(self_us), int(cumulative_us)))
+    return timings
+
+
+def profile_cold_start():
+    """Return (create_app wall time in us, import timings) from a fresh process."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE],
+        cwd=SERVER_DIR, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise click.ClickException(f"create_app() failed in child process:\n{proc.stderr[-2000:]}")
+    wall_us = int(proc.stdout.strip().splitlines()[-1])
+    return wall_us, parse_importtime(proc.stderr)
+
+
+@click.command("startup-profile")
+@click.option("--top", default=20, show_default=True, help="Number of modules to list.")
+@click.option("--budget-ms", type=float, default=None,
+              help="Fail if create_app() takes longer. Defaults to STARTUP_BUDGET_MS.")
+@with_appcontext
+def startup_profile(top, budget_ms):
+    """Report per-module import time of a cold start."""
+    budget_ms = budget_ms if budget_ms is not None else current_app.config.get("STARTUP_BUDGET_MS")
+    wall_us, timings = profile_cold_start()
+
+    packages = {}
+    for t in timings:
+        root = t.module.split(".", 1)[0]
+        packages[root] = packages.get(root, 0) + t.self_us
+    slowest = sorted(timings, key=lambda t: -t.self_us)
+
+    click.echo(f"Cold start (import app + create_app): {wall_us / 1000:.1f} ms, "
+               f"{len(timings)} modules imported\n")
+    click.echo("Packages by total import time:")
+    for name, us in sorted(packages.items(), key=lambda kv: -kv[1])[:top]:
+        click.echo(f"  {us / 1000:9.1f} ms  {name}")
+    click.echo("\nModules by self time:")
+    for t in slowest[:top]:
+        click.echo(f"  {t.self_us / 1000:9.1f} ms  {t.module}")
+
+    if budget_ms:
+        if wall_us / 1000 > budget_ms:
+            click.echo(f"\nOVER BUDGET: {wall_us / 1000:.1f} ms > {budget_ms:.0f} ms", err=True)
+            sys.exit(1)
+        click.echo(f"\nWithin budget ({budget_ms:.0f} ms).")
@@ -0,0 +1,295 @@
+"""Per-listing daily counters for the leaser dashboard.
+
+``listing_stats_daily`` holds one row per (listing, day) with views,
+booking requests, confirmations, viewings and earnings. It is maintained
+incrementally, so the dashboard never runs COUNT/SUM over bookings or
+payments:
+
+* booking and payment changes are turned into upserts by an ``after_flush``
+  hook and written on the flushing connection, in the same transaction as
+  the change itself;
+* views are buffered in memory and flushed every STATS_VIEW_FLUSH_SECONDS,
+  so a page view is not a write transaction.
+
+All days are UTC dates (``utc_day``). Each counter describes the rows as they
+are now, and the hook and ``flask stats backfill`` apply the same rules:
+
+* booking_requests: every booking, on its request day;
+* confirmations: bookings whose status is in CONFIRMED_STATUSES, on the
+  request day (there is no status-change timestamp);
+* viewings: bookings with ``viewed`` set and a ``viewed_at``, on that day;
+* earnings: payments in PAID_STATUSES, on the payment's creation day.
+
+The hook adds the difference between a row's contribution before and after
+the flush, so a booking that is confirmed and later cancelled (or a payment
+that is reversed) is taken back out. Backfill rebuilds everything except
+views (which have no history) from bookings and payments, so it reproduces
+the live numbers. Bookings moved out by archive.py still count: backfill
+reads them from the archive segments, and archiving itself never changes the
+rollups.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import event, func, inspect, select, true, update
+
+from extensions import db
+
+logger = logging.getLogger("maskani.stats")
+
+COUNTERS = ("views", "booking_requests", "confirmations", "viewings", "earnings")
+CONFIRMED_STATUSES = ("confirmed", "completed")
+PAID_STATUSES = ("COMPLETED",)
+
+
+def _upsert(dialect_name):
+    """Dialect-specific INSERT ... ON CONFLICT (SQLite and PostgreSQL)."""
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
+def apply_deltas(conn, deltas):
+    """Add ``{(listing_id, day): {counter: n}}`` to the rollup table."""
+    from models import ListingStatsDaily
+
+    if not deltas:
+        return
+    table = ListingStatsDaily.__table__
+    insert = _upsert(conn.dialect.name)
+    # Group by the set of counters touched so each group is one executemany
+    groups = defaultdict(list)
+    for (listing_id, day), counts in deltas.items():
+        row = {c: counts.get(c, 0) for c in COUNTERS}
+        row.update(listing_id=listing_id, day=day)
+        groups[tuple(sorted(k for k, v in counts.items() if v))].append(row)
+    for touched, rows in groups.items():
+        if not touched:
+            continue
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.listing_id, table.c.day],
+            set_={c: table.c[c] + stmt.excluded[c] for c in touched},
+        )
+        conn.execute(stmt, rows)
+
+
+def utc_day(value=None):
+    """UTC date of a naive-UTC ``value`` (default: now); every rollup day."""
+    return (value or datetime.utcnow()).date()
+
+
+# =========================================================
+# TRANSACTIONAL HOOK
+# =========================================================
+def _booking_counts(listing_id, created_at, status, viewed, viewed_at):
+    """``(key, counter, n)`` one booking contributes to the rollups."""
+    day = utc_day(created_at)
+    yield (listing_id, day), "booking_requests", 1
+    if status in CONFIRMED_STATUSES:
+        yield (listing_id, day), "confirmations", 1
+    if viewed and viewed_at is not None:
+        yield (listing_id, utc_day(viewed_at)), "viewings", 1
+
+
+def _earned(status, amount):
+    """Earnings one payment contributes."""
+    return (amount or 0.0) if status in PAID_STATUSES else 0.0
+
+
+def _previous(state, key):
+    # Only for active_history columns: ``deleted`` then holds the loaded
+    # value even if the object was expired before the change
+    history = state.attrs[key].history
+    if history.deleted:
+        return history.deleted[0]
+    return None if history.added else getattr(state.obj(), key)
+
+
+def _collect_deltas(session, flush_context):
+    from models import Booking, Payment
+
+    deltas = defaultdict(lambda: defaultdict(float))
+
+    def add(counts, sign):
+        for key, counter, n in counts:
+            deltas[key][counter] += sign * n
+
+    changed = [(obj, True, False) for obj in session.new]
+    changed += [(obj, False, False) for obj in session.dirty]
+    changed += [(obj, False, True) for obj in session.deleted]
+    for obj, is_new, is_deleted in changed:
+        state = inspect(obj)
+        if isinstance(obj, Booking):
+            fields = ("status", "viewed", "viewed_at")
+            before = None if is_new else tuple(_previous(state, f) for f in fields)
+            after = None if is_deleted else tuple(getattr(obj, f) for f in fields)
+            if before == after:
+                continue
+            if before is not None:
+                add(_booking_counts(obj.listing_id, obj.created_at, *before), -1)
+            if after is not None:
+                add(_booking_counts(obj.listing_id, obj.created_at, *after), 1)
+        elif isinstance(obj, Payment) and obj.booking_id:
+            before = 0.0 if is_new else _earned(_previous(state, "status"), _previous(state, "amount"))
+            after = 0.0 if is_deleted else _earned(obj.status, obj.amount)
+            if before == after:
+                continue
+            with session.no_autoflush:
+                booking = session.get(Booking, obj.booking_id)
+            if booking:
+                deltas[(booking.listing_id, utc_day(obj.created_at))]["earnings"] += after - before
+    if deltas:
+        apply_deltas(session.connection(), deltas)
+
+
+# =========================================================
+# BUFFERED VIEW COUNTS
+# =========================================================
+class ViewBuffer:
+    def __init__(self):
+        self.app = None
+        self._counts = defaultdict(int)
+        self._lock = threading.Lock()
+        self._flusher = None
+
+    def init_app(self, app):
+        self.app = app
+        self.interval = app.config.get("STATS_VIEW_FLUSH_SECONDS", 10)
+
+    def record(self, listing_id):
+        with self._lock:
+            self._counts[(listing_id, utc_day())] += 1
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._run, name="stats-views", daemon=True)
+                self._flusher.start()
+
+    def flush(self):
+        with self._lock:
+            counts, self._counts = self._counts, defaultdict(int)
+        if counts:
+            with db.engine.begin() as conn:
+                apply_deltas(conn, {key: {"views": n} for key, n in counts.items()})
+        return len(counts)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                with self.app.app_context():
+                    self.flush()
+            except Exception:
+                logger.exception("[STATS] view flush failed")
+
+
+view_buffer = ViewBuffer()
+
+
+def init_app(app):
+    view_buffer.init_app(app)
+    app.cli.add_command(stats_cli)
+    if not event.contains(db.session, "after_flush", _collect_deltas):
+        event.listen(db.session, "after_flush", _collect_deltas)
+
+
+# =========================================================
+# DASHBOARD QUERIES
+# =========================================================
+def dashboard(owner_id, since):
+    """Daily series and per-listing totals for ``owner_id`` from ``since``."""
+    from models import Listing, ListingStatsDaily as S
+
+    sums = [func.coalesce(func.sum(S.__table__.c[c]), 0).label(c) for c in COUNTERS]
+    scope = (S.listing_id == Listing.id, Listing.owner_id == owner_id, S.day >= since)
+
+    daily = db.session.execute(
+        select(S.day, *sums).join(Listing, scope[0]).where(*scope[1:])
+        .group_by(S.day).order_by(S.day)
+    ).all()
+    per_listing = db.session.execute(
+        select(S.listing_id, Listing.title, *sums).join(Listing, scope[0]).where(*scope[1:])
+        .group_by(S.listing_id, Listing.title).order_by(S.listing_id)
+    ).all()
+    return daily, per_listing
+
+
+# =========================================================
+# CLI
+# =========================================================
+@click.group("stats")
+def stats_cli():
+    """Leaser dashboard rollups."""
+
+
+def _archived_booking_deltas():
+    """Rollup deltas of bookings archive.py has moved out of the hot table.
+    Archived bookings never have payments, so they carry no earnings."""
+    from archive import archived_columns
+    from models import Booking
+
+    deltas = defaultdict(lambda: defaultdict(float))
+    for columns in archived_columns(Booking):
+        for row in zip(
+            columns["listing_id"], columns["created_at"], columns["status"],
+            columns["viewed"], columns["viewed_at"],
+        ):
+            for key, counter, n in _booking_counts(*row):
+                deltas[key][counter] += n
+    return deltas
+
+
+def backfill():
+    """Rebuild listing_stats_daily (except views) from bookings, archived
+    bookings and payments. Returns the number of listing-day rows."""
+    from models import Booking, Payment, ListingStatsDaily
+
+    table = ListingStatsDaily.__table__
+    b = Booking.__table__
+    p = Payment.__table__
+
+    sources = {
+        "booking_requests": select(b.c.listing_id, func.date(b.c.created_at), func.count())
+            .where(true()).group_by(b.c.listing_id, func.date(b.c.created_at)),
+        # The same rules as _booking_counts and _earned
+        "confirmations": select(b.c.listing_id, func.date(b.c.created_at), func.count())
+            .where(b.c.status.in_(CONFIRMED_STATUSES))
+            .group_by(b.c.listing_id, func.date(b.c.created_at)),
+        "viewings": select(b.c.listing_id, func.date(b.c.viewed_at), func.count())
+            .where(b.c.viewed.is_(True), b.c.viewed_at.isnot(None))
+            .group_by(b.c.listing_id, func.date(b.c.viewed_at)),
+        "earnings": select(b.c.listing_id, func.date(p.c.created_at), func.sum(p.c.amount))
+            .select_from(p.join(b, p.c.booking_id == b.c.id))
+            .where(p.c.status.in_(PAID_STATUSES))
+            .group_by(b.c.listing_id, func.date(p.c.created_at)),
+    }
+
+    archived = _archived_booking_deltas()
+    with db.engine.begin() as conn:
+        insert = _upsert(conn.dialect.name)
+        conn.execute(update(table).values({c: 0 for c in COUNTERS if c != "views"}))
+        for counter, source in sources.items():
+            stmt = insert(table).from_select(["listing_id", "day", counter], source)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.listing_id, table.c.day],
+                set_={counter: stmt.excluded[counter]},
+            )
+            conn.execute(stmt)
+        apply_deltas(conn, archived)
+        return conn.execute(select(func.count()).select_from(table)).scalar()
+
+
+@stats_cli.command("backfill")
+@with_appcontext
+def backfill_command():
+    """Rebuild listing_stats_daily (except views) from bookings, archived
+    bookings and payments."""
+    started = time.perf_counter()
+    rows = backfill()
+    print(f"Backfilled {rows:,} listing-day rows in {time.perf_counter() - started:.1f}s.")
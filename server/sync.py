@@ -0,0 +1,238 @@
+"""Change sequence and tombstones for delta sync.
+
+Every insert or update of a Listing, Booking, Payout or Payment stamps the
+row's ``change_seq`` with the next value of a global counter
+(``sync_counters``). Deletes get a ``sync_tombstones`` row for each user
+who could see the deleted row. Both happen in a ``before_flush`` hook, in
+the same transaction as the change.
+
+The counter is bumped with ``UPDATE ... RETURNING``. The counter row stays
+locked until commit, so sequence numbers become visible in commit order.
+A client holding cursor N therefore never misses a row with seq <= N
+that commits later.
+
+ORM bulk UPDATE/DELETE of a synced model is refused, since it would skip
+the hook. Core writes on the tables bypass it too and must call allocate()
+themselves (see importer.py), or renumber() after a bulk load (see
+seed.py). Archival deletes are intentionally not tombstoned: archived rows
+are still readable through the history API.
+
+Tombstones older than SYNC_TOMBSTONE_DAYS are pruned. A client whose cursor
+is older than the pruned range must start again from zero.
+"""
+import logging
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import delete, event, func, insert, select, update
+
+from extensions import db
+
+logger = logging.getLogger("maskani.sync")
+
+CHANGE_SEQ = "change_seq"
+PRUNED_THROUGH = "tombstones_pruned_through"
+
+
+def _synced_models():
+    from models import Booking, Listing, Payment, Payout
+
+    return (Listing, Booking, Payout, Payment)
+
+
+def allocate(conn, n, name=CHANGE_SEQ):
+    """Reserve ``n`` numbers of sequence ``name`` on ``conn``; returns the
+    first. The counter row stays locked until the transaction ends, so
+    numbers become visible in commit order."""
+    from models import SyncCounter
+
+    counters = SyncCounter.__table__
+    last = conn.execute(
+        update(counters).where(counters.c.name == name)
+        .values(value=counters.c.value + n).returning(counters.c.value)
+    ).scalar()
+    if last is None:
+        # Tables created without the migration (db.create_all)
+        last = 1 + n
+        conn.execute(insert(counters).values(name=name, value=last))
+    return last - n + 1
+
+
+def renumber(conn):
+    """Give every synced row a distinct seq (id plus a per-table offset) and
+    move the counter past them; for bulk-loaded data such as the seed."""
+    from models import SyncCounter
+
+    offset = 0
+    for model in _synced_models():
+        table = model.__table__
+        conn.execute(update(table).values(change_seq=table.c.id + offset))
+        offset += conn.execute(select(func.coalesce(func.max(table.c.id), 0))).scalar()
+    counters = SyncCounter.__table__
+    conn.execute(delete(counters).where(counters.c.name == CHANGE_SEQ))
+    conn.execute(insert(counters).values(name=CHANGE_SEQ, value=offset))
+    return offset
+
+
+def counter(name):
+    from models import SyncCounter
+
+    row = db.session.get(SyncCounter, name)
+    return row.value if row else 0
+
+
+def _audience(session, obj):
+    """User ids that sync ``obj`` (and so need its tombstone)."""
+    from models import Booking, Listing, Payment, Payout
+
+    if isinstance(obj, Listing):
+        return {obj.owner_id}
+    if isinstance(obj, Booking):
+        with session.no_autoflush:
+            listing = session.get(Listing, obj.listing_id)
+        return {obj.hunter_id, listing.owner_id if listing else None} - {None}
+    if isinstance(obj, Payout):
+        return {obj.leaser_id}
+    if isinstance(obj, Payment):
+        return {obj.user_id}
+    return set()
+
+
+def _stamp_changes(session, flush_context, instances):
+    from models import SyncTombstone
+
+    synced = _synced_models()
+    changed = [o for o in session.new if isinstance(o, synced)]
+    changed += [
+        o for o in session.dirty
+        if isinstance(o, synced) and session.is_modified(o, include_collections=False)
+    ]
+    deleted = [o for o in session.deleted if isinstance(o, synced)]
+    if not changed and not deleted:
+        return
+
+    conn = session.connection()
+    seq = allocate(conn, len(changed) + len(deleted))
+    for obj in changed:
+        obj.change_seq = seq
+        seq += 1
+
+    tombstones = []
+    now = datetime.utcnow()
+    for obj in deleted:
+        for user_id in _audience(session, obj):
+            tombstones.append({
+                "change_seq": seq, "table_name": obj.__tablename__,
+                "row_id": obj.id, "user_id": user_id, "created_at": now,
+            })
+        seq += 1
+    if tombstones:
+        conn.execute(insert(SyncTombstone.__table__), tombstones)
+
+
+def _forbid_bulk_writes(orm_execute_state):
+    """ORM bulk UPDATE/DELETE (``query.update()``, ``session.execute(
+    delete(Model))``) skips before_flush: synced rows would change without a
+    new seq, or vanish without a tombstone, and clients would never learn
+    of it. Load the objects and change them through the session instead."""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.class_ in _synced_models():
+        raise RuntimeError(
+            f"Bulk {'UPDATE' if orm_execute_state.is_update else 'DELETE'} of "
+            f"{mapper.class_.__name__} bypasses delta-sync stamping; use the session"
+        )
+
+
+def init_app(app):
+    if not event.contains(db.session, "before_flush", _stamp_changes):
+        event.listen(db.session, "before_flush", _stamp_changes)
+        event.listen(db.session, "do_orm_execute", _forbid_bulk_writes)
+
+
+# =========================================================
+# CHANGE FEED
+# =========================================================
+def _scopes(user):
+    """{model: WHERE clauses} whose union is ``user``'s rows of each synced
+    table. Each clause matches one (column, change_seq) index, so an OR is
+    split into separate queries rather than defeating both indexes."""
+    from models import Booking, Listing, Payment, Payout
+
+    owned = select(Listing.id).where(Listing.owner_id == user.id)
+    return {
+        Listing: [Listing.owner_id == user.id],
+        Booking: [Booking.hunter_id == user.id, Booking.listing_id.in_(owned)],
+        Payout: [Payout.leaser_id == user.id],
+        Payment: [Payment.user_id == user.id],
+    }
+
+
+def changes_since(user, since, limit):
+    """Up to ``limit`` changes after ``since`` in sequence order.
+
+    Returns (rows by table, deleted ids by table, cursor, more). Each
+    source (one per scope clause, plus tombstones) is read in seq order with
+    LIMIT ``limit`` + 1, so merging them and keeping the first ``limit`` is
+    exact."""
+    from models import SyncTombstone
+
+    merged = []
+    for model, scopes in _scopes(user).items():
+        table = model.__table__
+        seen = set()
+        for scope in scopes:
+            rows = db.session.execute(
+                select(table).where(scope, table.c.change_seq > since)
+                .order_by(table.c.change_seq).limit(limit + 1)
+            ).all()
+            # A row in several scopes (a leaser booking their own listing)
+            # is sent once
+            merged += [(row.change_seq, table.name, row) for row in rows if row.id not in seen]
+            seen.update(row.id for row in rows)
+    tombstones = db.session.execute(
+        select(SyncTombstone.change_seq, SyncTombstone.table_name, SyncTombstone.row_id)
+        .where(SyncTombstone.user_id == user.id, SyncTombstone.change_seq > since)
+        .order_by(SyncTombstone.change_seq).limit(limit + 1)
+    ).all()
+    merged += [(t.change_seq, None, t) for t in tombstones]
+
+    merged.sort(key=lambda item: item[0])
+    more = len(merged) > limit
+    merged = merged[:limit]
+
+    rows, deleted = {}, {}
+    for seq, table_name, row in merged:
+        if table_name is None:
+            deleted.setdefault(row.table_name, []).append(row.row_id)
+        else:
+            rows.setdefault(table_name, []).append(row)
+    cursor = merged[-1][0] if merged else since
+    return rows, deleted, cursor, more
+
+
+# =========================================================
+# TOMBSTONE RETENTION
+# =========================================================
+def prune_tombstones():
+    """Drop tombstones older than SYNC_TOMBSTONE_DAYS; scheduled daily."""
+    from models import SyncCounter, SyncTombstone
+
+    cutoff = datetime.utcnow() - timedelta(days=current_app.config["SYNC_TOMBSTONE_DAYS"])
+    through = db.session.execute(
+        select(func.max(SyncTombstone.change_seq)).where(SyncTombstone.created_at < cutoff)
+    ).scalar()
+    if through is None:
+        return 0
+    pruned = db.session.execute(
+        delete(SyncTombstone).where(SyncTombstone.change_seq <= through)
+    ).rowcount
+    marker = db.session.get(SyncCounter, PRUNED_THROUGH)
+    if marker is None:
+        db.session.add(SyncCounter(name=PRUNED_THROUGH, value=through))
+    else:
+        marker.value = max(marker.value, through)
+    db.session.commit()
+    logger.info("[SYNC] pruned %d tombstones through seq %d", pruned, through)
+    return pruned
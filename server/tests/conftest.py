@@ -0,0 +1,67 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SERVER_DIR not in sys.path:
+    sys.path.insert(0, SERVER_DIR)
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "blueprints(*names): route modules the app fixture registers")
+
+
+def _init_routes(names):
+    def init_routes(app):
+        for name in names:
+            module = importlib.import_module(f"routes.{name}")
+            app.register_blueprint(getattr(module, f"{name}_bp"))
+    return init_routes
+
+
+@pytest.fixture
+def app(request, tmp_path, monkeypatch):
+    """App on a throwaway SQLite database with every table created.
+
+    Only the blueprints named by ``@pytest.mark.blueprints(...)`` are
+    registered, so a test doesn't depend on every route module importing.
+    """
+    import routes
+    from app import create_app
+    from config import Config
+    from extensions import db
+
+    class TestConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'test.db'}"
+        MEDIA_ROOT = str(tmp_path / "media")
+        ADMISSION_ENABLED = False
+        PROFILER_ENABLED = False
+        JWT_SECRET_KEY = "test-jwt-secret-at-least-32-bytes-long"
+
+    marker = request.node.get_closest_marker("blueprints")
+    monkeypatch.setattr(routes, "init_routes", _init_routes(marker.args if marker else ()))
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def make_user(app):
+    from extensions import db
+    from models import Role, User
+
+    def make(name, role="hunter"):
+        role_row = Role.get_by_name(role) or Role.create(role)
+        user = User(username=name, email=f"{name}@example.com", role_id=role_row.id)
+        user.set_password("secret")
+        db.session.add(user)
+        db.session.commit()
+        return user
+
+    return make
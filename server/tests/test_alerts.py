@@ -0,0 +1,102 @@
+import math
+import random
+from functools import lru_cache
+from types import SimpleNamespace
+
+import pytest
+
+from alerts import IntervalIndex, SubscriptionIndex
+from textutil import NEIGHBOURHOODS
+from textutil import area_key as _area_key
+
+VOCAB = ["furnished", "bedsitter", "studio", "parking", "balcony", "gym", "pool", "garden"]
+AREAS = list(NEIGHBOURHOODS[:6])
+area_key = lru_cache(maxsize=None)(_area_key)
+
+
+def _random_search(rng, search_id):
+    lo = rng.choice([None, rng.randrange(5_000, 60_000, 500)])
+    hi = rng.choice([None, rng.randrange(20_000, 150_000, 500)])
+    if lo is not None and hi is not None and lo > hi:
+        lo, hi = hi, lo
+    return SimpleNamespace(
+        id=search_id,
+        hunter_id=rng.randrange(1, 500),
+        area=rng.choice([None] + AREAS),
+        min_rent=lo,
+        max_rent=hi,
+        keywords=" ".join(rng.sample(VOCAB, rng.randrange(0, 3))) or None,
+    )
+
+
+def _brute_force(searches, area, rent, tokens):
+    hits = {}
+    for s in searches.values():
+        if s.area is not None and (area is None or area_key(s.area) != area_key(area)):
+            continue
+        lo = s.min_rent if s.min_rent is not None else -math.inf
+        hi = s.max_rent if s.max_rent is not None else math.inf
+        if rent is None:
+            if (lo, hi) != (-math.inf, math.inf):
+                continue
+        elif not lo <= rent <= hi:
+            continue
+        if s.keywords and not set(s.keywords.split()) <= tokens:
+            continue
+        hits[s.id] = s.hunter_id
+    return hits
+
+
+def test_interval_index_matches_brute_force():
+    rng = random.Random(7)
+    intervals = []
+    for i in range(2_000):
+        lo = rng.choice([-math.inf, rng.uniform(0, 100)])
+        hi = rng.choice([math.inf, rng.uniform(0, 100)])
+        if lo > hi:
+            lo, hi = hi, lo
+        intervals.append((lo, hi, i))
+    tree = IntervalIndex(intervals)
+    # Probe random points and every endpoint, since bounds are inclusive
+    probes = [rng.uniform(-10, 110) for _ in range(300)]
+    probes += [lo for lo, _, _ in intervals[:200] if lo != -math.inf]
+    for x in probes:
+        assert sorted(tree.stab(x)) == [v for lo, hi, v in intervals if lo <= x <= hi]
+    assert sorted(tree.stab(None)) == [
+        v for lo, hi, v in intervals if lo == -math.inf and hi == math.inf
+    ]
+
+
+def test_subscription_index_matches_brute_force():
+    rng = random.Random(42)
+    searches = {i: _random_search(rng, i) for i in range(1, 5_001)}
+    index = SubscriptionIndex(searches.values())
+
+    # Edits after the initial build must keep the index exact too
+    for search_id in rng.sample(sorted(searches), 300):
+        index.remove(search_id)
+        del searches[search_id]
+    for search_id in rng.sample(sorted(searches), 300):
+        searches[search_id] = _random_search(rng, search_id)
+        index.add(searches[search_id])
+
+    for _ in range(500):
+        area = rng.choice([None] + AREAS)
+        rent = rng.choice([None, float(rng.randrange(3_000, 160_000, 250))])
+        tokens = frozenset(rng.sample(VOCAB, rng.randrange(0, 5)))
+        assert index.match(area, rent, tokens) == _brute_force(searches, area, rent, tokens)
+
+
+@pytest.mark.blueprints("saved_searches")
+def test_saved_search_rejects_keywords_that_do_not_fit(app, make_user):
+    hunter = make_user("hunter")
+    client = app.test_client()
+    headers = {"X-User-Id": str(hunter.id)}
+    words = [f"keyword{n:03d}" for n in range(40)]  # 439 characters joined
+
+    response = client.post("/api/saved-searches", json={"keywords": " ".join(words)}, headers=headers)
+    assert response.status_code == 400
+
+    response = client.post("/api/saved-searches", json={"keywords": " ".join(words[:20])}, headers=headers)
+    assert response.status_code == 201
+    assert response.get_json()["keywords"] == words[:20]
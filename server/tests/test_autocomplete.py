@@ -0,0 +1,42 @@
+import random
+import string
+
+from autocomplete import AREA, SEP, TITLE, PrefixIndex
+
+
+def _brute_force(weights, prefix, k):
+    hits = [(w, text, kind) for (text, kind), (display, w) in weights.items() if text.startswith(prefix)]
+    hits.sort(reverse=True)
+    return [(weights[(text, kind)][0], kind, w) for w, text, kind in hits[:k]]
+
+
+def test_prefix_index_matches_brute_force_under_updates():
+    rng = random.Random(11)
+    letters = "abcde "
+    words = {"".join(rng.choice(letters) for _ in range(rng.randrange(1, 9))).strip() or "a"
+             for _ in range(3_000)}
+    weights = {}
+    for text in words:
+        kind = rng.choice([AREA, TITLE])
+        weights[(text, kind)] = (text.title(), rng.uniform(1, 100))
+    index = PrefixIndex({f"{t}{SEP}{k}": [d, w] for (t, k), (d, w) in weights.items()}, top_k=10)
+
+    prefixes = ["", "a", "b", "ab", "abc", "e d", "zz"] + [w[:2] for w in rng.sample(sorted(words), 50)]
+    for step in range(2_000):
+        # Interleave queries (which fill the memo) with weight changes
+        prefix = rng.choice(prefixes)
+        k = rng.randrange(1, 11)
+        if prefix:
+            assert index.top(prefix, k) == _brute_force(weights, prefix, k)
+
+        text, kind = rng.choice(sorted(weights)) if rng.random() < 0.8 else (
+            "".join(rng.choice(string.ascii_lowercase[:5]) for _ in range(4)), TITLE)
+        display, weight = weights.get((text, kind), (text.title(), 0.0))
+        delta = rng.choice([rng.uniform(0.5, 20), -weight if rng.random() < 0.2 else -rng.uniform(0, weight)])
+        index.bump(text, kind, display, delta)
+        if weight + delta > 1e-9:
+            weights[(text, kind)] = (display, weight + delta)
+        else:
+            weights.pop((text, kind), None)
+
+    assert len(index) == len(weights)
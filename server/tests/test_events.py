@@ -0,0 +1,112 @@
+import asyncio
+import socket
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from flask_jwt_extended import create_access_token
+
+import events
+from event_server import EventServer
+from extensions import db
+from models import Booking, EventOutbox, Listing
+
+
+@pytest.fixture
+def booking(make_user):
+    leaser, hunter = make_user("leaser", "leaser"), make_user("hunter")
+    listing = Listing(owner_id=leaser.id, title="Studio in Kilimani", rent=20_000)
+    db.session.add(listing)
+    db.session.commit()
+    booking = Booking(hunter_id=hunter.id, listing_id=listing.id)
+    db.session.add(booking)
+    db.session.commit()
+    return booking
+
+
+def _frames(app, user_id, last_event_id):
+    """Frames one WSGI stream yields before its (short) deadline."""
+    frames = events.stream(app, user_id, last_event_id, heartbeat=0.01,
+                           max_seconds=0.05, retry_ms=1000, poll=0.01)
+    return [f for f in frames if f.startswith("id:")]
+
+
+def _id(frame):
+    return frame.split("\n")[0][len("id: "):]
+
+
+def test_events_are_written_with_the_change(booking):
+    outbox = [(e.user_id, e.event_type) for e in EventOutbox.query.order_by(EventOutbox.seq)]
+    owner_id = db.session.get(Listing, booking.listing_id).owner_id
+    assert sorted(outbox) == sorted([(booking.hunter_id, "booking.status"),
+                                     (owner_id, "booking.status")])
+
+    booking.status = "confirmed"
+    db.session.flush()
+    db.session.rollback()
+    assert EventOutbox.query.count() == 2
+
+
+def test_reconnect_replays_only_what_was_missed(app, booking, make_user):
+    other = make_user("other")
+    seen = str(events.head())
+    for status in ("confirmed", "completed"):
+        booking.status = status
+        db.session.commit()
+    db.session.add(Booking(hunter_id=other.id, listing_id=booking.listing_id))
+    db.session.commit()
+
+    frames = _frames(app, booking.hunter_id, seen)
+    assert [f.split("\n")[1] for f in frames] == ["event: booking.status"] * 2
+    assert '"status":"completed"' in frames[-1]
+    assert _frames(app, booking.hunter_id, _id(frames[-1])) == []
+
+
+def test_reset_once_events_were_pruned(app, booking):
+    seen = str(events.head())
+    booking.status = "confirmed"
+    db.session.commit()
+    EventOutbox.query.update({"created_at": datetime.utcnow() - timedelta(days=2)})
+    db.session.commit()
+
+    assert events.prune_outbox() == 4
+    assert _frames(app, booking.hunter_id, seen) == [events.frame(events.head(), "reset", "{}")]
+    assert _frames(app, booking.hunter_id, "deadbeef-1")[0].split("\n")[1] == "event: reset"
+
+
+def _read_until(sock, marker):
+    data = b""
+    while marker not in data:
+        chunk = sock.recv(4096)
+        assert chunk, f"connection closed before {marker!r}: {data!r}"
+        data += chunk
+    return data.decode()
+
+
+def test_event_server_streams_changes_committed_elsewhere(app, booking):
+    app.config.update(SSE_POLL_SECONDS=0.02)
+    server = EventServer(app)
+    loop = asyncio.new_event_loop()
+    listening = loop.run_until_complete(server.start("127.0.0.1", 0))
+    port = listening.sockets[0].getsockname()[1]
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    token = create_access_token(identity=str(booking.hunter_id))
+    try:
+        with socket.create_connection(("127.0.0.1", port), timeout=5) as sock:
+            sock.sendall(f"GET /api/events?jwt={token} HTTP/1.1\r\nHost: test\r\n\r\n".encode())
+            assert _read_until(sock, b"retry:").startswith("HTTP/1.1 200 OK")
+            # Committed through the ordinary session, as another worker would
+            booking.status = "confirmed"
+            db.session.commit()
+            frames = _read_until(sock, b'"status":"confirmed"')
+        assert "event: booking.status\ndata: {" in frames
+
+        with socket.create_connection(("127.0.0.1", port), timeout=5) as sock:
+            sock.sendall(b"GET /api/events HTTP/1.1\r\nHost: test\r\n\r\n")
+            assert _read_until(sock, b"\r\n").startswith("HTTP/1.1 401")
+    finally:
+        asyncio.run_coroutine_threadsafe(server.stop(), loop).result(5)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(5)
+        loop.close()
@@ -0,0 +1,11 @@
+import pytest
+
+
+@pytest.mark.blueprints("profiles")
+def test_admin_routes_404_when_disabled(app, make_user):
+    admin = make_user("admin", "admin")
+    client = app.test_client()
+    headers = {"X-User-Id": str(admin.id)}
+
+    assert client.get("/api/admin/profiles", headers=headers).status_code == 404
+    assert client.post("/api/admin/profiles/token", headers=headers).status_code == 404
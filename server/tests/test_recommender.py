@@ -0,0 +1,60 @@
+import random
+
+import pytest
+from sqlalchemy import insert, update
+
+from extensions import db
+from models import Listing, ListingNeighbor
+from recommender import recommender
+
+AREAS = ["Kilimani", "Westlands", "Kileleshwa", "Lavington", "Karen"]
+WORDS = ["bedsitter", "studio", "garden", "parking", "balcony", "furnished", "borehole", "gym"]
+
+
+@pytest.fixture
+def listings(app, make_user):
+    # Written through Core so the background worker stays out of the way
+    owner = make_user("owner", "leaser")
+    rng = random.Random(5)
+    rows = [
+        {
+            "id": i, "owner_id": owner.id, "public": True, "change_seq": 1,
+            "title": f"{rng.choice(WORDS)} in {rng.choice(AREAS)}",
+            "rent": rng.choice([15_000, 25_000, 40_000, 80_000]),
+            "short_description": " ".join(rng.sample(WORDS, 3)),
+        }
+        for i in range(1, 41)
+    ]
+    with db.engine.begin() as conn:
+        conn.execute(insert(Listing.__table__), rows)
+    recommender.rebuild()
+    return rows
+
+
+def _neighbours():
+    return {
+        (n.listing_id, n.neighbor_id): n.score
+        for n in ListingNeighbor.query.all()
+    }
+
+
+def test_update_refreshes_listings_pointing_at_an_edited_listing(listings):
+    before = _neighbours()
+    edited = max({n for _, n in before}, key=lambda n: sum(1 for _, m in before if m == n))
+    with db.engine.begin() as conn:
+        conn.execute(update(Listing.__table__).where(Listing.id == edited).values(
+            title="Penthouse in Runda", rent=450_000, short_description="rooftop pool helipad"))
+
+    recommender.update([edited])
+
+    X, row = recommender._X, recommender._row
+    for (listing_id, neighbor_id), score in _neighbours().items():
+        if neighbor_id == edited:
+            assert score == pytest.approx(float(X[row[listing_id]] @ X[row[edited]]), abs=1e-4)
+
+
+@pytest.mark.blueprints("recommendations")
+def test_similar_limit_is_at_least_one(app, listings):
+    response = app.test_client().get("/api/listings/1/similar?limit=-3")
+    assert response.status_code == 200
+    assert len(response.get_json()["results"]) == 1
@@ -0,0 +1,54 @@
+import pytest
+
+from scheduling import LeaseScheduler
+
+
+@pytest.fixture
+def pair(app):
+    """Two schedulers sharing a lease, as two `flask scheduler run` processes."""
+    schedulers = []
+    for _ in range(2):
+        scheduler = LeaseScheduler(lease_name="test-lease")
+        scheduler.app = app
+        scheduler.ttl = 1
+        scheduler.heartbeat = 0.1
+        schedulers.append(scheduler)
+    return schedulers
+
+
+def _runs(name):
+    from models import JobRun
+
+    return [(run.holder, run.outcome) for run in JobRun.query.filter_by(job_name=name).order_by(JobRun.id)]
+
+
+def test_follower_takes_over_from_a_dead_leader(pair):
+    leader, follower = pair
+    assert leader.try_acquire()  # ...then stops heartbeating
+    calls = []
+
+    follower.run_job("payouts", lambda: calls.append(1))
+
+    assert calls == [1]
+    assert _runs("payouts") == [(follower.holder, "success")]
+
+
+def test_follower_stands_down_when_the_leader_ran(pair):
+    leader, follower = pair
+    leader.run_job("payouts", lambda: None)
+    calls = []
+
+    follower.run_job("payouts", lambda: calls.append(1))
+
+    assert calls == []
+    assert _runs("payouts") == [(leader.holder, "success")]
+
+
+def test_unrecoverable_miss_is_recorded(pair, monkeypatch):
+    leader, follower = pair
+    assert leader.try_acquire()
+    monkeypatch.setattr("scheduling.MISFIRE_GRACE", 0.3)  # shorter than the lease
+
+    follower.run_job("payouts", lambda: None)
+
+    assert _runs("payouts") == [(follower.holder, "skipped")]
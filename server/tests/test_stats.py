@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import select
+
+import stats
+from extensions import db
+from models import Booking, Listing, ListingStatsDaily, Payment
+
+
+def _rollups():
+    table = ListingStatsDaily.__table__
+    rollups = {}
+    for row in db.session.execute(select(table)).mappings():
+        counts = {c: row[c] for c in stats.COUNTERS if c != "views" and row[c]}
+        if counts:
+            rollups[(row["listing_id"], row["day"])] = counts
+    return rollups
+
+
+@pytest.fixture
+def booking(make_user):
+    leaser, hunter = make_user("leaser", "leaser"), make_user("hunter")
+    listing = Listing(owner_id=leaser.id, title="Studio in Kilimani", rent=20_000)
+    db.session.add(listing)
+    db.session.commit()
+    booking = Booking(hunter_id=hunter.id, listing_id=listing.id,
+                      created_at=datetime.utcnow() - timedelta(days=3))
+    db.session.add(booking)
+    db.session.commit()
+    return booking
+
+
+def test_live_counts_match_backfill(booking):
+    for status in ("confirmed", "cancelled", "completed", "cancelled", "confirmed"):
+        booking.status = status
+        db.session.commit()
+    booking.viewed = True  # no viewed_at yet: not a viewing
+    db.session.commit()
+    booking.viewed_at = datetime.utcnow() - timedelta(days=1)
+    db.session.commit()
+    paid = Payment(booking_id=booking.id, user_id=booking.hunter_id, amount=500.0, status="COMPLETED")
+    reversed_ = Payment(booking_id=booking.id, user_id=booking.hunter_id, amount=800.0, status="COMPLETED")
+    db.session.add_all([paid, reversed_])
+    db.session.commit()
+    reversed_.status = "FAILED"
+    paid.amount = 700.0
+    db.session.commit()
+
+    live = _rollups()
+    day = booking.created_at.date()
+    assert live[(booking.listing_id, day)] == {"booking_requests": 1, "confirmations": 1}
+    assert live[(booking.listing_id, booking.viewed_at.date())] == {"viewings": 1}
+    assert live[(booking.listing_id, paid.created_at.date())] == {"earnings": 700.0}
+
+    stats.backfill()
+    assert _rollups() == live
+
+
+def test_deleting_a_booking_takes_its_counts_out(booking):
+    booking.status = "confirmed"
+    db.session.commit()
+    db.session.delete(booking)
+    db.session.commit()
+    assert _rollups() == {}
@@ -0,0 +1,96 @@
+import random
+
+import pytest
+
+from extensions import db
+from models import Booking, Listing, Payment
+from sync import changes_since
+
+
+def _drain(user, since=0, limit=7):
+    """Page through changes_since; returns ({(table, id): seq}, deleted, cursor)."""
+    seen, deleted = {}, {}
+    while True:
+        rows, gone, cursor, more = changes_since(user, since, limit)
+        assert cursor >= since
+        for table, table_rows in rows.items():
+            for row in table_rows:
+                assert (table, row.id) not in seen, "row sent twice"
+                seen[(table, row.id)] = row.change_seq
+        for table, ids in gone.items():
+            deleted.setdefault(table, []).extend(ids)
+        since = cursor
+        if not more:
+            return seen, deleted, cursor
+
+
+@pytest.fixture
+def catalogue(make_user):
+    rng = random.Random(3)
+    hunter = make_user("hunter")
+    leaser = make_user("leaser", "leaser")
+    other = make_user("other", "leaser")
+    listings = [Listing(owner_id=rng.choice([leaser.id, other.id]), title=f"Listing {i}", rent=1000 * i)
+                for i in range(30)]
+    db.session.add_all(listings)
+    db.session.commit()
+    bookings = [Booking(hunter_id=hunter.id, listing_id=rng.choice(listings).id) for _ in range(40)]
+    # The leaser booking their own listing is in both of their booking scopes
+    own = next(l for l in listings if l.owner_id == leaser.id)
+    bookings.append(Booking(hunter_id=leaser.id, listing_id=own.id))
+    db.session.add_all(bookings)
+    db.session.commit()
+    db.session.add_all([Payment(booking_id=b.id, user_id=hunter.id, amount=500) for b in bookings[:10]])
+    db.session.commit()
+    return hunter, leaser
+
+
+def _expected(user):
+    owned = {l.id for l in Listing.query.filter_by(owner_id=user.id)}
+    keys = {("listings", i) for i in owned}
+    keys |= {("bookings", b.id) for b in Booking.query
+             if b.hunter_id == user.id or b.listing_id in owned}
+    keys |= {("payments", p.id) for p in Payment.query.filter_by(user_id=user.id)}
+    return keys
+
+
+def test_paging_returns_every_row_once(catalogue):
+    for user in catalogue:
+        seen, deleted, _ = _drain(user)
+        assert set(seen) == _expected(user)
+        assert not deleted
+        # Seqs are distinct, so no page boundary can split a seq
+        assert len(set(seen.values())) == len(seen)
+
+
+def test_updates_and_deletes_after_cursor(catalogue):
+    hunter, leaser = catalogue
+    _, _, hunter_cursor = _drain(hunter)
+    _, _, leaser_cursor = _drain(leaser)
+
+    booking = Booking.query.filter(
+        Booking.hunter_id == hunter.id,
+        Booking.listing_id.in_(db.session.query(Listing.id).filter_by(owner_id=leaser.id)),
+        Booking.id.notin_(db.session.query(Payment.booking_id)),
+    ).first()
+    changed = Booking.query.filter_by(hunter_id=hunter.id).filter(Booking.id != booking.id).first()
+    changed.status = "confirmed"
+    db.session.delete(booking)
+    db.session.commit()
+
+    seen, deleted, _ = _drain(hunter, hunter_cursor)
+    assert set(seen) == {("bookings", changed.id)}
+    assert deleted == {"bookings": [booking.id]}
+
+    # The listing owner gets the tombstone too
+    _, deleted, _ = _drain(leaser, leaser_cursor)
+    assert deleted == {"bookings": [booking.id]}
+
+
+def test_bulk_writes_on_synced_models_are_refused(catalogue):
+    with pytest.raises(RuntimeError):
+        Listing.query.filter(Listing.rent > 10_000).delete()
+    db.session.rollback()
+    with pytest.raises(RuntimeError):
+        Booking.query.update({"status": "cancelled"})
+    db.session.rollback()
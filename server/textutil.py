@@ -0,0 +1,58 @@
+"""Text normalisation shared by search, alerts and recommendations.
+
+Listings have no structured location yet, so the neighbourhood is inferred
+from the title/description against a gazetteer of Nairobi-area names.
+"""
+import re
+import unicodedata
+
+NEIGHBOURHOODS = (
+    "Kilimani", "Westlands", "Kileleshwa", "Lavington", "Karen", "Runda",
+    "Parklands", "South B", "South C", "Langata", "Rongai", "Kitengela",
+    "Ruaka", "Kasarani", "Roysambu", "Embakasi", "Donholm", "Umoja",
+    "Githurai", "Ngong", "Syokimau", "Madaraka", "Upper Hill", "Kahawa West",
+    "Hurlingham", "Riverside", "Spring Valley", "Muthaiga", "Gigiri",
+    "Loresho", "Kitisuru", "Ngara", "Pangani", "Eastleigh", "Buruburu",
+    "Kayole", "Utawala", "Ruiru", "Thika Road", "Juja", "Athi River",
+    "Mlolongo", "Kikuyu", "Dagoretti", "Kawangware", "Kangemi", "Ngong Road",
+    "Nairobi West", "Industrial Area", "Kibera", "Mathare",
+    "Zimmerman", "Kahawa Sukari", "Thome", "Garden Estate", "Ridgeways",
+)
+
+STOPWORDS = frozenset(
+    "a an and at by for from in into is near of on or the to with".split()
+)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalise(text):
+    """Lowercase, strip accents and punctuation, collapse whitespace."""
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(_TOKEN_RE.findall(text.lower().replace("'", "")))
+
+
+def tokenize(text):
+    return [t for t in normalise(text).split() if t not in STOPWORDS]
+
+
+# Longest names first so "Kahawa West" wins over a hypothetical "Kahawa"
+_AREA_KEYS = sorted(((normalise(n), n) for n in NEIGHBOURHOODS), key=lambda kv: -len(kv[0]))
+
+
+def area_of(*texts):
+    """Return the canonical neighbourhood named in ``texts``, or None."""
+    for text in texts:
+        padded = f" {normalise(text)} "
+        for key, name in _AREA_KEYS:
+            if f" {key} " in padded:
+                return name
+    return None
+
+
+def area_key(name):
+    """Normalised form used to index and compare neighbourhood names."""
+    return normalise(name)
@@ -0,0 +1,30 @@
+"""Thumbnail rendering, run in worker processes by media.py.
+
+Kept free of Flask/SQLAlchemy imports so spawned workers start quickly.
+"""
+import os
+
+
+def thumbnail_name(sha, size):
+    return f"{sha}_{size}.jpg"
+
+
+def render_thumbnails(src_path, dest_dir, sha, sizes, quality=82):
+    """Render JPEG thumbnails of ``src_path`` bounded to each of ``sizes``
+    pixels. Returns the original (width, height)."""
+    from PIL import Image, ImageOps
+
+    os.makedirs(dest_dir, exist_ok=True)
+    with Image.open(src_path) as img:
+        img = ImageOps.exif_transpose(img)
+        if img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        width, height = img.size
+        for size in sorted(sizes, reverse=True):
+            # Downscale step by step from the previous (larger) result
+            img.thumbnail((size, size), Image.LANCZOS)
+            final = os.path.join(dest_dir, thumbnail_name(sha, size))
+            tmp = f"{final}.{os.getpid()}.tmp"
+            img.save(tmp, "JPEG", quality=quality, optimize=True, progressive=True)
+            os.replace(tmp, final)
+    return width, height